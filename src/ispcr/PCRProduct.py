@@ -0,0 +1,34 @@
+"""
+Class for a single product amplified during in silico PCR.
+"""
+from dataclasses import dataclass
+from typing import Tuple, Union
+
+
+@dataclass(frozen=True)
+class PCRProduct:
+    forward_primer: str
+    reverse_primer: str
+    start: int
+    end: int
+    length: int
+    product_name: str
+    product_sequence: str
+    orientation: str = "FR"
+
+    def fields(self) -> Tuple[Union[str, int], ...]:
+        """Returns the fields of the product in the same order as the output columns."""
+        return (
+            self.forward_primer,
+            self.reverse_primer,
+            self.start,
+            self.end,
+            self.length,
+            self.product_name,
+            self.product_sequence,
+            self.orientation,
+        )
+
+    def __str__(self) -> str:
+        # Only the default output columns, so this matches a line of get_pcr_products
+        return "\t".join(str(field) for field in self.fields()[:7])
@@ -1,20 +1,103 @@
-import re
-from typing import Union
+import importlib
+from contextlib import ExitStack, closing
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Tuple, Union
 
 from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import (
+    check_primers,
+    find_primer_sites,
+    iter_pcr_products,
+    parse_orientations,
+    products_from_sites,
+)
+from ispcr.normalize import (
+    InvalidBaseError,
+    fold_case,
+    is_unambiguous,
+    normalize_primer,
+    primer_reverse_complement,
+)
+from ispcr.PCRProduct import PCRProduct
+from ispcr.pipeline import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_QUEUE_SIZE,
+    BackgroundConsumer,
+    check_queue_size,
+    prefetch,
+)
+from ispcr.results import DEFAULT_MEMORY_BUDGET, PCRResults
+from ispcr.sharding import merge_shard_outputs, read_shard_lines
 from ispcr.utils import (
-    desired_product_size,
-    filter_output_line,
+    SequenceLike,
+    as_fasta_sequence,
+    format_output_line,
+    header_line,
+    iter_sequences,
     parse_selected_cols,
+    read_fasta,
     read_sequences_from_file,
     reverse_complement,
 )
 
+if TYPE_CHECKING:
+    from ispcr.database import SequenceDatabase
+    from ispcr.prefilter import PrimerKmerFilter
+    from ispcr.thermo import ThermoFilter
+    from ispcr.writers import get_writer
+
+# Attributes of the package that are only imported from their modules when they are first used,
+# so that importing ispcr for a single small search doesn't pay for sqlite3, the database cache,
+# or the writers
+_LAZY_ATTRIBUTES = {
+    "SequenceDatabase": "ispcr.database",
+    "PrimerKmerFilter": "ispcr.prefilter",
+    "ThermoFilter": "ispcr.thermo",
+    "get_writer": "ispcr.writers",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
 BASE_HEADER = (
     "forward_primer\treverse_primer\tstart\tend\tlength\tproduct_name\tproduct_sequence"
 )
 
 
+def _kmer_filter(
+    forward_primer: FastaSequence,
+    reverse_primer: FastaSequence,
+    prefilter: bool,
+    orientations: Tuple[str, ...],
+    circular: Union[bool, str],
+    ambiguous: str,
+) -> Union["PrimerKmerFilter", None]:
+    # The k-mers of a primer site spanning the origin of a circular sequence could be split
+    # across its ends, and the k-mers of a degenerate primer stand for several k-mers, so
+    # neither of them can be prefiltered.
+    if not prefilter or circular:
+        return None
+    if ambiguous == "expand" and not (
+        is_unambiguous(forward_primer.sequence)
+        and is_unambiguous(reverse_primer.sequence)
+    ):
+        return None
+    from ispcr.prefilter import PrimerKmerFilter
+
+    return PrimerKmerFilter.from_primers(
+        forward_primer, reverse_primer, orientations=orientations
+    )
+
+
 def calculate_pcr_product(
     sequence: FastaSequence,
     forward_primer: FastaSequence,
@@ -24,6 +107,10 @@ def calculate_pcr_product(
     header: bool = True,
     cols: str = "all",
     output_file: Union[bool, str] = False,
+    orientations: Union[str, Iterable[str]] = "FR",
+    circular: Union[bool, str] = False,
+    ambiguous: str = "literal",
+    thermo: Union["ThermoFilter", None] = None,
 ) -> str:
     """Returns the products amplified by a pair of primers against a single sequence.
 
@@ -68,13 +155,37 @@ def calculate_pcr_product(
             length - the length of the product
             pname - the name of the sequence in which the target was found
             pseq - the nucleotide sequnce of the amplified product
+            orient - the orientation of the primers that amplified the product (see orientations)
 
     output_file: bool | str
         The file to write the results out to. Defaults to False, which will not print anything out. Providing a string
         will create that input file at that location. If set to True without providing a string, the output file
         will be of the form <DD-MM-YYYY_HH:MM:SS>.txt
 
-
+    orientations: str | Iterable[str]
+        Which primer orientations to report products for. Defaults to "FR," which only reports the products
+        of the forward primer and the reverse primer. The other options are "RF" (the primers swapped), "FF"
+        (the forward primer alone), and "RR" (the reverse primer alone), and "all" reports every orientation.
+        Several orientations can be given as a list or as a string such as "FR FF RR". Every orientation is
+        found with a single search of each sequence. If any orientation other than FR is requested, "all"
+        columns includes the orientation column.
+
+    circular: bool | str
+        Whether or not to treat the target sequences as circular, such as plasmids or organelle genomes, so that
+        products spanning the origin are found. A regular expression can be supplied instead to only treat the
+        sequences whose header matches it as circular, such as circular="plasmid|mitochondri". Products spanning
+        the origin have an end position smaller than their start position. Defaults to False.
+
+    ambiguous: str
+        How ambiguous bases such as N, R, or Y in the primers are handled. Defaults to "literal," which only matches
+        them to the same base in a target sequence. "expand" matches them to any of the bases they stand for, which is
+        useful for degenerate primers, and "error" raises an InvalidBaseError if a primer contains one. Matching is
+        case-insensitive, so primers are also found in soft-masked (lower case) regions of the target sequences.
+
+    thermo: None | ThermoFilter
+        If provided, the primer binding sites whose nearest-neighbor melting temperature, GC content, or 3' end
+        stability fall outside of its thresholds are dropped before they are paired into products, so implausible
+        binding sites never produce products. Defaults to None, which keeps every site. See ispcr.thermo.
 
     Outputs
     -------
@@ -91,42 +202,26 @@ def calculate_pcr_product(
 
     products = []
 
+    orientations = parse_orientations(orientations)
+
     # Check cols string
-    selected_column_indices = parse_selected_cols(cols)
+    selected_column_indices = parse_selected_cols(cols, orientations != ("FR",))
 
     if header is True:
-        products.append(filter_output_line(BASE_HEADER, selected_column_indices))
-
-    forward_matches = [
-        match.start()
-        for match in re.finditer(forward_primer.sequence, sequence.sequence)
-    ]
-
-    for forward_match in forward_matches:
-        tempseq = sequence[forward_match:]
-        reverse_matches = [
-            match.start()
-            for match in re.finditer(
-                reverse_complement(reverse_primer.sequence), tempseq
-            )
-        ]
-
-        for reverse_match in reverse_matches:
-            product = tempseq[: reverse_match + len(reverse_primer)]
-            start = forward_match
-            end = (
-                forward_match + reverse_match + len(reverse_primer)
-            )  # This is the end in the original sequence
-            product_length = len(product)
-            # if min_product_length is not None and product_length < min_product_length:
-            #     continue
-            if not desired_product_size(
-                product_length, min_product_length, max_product_length
-            ):
-                continue
-
-            product_line = f"{forward_primer.header}\t{reverse_primer.header}\t{start}\t{end}\t{product_length}\t{sequence.header}\t{product}"
-            products.append(filter_output_line(product_line, selected_column_indices))
+        products.append(header_line(selected_column_indices))
+
+    for product in iter_pcr_products(
+        sequence=sequence,
+        forward_primer=forward_primer,
+        reverse_primer=reverse_primer,
+        min_product_length=min_product_length,
+        max_product_length=max_product_length,
+        orientations=orientations,
+        circular=circular,
+        ambiguous=ambiguous,
+        thermo=thermo,
+    ):
+        products.append(format_output_line(product.fields(), selected_column_indices))
 
     results = "\n".join(products)
 
@@ -145,6 +240,17 @@ def get_pcr_products(
     header: Union[bool, str] = True,
     cols: str = "all",
     output_file: Union[bool, str] = False,
+    prefilter: bool = False,
+    header_pattern: Union[str, None] = None,
+    sequence_ids: Union[Iterable[str], None] = None,
+    orientations: Union[str, Iterable[str]] = "FR",
+    circular: Union[bool, str] = False,
+    ambiguous: str = "literal",
+    thermo: Union["ThermoFilter", None] = None,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    memory_budget: Union[int, None] = DEFAULT_MEMORY_BUDGET,
 ) -> str:
     """Returns all the products amplified by a set of primers in all sequences in a fasta file.
 
@@ -185,12 +291,72 @@ def get_pcr_products(
             length - the length of the product
             pname - the name of the sequence in which the target was found
             pseq - the nucleotide sequnce of the amplified product
+            orient - the orientation of the primers that amplified the product (see orientations)
 
     output_file: bool | str
         The file to write the results out to. Defaults to False, which will not print anything out. Providing a string
         will create that input file at that location. If set to True without providing a string, the output file
         will be of the form <DD-MM-YYYY_HH:MM:SS>.txt
 
+    prefilter: bool
+        Whether or not to skip sequences that do not contain the 3'-terminal k-mers of both primers before
+        searching them. This is useful for large databases where most sequences contain neither primer, and
+        does not change the results. Defaults to False. The prefilter is not used if circular is set, or if
+        ambiguous is "expand" and the primers contain ambiguous bases.
+
+    header_pattern: None | str
+        If provided, only the sequences whose header matches this regular expression are searched.
+        Defaults to None, which searches all sequences.
+
+    sequence_ids: None | Iterable[str]
+        If provided, only the sequences whose ID (the header up to the first whitespace) is in this collection
+        are searched. Defaults to None, which searches all sequences.
+
+    orientations: str | Iterable[str]
+        Which primer orientations to report products for. Defaults to "FR," which only reports the products
+        of the forward primer and the reverse primer. The other options are "RF" (the primers swapped), "FF"
+        (the forward primer alone), and "RR" (the reverse primer alone), and "all" reports every orientation.
+        Several orientations can be given as a list or as a string such as "FR FF RR". Every orientation is
+        found with a single search of each sequence. If any orientation other than FR is requested, "all"
+        columns includes the orientation column.
+
+    circular: bool | str
+        Whether or not to treat the target sequences as circular, such as plasmids or organelle genomes, so that
+        products spanning the origin are found. A regular expression can be supplied instead to only treat the
+        sequences whose header matches it as circular, such as circular="plasmid|mitochondri". Products spanning
+        the origin have an end position smaller than their start position. Defaults to False.
+
+    ambiguous: str
+        How ambiguous bases such as N, R, or Y in the primers are handled. Defaults to "literal," which only matches
+        them to the same base in a target sequence. "expand" matches them to any of the bases they stand for, which is
+        useful for degenerate primers, and "error" raises an InvalidBaseError if a primer contains one. Matching is
+        case-insensitive, so primers are also found in soft-masked (lower case) regions of the target sequences.
+
+    thermo: None | ThermoFilter
+        If provided, the primer binding sites whose nearest-neighbor melting temperature, GC content, or 3' end
+        stability fall outside of its thresholds are dropped before they are paired into products, so implausible
+        binding sites never produce products. Defaults to None, which keeps every site. See ispcr.thermo.
+
+    shard_index: int
+        Which shard of sequence_file to search when a run is split across several processes or nodes. Defaults to 0.
+
+    shard_count: int
+        The number of shards sequence_file is split into. Each shard is a byte range of nearly the same size, and
+        only the records whose header starts in this shard's range are searched, so every record is searched by
+        exactly one shard. The outputs of the shards can be combined with ispcr.sharding.merge_shard_outputs into
+        the same output as a run with a single shard. Defaults to 1, which searches every record.
+
+    queue_size: int
+        The number of parsed sequences and of batches of results that can be waiting between the reader thread, the
+        search, and the writer thread. A smaller queue uses less memory, and a larger one evens out bursts of slow
+        reads or writes. Defaults to 64. sequence_file can also be gzip compressed, in which case it is decompressed
+        by the reader thread.
+
+    memory_budget: None | int
+        The results are spilled to a temporary file once they take up more than this many bytes in memory, and are
+        read back in to build the returned string. This roughly halves the peak memory use of runs with a huge number
+        of products. Defaults to 64 MiB, the same as get_pcr_results, and None keeps every result in memory. See
+        get_pcr_results to avoid building the string altogether.
 
     Outputs
     -------
@@ -205,38 +371,350 @@ def get_pcr_products(
 
     """
 
-    products = []
+    with get_pcr_results(
+        primer_file,
+        sequence_file,
+        min_product_length=min_product_length,
+        max_product_length=max_product_length,
+        header=header,
+        cols=cols,
+        output_file=output_file,
+        prefilter=prefilter,
+        header_pattern=header_pattern,
+        sequence_ids=sequence_ids,
+        orientations=orientations,
+        circular=circular,
+        ambiguous=ambiguous,
+        thermo=thermo,
+        shard_index=shard_index,
+        shard_count=shard_count,
+        queue_size=queue_size,
+        memory_budget=memory_budget,
+    ) as results:
+        return results.getvalue()
+
+
+def get_pcr_results(
+    primer_file: str,
+    sequence_file: str,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    header: Union[bool, str] = True,
+    cols: str = "all",
+    output_file: Union[bool, str] = False,
+    prefilter: bool = False,
+    header_pattern: Union[str, None] = None,
+    sequence_ids: Union[Iterable[str], None] = None,
+    orientations: Union[str, Iterable[str]] = "FR",
+    circular: Union[bool, str] = False,
+    ambiguous: str = "literal",
+    thermo: Union["ThermoFilter", None] = None,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    memory_budget: Union[int, None] = DEFAULT_MEMORY_BUDGET,
+) -> PCRResults:
+    """Same as get_pcr_products, but returns the results as a PCRResults instead of a single string.
+
+    The results are kept in memory until they take up more than memory_budget bytes, after which they
+    are spilled to a temporary file, so the memory used by a run with a huge number of products stays
+    bounded. Defaults to 64 MiB, and None never spills the results. The results can be iterated over line
+    by line or written to a file with PCRResults.write. Close them when you are done with them to delete
+    the temporary file.
+
+    All other arguments are the same as get_pcr_products.
+
+    Example
+    -------
+    >>> with get_pcr_results("primers.fa", "sequences.fa", memory_budget=2**20) as results:
+    ...     results.write("results.tsv")
+    """
+
+    batch: List[str] = []
 
     # If anything gets passed for the header, it gets handled here instead of in
     # calculate_pcr_product.
 
-    selected_column_indices = parse_selected_cols(cols)
+    orientations = parse_orientations(orientations)
+    selected_column_indices = parse_selected_cols(cols, orientations != ("FR",))
 
     if header is True:
-        products.append(filter_output_line(BASE_HEADER, selected_column_indices))
+        batch.append(header_line(selected_column_indices))
 
     primers = read_sequences_from_file(primer_file)
     forward_primer, reverse_primer = primers
 
-    sequences = read_sequences_from_file(sequence_file)
-
-    for sequence in sequences:
-        new_products = calculate_pcr_product(
-            sequence=sequence,
-            forward_primer=forward_primer,
-            reverse_primer=reverse_primer,
-            min_product_length=min_product_length,
-            max_product_length=max_product_length,
-            header=False,
-            cols=cols,
-        )
-        if new_products:
-            products.append(new_products)
+    # Bad arguments are raised before the reader thread is started or any file is opened,
+    # even if the sequence file turns out to be empty
+    check_primers(forward_primer, reverse_primer, ambiguous)
+    check_queue_size(queue_size)
+
+    kmer_filter = _kmer_filter(
+        forward_primer, reverse_primer, prefilter, orientations, circular, ambiguous
+    )
+
+    # Sequences shorter than the minimum product length can never produce a product, so they
+    # are skipped by the reader before their sequence strings are built.
+    # The sequences are read and parsed in a reader thread while they are being searched.
+    sequences = prefetch(
+        read_fasta(
+            read_shard_lines(sequence_file, shard_index, shard_count),
+            prefilter=kmer_filter,
+            min_length=min_product_length,
+            header_pattern=header_pattern,
+            sequence_ids=sequence_ids,
+        ),
+        queue_size,
+    )
+
+    results = PCRResults(memory_budget)
+    try:
+        with ExitStack() as stack:
+            # The reader thread is stopped as soon as the search fails
+            stack.enter_context(closing(sequences))
+            # The output file is written in batches by a writer thread while the search goes on.
+            output: Optional[BackgroundConsumer[str]] = None
+            if isinstance(output_file, str):
+                fout = stack.enter_context(open(output_file, "w"))
+                output = stack.enter_context(BackgroundConsumer(fout.write, queue_size))
+
+            for sequence in sequences:
+                # Batches are added while a sequence is being searched, so that memory_budget
+                # also holds for a single sequence with a huge number of products
+                for product in iter_pcr_products(
+                    sequence=sequence,
+                    forward_primer=forward_primer,
+                    reverse_primer=reverse_primer,
+                    min_product_length=min_product_length,
+                    max_product_length=max_product_length,
+                    orientations=orientations,
+                    circular=circular,
+                    ambiguous=ambiguous,
+                    thermo=thermo,
+                ):
+                    batch.append(
+                        format_output_line(product.fields(), selected_column_indices)
+                    )
+                    if len(batch) >= DEFAULT_BATCH_SIZE:
+                        _add_batch(results, output, batch)
+                        batch = []
+
+            if batch:
+                _add_batch(results, output, batch)
+    except BaseException:
+        results.close()
+        raise
 
-    results = "\n".join(products)
+    return results
 
-    if isinstance(output_file, str) is True:
-        with open(output_file, "w") as fout:
-            fout.write(results)
 
-    return results
+def _add_batch(
+    results: PCRResults, output: Optional[BackgroundConsumer[str]], batch: List[str]
+) -> None:
+    # Batches are separated from the lines before them the same way as the lines in
+    # the string returned by get_pcr_products
+    if output is not None:
+        joined = "\n".join(batch)
+        output.put("\n" + joined if len(results) else joined)
+    results.extend(batch)
+
+
+def write_pcr_products(
+    primer_file: str,
+    sequence_file: str,
+    output_file: str,
+    output_format: str = "tsv",
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    header: bool = True,
+    cols: str = "all",
+    prefilter: bool = False,
+    header_pattern: Union[str, None] = None,
+    sequence_ids: Union[Iterable[str], None] = None,
+    orientations: Union[str, Iterable[str]] = "FR",
+    circular: Union[bool, str] = False,
+    ambiguous: str = "literal",
+    thermo: Union["ThermoFilter", None] = None,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> int:
+    """Writes all the products amplified by a set of primers in all sequences in a fasta file to a file.
+
+    Unlike get_pcr_products, the products are streamed to the output file as they are found instead of
+    being joined into a single string, so this should be preferred for large databases. The products are
+    written by a writer thread, so writing overlaps with the search.
+
+    Inputs
+    ------
+    primer_file: str
+        The path to the fasta file containing the primers to be tested. See get_pcr_products.
+
+    sequence_file: str
+        The path to the fasta file containing the sequences to test the primers against.
+
+    output_file: str
+        The file to write the results out to. This will overwrite the file.
+
+    output_format: str
+        The format of the output file. Defaults to "tsv." Available options are:
+            tsv - tab-separated lines, identical to the output file written by get_pcr_products
+            bed - BED6 features for viewing in a genome browser
+            sqlite - a SQLite database with the products in a table called products
+            columnar - a compact binary columnar file which can be read with ispcr.writers.read_columnar_file
+            dedup - each unique product sequence once in output_file, and a table mapping every product to the ID of
+                its sequence in a second file (see ispcr.writers.DedupWriter)
+
+    header: bool
+        Whether or not to print a header on the results. Only used by the tsv format. Defaults to True.
+
+    cols: str
+        Which columns to print out. Only used by the tsv format. See get_pcr_products for the available options.
+
+    All other arguments are the same as get_pcr_products. The orientation is always stored by the
+    bed, sqlite, and columnar formats.
+
+    Outputs
+    -------
+    The number of products written to output_file.
+    """
+
+    orientations = parse_orientations(orientations)
+
+    primers = read_sequences_from_file(primer_file)
+    forward_primer, reverse_primer = primers
+
+    # Bad arguments are raised before output_file is overwritten
+    check_primers(forward_primer, reverse_primer, ambiguous)
+    check_queue_size(queue_size)
+
+    kmer_filter = _kmer_filter(
+        forward_primer, reverse_primer, prefilter, orientations, circular, ambiguous
+    )
+
+    sequences = prefetch(
+        read_fasta(
+            read_shard_lines(sequence_file, shard_index, shard_count),
+            prefilter=kmer_filter,
+            min_length=min_product_length,
+            header_pattern=header_pattern,
+            sequence_ids=sequence_ids,
+        ),
+        queue_size,
+    )
+
+    import ispcr.writers
+
+    # The writer is created here, so that bad arguments are raised straight away, but it is
+    # written and closed by the writer thread, which some formats such as sqlite rely on.
+    writer = ispcr.writers.get_writer(
+        output_format,
+        output_file,
+        cols=cols,
+        header=header,
+        include_orientation=orientations != ("FR",),
+    )
+    # The reader thread is stopped as soon as the search fails
+    with closing(sequences), BackgroundConsumer(
+        writer.write_all, queue_size, writer.close
+    ) as output:
+        batch: List[PCRProduct] = []
+        for sequence in sequences:
+            # Batches are handed over while a sequence is being searched, so a sequence
+            # with a huge number of products is never held in memory all at once
+            for product in iter_pcr_products(
+                sequence=sequence,
+                forward_primer=forward_primer,
+                reverse_primer=reverse_primer,
+                min_product_length=min_product_length,
+                max_product_length=max_product_length,
+                orientations=orientations,
+                circular=circular,
+                ambiguous=ambiguous,
+                thermo=thermo,
+            ):
+                batch.append(product)
+                if len(batch) >= DEFAULT_BATCH_SIZE:
+                    output.put(batch)
+                    batch = []
+        if batch:
+            output.put(batch)
+
+    return writer.count
+
+
+def batch_pcr_products(
+    primer_pairs: Iterable[Tuple[SequenceLike, SequenceLike]],
+    targets: Iterable[Union[SequenceLike, bytes, bytearray, memoryview]],
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+) -> List[PCRProduct]:
+    """Returns all the products amplified by several primer pairs in sequences that are already in memory.
+
+    This is meant for services that already hold their primers and targets in memory, and avoids writing
+    them out to fasta files for get_pcr_products and parsing the results string back in.
+
+    Inputs
+    ------
+    primer_pairs: Iterable[Tuple[FastaSequence | Tuple[str, str], FastaSequence | Tuple[str, str]]]
+        The (forward primer, reverse primer) pairs to test. Each primer can be a FastaSequence or
+        a (header, sequence) tuple.
+
+    targets: Iterable[FastaSequence | Tuple[str, str] | bytes]
+        The sequences to test the primers against. Each target can be a FastaSequence, a (header, sequence)
+        tuple, or a bytes buffer containing one or more fasta records.
+
+    min_product_length: None | int
+        If provided, only return those products whose length are greater than or equal to this number.
+        Defaults to None, which returns all products found.
+
+    max_product_length: None | int
+        If provided, only return those products whose length are less than or equal to this number.
+        Defaults to None, which returns all products found.
+
+    Outputs
+    -------
+    A list of PCRProducts, ordered by target and then by primer pair. Each target is only parsed once.
+    """
+
+    primers = []
+    for forward, reverse in primer_pairs:
+        forward_primer = as_fasta_sequence(forward)
+        reverse_primer = as_fasta_sequence(reverse)
+        primers.append(
+            (
+                forward_primer,
+                reverse_primer,
+                normalize_primer(forward_primer.sequence),
+                primer_reverse_complement(reverse_primer.sequence),
+            )
+        )
+
+    products: List[PCRProduct] = []
+    for sequence in iter_sequences(targets):
+        if min_product_length is not None and len(sequence) < min_product_length:
+            continue
+        search_sequence = fold_case(sequence.sequence)
+        for (
+            forward_primer,
+            reverse_primer,
+            forward_site_sequence,
+            reverse_site_sequence,
+        ) in primers:
+            forward_sites = find_primer_sites(search_sequence, forward_site_sequence)
+            if not forward_sites:
+                continue
+            reverse_sites = find_primer_sites(search_sequence, reverse_site_sequence)
+            products.extend(
+                products_from_sites(
+                    sequence,
+                    forward_primer,
+                    reverse_primer,
+                    forward_sites,
+                    reverse_sites,
+                    min_product_length,
+                    max_product_length,
+                )
+            )
+
+    return products
@@ -0,0 +1,104 @@
+"""
+Asyncio versions of the in silico PCR functions for use inside of async applications.
+
+Parsing and matching are run in an executor so that they don't block the event loop.
+"""
+import asyncio
+import os
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Tuple, Union
+
+from ispcr import get_pcr_products
+from ispcr.database import SequenceDatabase
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import SequenceLike
+
+# Databases that are loading or loaded, keyed by path, along with the modification time of
+# the file they were loaded from. Concurrent requests for the same file share a single load,
+# and the entry is replaced once the file is modified.
+_databases: Dict[str, Tuple[float, "asyncio.Future[SequenceDatabase]"]] = {}
+
+
+async def aget_pcr_products(
+    primer_file: str,
+    sequence_file: str,
+    executor: Union[Executor, None] = None,
+    **kwargs: Any,
+) -> str:
+    """Async version of get_pcr_products.
+
+    The arguments are the same as get_pcr_products, and the search is run in executor. Defaults to
+    None, which uses the event loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, partial(get_pcr_products, primer_file, sequence_file, **kwargs)
+    )
+
+
+async def aload_database(
+    sequence_file: str, executor: Union[Executor, None] = None
+) -> SequenceDatabase:
+    """Loads a SequenceDatabase in an executor and keeps it for future calls.
+
+    Concurrent calls for the same file wait on the same load, and later calls return the loaded
+    database without reading the file again. The file is read again if it has been modified.
+    """
+    path = os.path.abspath(sequence_file)
+    mtime = os.path.getmtime(sequence_file)
+    loop = asyncio.get_running_loop()
+    entry = _databases.get(path)
+    if entry is not None and entry[0] == mtime and entry[1].get_loop() is loop:
+        future = entry[1]
+    else:
+        future = loop.run_in_executor(
+            executor, SequenceDatabase.from_file, sequence_file
+        )
+        _databases[path] = (mtime, future)
+    try:
+        return await asyncio.shield(future)
+    except Exception:
+        entry = _databases.get(path)
+        if entry is not None and entry[1] is future:
+            del _databases[path]
+        raise
+
+
+def clear_databases() -> None:
+    """Forgets the databases loaded by aload_database."""
+    _databases.clear()
+
+
+async def aiter_products(
+    database: SequenceDatabase,
+    forward_primer: SequenceLike,
+    reverse_primer: SequenceLike,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    chunk_size: int = 256,
+    executor: Union[Executor, None] = None,
+) -> AsyncIterator[PCRProduct]:
+    """Yields the products amplified by a pair of primers in a database as they are found.
+
+    The database is searched chunk_size sequences at a time in executor. Cancelling the task that is
+    iterating stops the search after the chunk being searched, so a request that is abandoned
+    partway through a database doesn't keep searching it.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    loop = asyncio.get_running_loop()
+    for start in range(0, len(database), chunk_size):
+        # The generator doesn't do any work until list consumes it in the executor
+        search = database.iter_products(
+            forward_primer,
+            reverse_primer,
+            min_product_length,
+            max_product_length,
+            start=start,
+            stop=start + chunk_size,
+        )
+        products = await loop.run_in_executor(executor, list, search)
+        for product in products:
+            yield product
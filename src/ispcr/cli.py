@@ -0,0 +1,192 @@
+"""
+Command line interface for ispcr.
+
+Run python -m ispcr --help, or ispcr --help once the package is installed, for the available commands.
+"""
+import argparse
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from ispcr import write_pcr_products
+from ispcr.sharding import MERGE_FORMATS, merge_shard_outputs
+
+if TYPE_CHECKING:
+    from ispcr.thermo import ThermoFilter
+
+# The modules behind each command are imported by the command that uses them, so that
+# importing the command line doesn't pay for sqlite3 or the commands that aren't run
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # The writers module is light until a SQLite file is written, and the options only need
+    # the names of the formats and the default sample sizes
+    from ispcr.estimate import DEFAULT_SAMPLE_BYTES, DEFAULT_SAMPLES
+    from ispcr.writers import WRITERS
+
+    parser = argparse.ArgumentParser(prog="ispcr", description="Simple in silico PCR")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run = subparsers.add_parser(
+        "run", help="Write the products amplified by a pair of primers to a file"
+    )
+    run.add_argument(
+        "primer_file", help="Fasta file with the forward and reverse primer"
+    )
+    run.add_argument("sequence_file", help="Fasta file with the target sequences")
+    run.add_argument("-o", "--output-file", required=True)
+    run.add_argument("-f", "--format", choices=sorted(WRITERS), default="tsv")
+    run.add_argument("--min-product-length", type=int, default=None)
+    run.add_argument("--max-product-length", type=int, default=None)
+    run.add_argument(
+        "--cols", default="all", help='Output columns, e.g. "fpri rpri pname"'
+    )
+    run.add_argument("--no-header", action="store_true")
+    run.add_argument("--orientations", default="FR")
+    run.add_argument("--shard-index", type=int, default=0)
+    run.add_argument("--shard-count", type=int, default=1)
+    thermo = run.add_argument_group(
+        "primer thresholds",
+        "Primers outside of these thresholds are not searched for",
+    )
+    thermo.add_argument("--min-tm", type=float, help="Melting temperature in °C")
+    thermo.add_argument("--max-tm", type=float)
+    thermo.add_argument("--min-gc", type=float, help="GC content in percent")
+    thermo.add_argument("--max-gc", type=float)
+    thermo.add_argument(
+        "--min-three-prime-dg", type=float, help="ΔG of the 3' end in kcal/mol"
+    )
+    thermo.add_argument("--max-three-prime-dg", type=float)
+
+    merge = subparsers.add_parser(
+        "merge", help="Merge the outputs of the shards of a run into a single file"
+    )
+    merge.add_argument("shard_files", nargs="+", help="Shard outputs, in shard order")
+    merge.add_argument("-o", "--output-file", required=True)
+    merge.add_argument("-f", "--format", choices=MERGE_FORMATS, default="tsv")
+    merge.add_argument(
+        "--no-header", action="store_true", help="The tsv shards have no header"
+    )
+
+    update = subparsers.add_parser(
+        "update",
+        help="Rerun a search, only searching the records that changed since the last run",
+    )
+    update.add_argument(
+        "primer_file", help="Fasta file with the forward and reverse primer"
+    )
+    update.add_argument("sequence_file", help="Fasta file with the target sequences")
+    update.add_argument(
+        "--state-file",
+        required=True,
+        help="SQLite file with the results of each record from the last run",
+    )
+    update.add_argument("-o", "--output-file", required=True)
+    update.add_argument("--min-product-length", type=int, default=None)
+    update.add_argument("--max-product-length", type=int, default=None)
+    update.add_argument(
+        "--cols", default="all", help='Output columns, e.g. "fpri rpri pname"'
+    )
+    update.add_argument("--no-header", action="store_true")
+    update.add_argument("--orientations", default="FR")
+
+    cost = subparsers.add_parser(
+        "estimate",
+        help="Estimate the products, runtime, and output size of a run from samples",
+    )
+    cost.add_argument(
+        "primer_file", help="Fasta file with the forward and reverse primer"
+    )
+    cost.add_argument("sequence_file", help="Fasta file with the target sequences")
+    cost.add_argument("--min-product-length", type=int, default=None)
+    cost.add_argument("--max-product-length", type=int, default=None)
+    cost.add_argument(
+        "--cols", default="all", help='Output columns, e.g. "fpri rpri pname"'
+    )
+    cost.add_argument("--no-header", action="store_true")
+    cost.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    cost.add_argument("--sample-bytes", type=int, default=DEFAULT_SAMPLE_BYTES)
+
+    return parser
+
+
+def _thermo_filter(args: argparse.Namespace) -> Optional["ThermoFilter"]:
+    thresholds = {
+        name: getattr(args, name)
+        for name in (
+            "min_tm",
+            "max_tm",
+            "min_gc",
+            "max_gc",
+            "min_three_prime_dg",
+            "max_three_prime_dg",
+        )
+        if getattr(args, name) is not None
+    }
+    if not thresholds:
+        return None
+    from ispcr.thermo import ThermoFilter
+
+    return ThermoFilter(**thresholds)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == "run":
+        write_pcr_products(
+            args.primer_file,
+            args.sequence_file,
+            args.output_file,
+            output_format=args.format,
+            min_product_length=args.min_product_length,
+            max_product_length=args.max_product_length,
+            header=not args.no_header,
+            cols=args.cols,
+            orientations=args.orientations,
+            shard_index=args.shard_index,
+            shard_count=args.shard_count,
+            thermo=_thermo_filter(args),
+        )
+    elif args.command == "merge":
+        shard_files: List[str] = args.shard_files
+        merge_shard_outputs(
+            shard_files,
+            args.output_file,
+            output_format=args.format,
+            header=not args.no_header,
+        )
+    elif args.command == "update":
+        from ispcr.incremental import update_pcr_products
+
+        run = update_pcr_products(
+            args.primer_file,
+            args.sequence_file,
+            args.state_file,
+            min_product_length=args.min_product_length,
+            max_product_length=args.max_product_length,
+            header=not args.no_header,
+            cols=args.cols,
+            output_file=args.output_file,
+            orientations=args.orientations,
+        )
+        print(
+            f"Searched {run.searched} records, reused {run.reused}, "
+            f"removed {run.removed}"
+        )
+    elif args.command == "estimate":
+        from ispcr.estimate import estimate
+
+        print(
+            estimate(
+                args.primer_file,
+                args.sequence_file,
+                min_product_length=args.min_product_length,
+                max_product_length=args.max_product_length,
+                header=not args.no_header,
+                cols=args.cols,
+                samples=args.samples,
+                sample_bytes=args.sample_bytes,
+            )
+        )
+
+    return 0
@@ -0,0 +1,212 @@
+"""
+An in-memory database of target sequences for running many in silico PCRs against the same sequences.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import find_primer_sites, products_from_sites
+from ispcr.normalize import fold_case, normalize_primer, primer_reverse_complement
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import (
+    SequenceLike,
+    as_fasta_sequence,
+    format_results,
+    read_sequences_from_file,
+)
+
+# Returned for every record that a primer doesn't bind, so those records take no space in the cache
+NO_SITES: Tuple[int, ...] = ()
+
+
+class _PrimerSites:
+    # The cached sites of one primer. Only the records that the primer binds are stored, and
+    # searched has one byte per record marking the records that have been searched so far.
+    __slots__ = ("sites", "searched")
+
+    def __init__(self, record_count: int) -> None:
+        self.sites: Dict[int, List[int]] = {}
+        self.searched = bytearray(record_count)
+
+
+class SequenceDatabase:
+    """A set of target sequences that is loaded once and searched by many primer pairs.
+
+    get_pcr_products reads and parses the sequence file on every call. When many primer pairs are
+    tested against the same sequences, such as while designing primers, a SequenceDatabase can be
+    loaded once instead. Sequences are indexed by their header, and the binding sites found for each
+    primer are cached, so repeated queries only pay for pairing the sites. A database can be shared
+    between threads. Matching is case-insensitive, and an upper case copy is only kept for sequences
+    that contain soft-masked bases.
+
+    Example
+    -------
+    >>> database = SequenceDatabase.from_file("tests/test_data/sequences/met_r.fa")
+    >>> database.calculate(("forward", "GGAG"), ("reverse", "TAAT"), max_product_length=250)
+    """
+
+    def __init__(
+        self, sequences: Iterable[SequenceLike], cache_size: int = 256
+    ) -> None:
+        if cache_size < 0:
+            raise ValueError("cache_size cannot be negative")
+        self.sequences: List[FastaSequence] = [
+            as_fasta_sequence(sequence) for sequence in sequences
+        ]
+        # fold_case returns upper case sequences as they are, so these are only copies of
+        # soft-masked sequences
+        self._search_sequences: List[str] = [
+            fold_case(sequence.sequence) for sequence in self.sequences
+        ]
+        self.index: Dict[str, int] = {
+            sequence.header: i for i, sequence in enumerate(self.sequences)
+        }
+        self.cache_size = cache_size
+        self._site_cache: "OrderedDict[str, _PrimerSites]" = OrderedDict()
+        self._reverse_complements: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(
+        cls,
+        sequence_file: str,
+        header_pattern: Union[str, None] = None,
+        sequence_ids: Union[Iterable[str], None] = None,
+        cache_size: int = 256,
+    ) -> "SequenceDatabase":
+        """Loads a database from a fasta file, optionally keeping only some of its sequences."""
+        sequences = read_sequences_from_file(
+            sequence_file, header_pattern=header_pattern, sequence_ids=sequence_ids
+        )
+        return cls(sequences, cache_size=cache_size)
+
+    def __len__(self) -> int:
+        return len(self.sequences)
+
+    def __iter__(self) -> Iterator[FastaSequence]:
+        yield from self.sequences
+
+    def __contains__(self, header: str) -> bool:
+        return header in self.index
+
+    def __getitem__(self, key: Union[int, str]) -> FastaSequence:
+        if isinstance(key, str):
+            return self.sequences[self.index[key]]
+        return self.sequences[key]
+
+    def reverse_complement(self, dna_string: str) -> str:
+        """Returns the reverse complement of a primer, caching it for future queries."""
+        if dna_string not in self._reverse_complements:
+            self._reverse_complements[dna_string] = primer_reverse_complement(
+                dna_string
+            )
+        return self._reverse_complements[dna_string]
+
+    def primer_sites(
+        self, primer: str, start: int = 0, stop: Union[int, None] = None
+    ) -> List[Sequence[int]]:
+        """Returns the binding sites of a primer in each sequence of the database.
+
+        start and stop select a range of sequences, so a large database can be searched in chunks.
+        Sites are cached per sequence for the most recently used primers, up to cache_size primers.
+        Only the sequences that a primer binds are stored in the cache, and the others share the
+        empty NO_SITES.
+        """
+        # Treat start and stop the same way as a slice of the sequences
+        start, stop, _ = slice(start, stop).indices(len(self.sequences))
+        primer = normalize_primer(primer)
+
+        with self._lock:
+            cached_sites = self._site_cache.get(primer)
+            if cached_sites is None:
+                cached_sites = _PrimerSites(len(self.sequences))
+                if self.cache_size:
+                    self._site_cache[primer] = cached_sites
+                    if len(self._site_cache) > self.cache_size:
+                        self._site_cache.popitem(last=False)
+            elif self.cache_size:
+                self._site_cache.move_to_end(primer)
+
+        # Two threads may search the same sequence at once, but they'll store the same sites
+        sites: List[Sequence[int]] = []
+        for i in range(start, stop):
+            if not cached_sites.searched[i]:
+                record_sites = find_primer_sites(self._search_sequences[i], primer)
+                if record_sites:
+                    cached_sites.sites[i] = record_sites
+                cached_sites.searched[i] = 1
+            sites.append(cached_sites.sites.get(i, NO_SITES))
+
+        return sites
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._site_cache.clear()
+            self._reverse_complements.clear()
+
+    def iter_products(
+        self,
+        forward_primer: SequenceLike,
+        reverse_primer: SequenceLike,
+        min_product_length: Union[int, None] = None,
+        max_product_length: Union[int, None] = None,
+        start: int = 0,
+        stop: Union[int, None] = None,
+    ) -> Iterator[PCRProduct]:
+        """Yields the products amplified by a pair of primers in every sequence of the database.
+
+        Primers can be given as FastaSequences or as (header, sequence) tuples. start and stop
+        can be used to only search a range of the sequences.
+        """
+        forward_primer = as_fasta_sequence(forward_primer)
+        reverse_primer = as_fasta_sequence(reverse_primer)
+
+        all_forward_sites = self.primer_sites(forward_primer.sequence, start, stop)
+        all_reverse_sites = self.primer_sites(
+            self.reverse_complement(reverse_primer.sequence), start, stop
+        )
+
+        for sequence, forward_sites, reverse_sites in zip(
+            self.sequences[start:stop], all_forward_sites, all_reverse_sites
+        ):
+            if not forward_sites or not reverse_sites:
+                continue
+            yield from products_from_sites(
+                sequence,
+                forward_primer,
+                reverse_primer,
+                forward_sites,
+                reverse_sites,
+                min_product_length,
+                max_product_length,
+            )
+
+    def calculate(
+        self,
+        forward_primer: SequenceLike,
+        reverse_primer: SequenceLike,
+        min_product_length: Union[int, None] = None,
+        max_product_length: Union[int, None] = None,
+        header: bool = True,
+        cols: str = "all",
+        output_file: Union[bool, str] = False,
+    ) -> str:
+        """Returns the products amplified by a pair of primers in every sequence of the database.
+
+        The arguments and the output are the same as get_pcr_products, except that the primers are
+        supplied directly instead of through a primer file.
+        """
+        results = format_results(
+            self.iter_products(
+                forward_primer, reverse_primer, min_product_length, max_product_length
+            ),
+            cols=cols,
+            header=header,
+        )
+
+        if isinstance(output_file, str) is True:
+            with open(output_file, "w") as fout:
+                fout.write(results)
+
+        return results
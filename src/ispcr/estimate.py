@@ -0,0 +1,327 @@
+"""
+Cheap pre-run estimates of the number of products, runtime, and output size of a search.
+
+A handful of evenly spaced, fixed-size windows of the sequence file are read and searched, and the
+counts and timings from them are scaled up to the size of the whole file. Windows start and end inside
+of records, so only a small part of a file made of a few long records, such as a genome, is read.
+"""
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, List, Tuple, Union
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import find_primer_sites, iter_pcr_products
+from ispcr.normalize import fold_case, normalize_primer, primer_reverse_complement
+from ispcr.utils import (
+    format_output_line,
+    header_line,
+    is_gzipped,
+    parse_selected_cols,
+    read_sequences_from_file,
+)
+
+DEFAULT_SAMPLES = 16
+DEFAULT_SAMPLE_BYTES = 64 * 1024
+# The z-score of a two-sided 95% confidence interval
+CONFIDENCE_Z = 1.96
+# The upper bound of a 95% confidence interval for a rate when no events were observed
+RULE_OF_THREE = 3
+# Headers are taken to be shorter than this, so a window that starts further into a line than
+# this starts in a sequence line
+MAX_HEADER_BYTES = 64 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass
+class SampleCounts:
+    """The counts and timings from searching one sampled window of a sequence file.
+
+    records is the number of records that the window overlaps, including the records that it only
+    covers part of, and bytes_read is the number of bytes of the file in the window.
+    """
+
+    records: int = 0
+    bases: int = 0
+    bytes_read: int = 0
+    forward_sites: int = 0
+    reverse_sites: int = 0
+    products: int = 0
+    output_bytes: int = 0
+    parse_seconds: float = 0.0
+    search_seconds: float = 0.0
+
+
+@dataclass
+class CostEstimate:
+    """The expected size and cost of searching a whole sequence file, extrapolated from samples.
+
+    The products and the output size are given as a point estimate with a 95% confidence interval,
+    which is based on how much the samples differ from each other. If the whole file was read, the
+    estimates are exact counts, although the runtime is still just a measurement.
+    """
+
+    file_bytes: int
+    sampled_bytes: int
+    sampled_records: int
+    forward_sites_per_kb: float
+    reverse_sites_per_kb: float
+    products: float
+    products_low: float
+    products_high: float
+    runtime_seconds: float
+    output_bytes: float
+
+    @property
+    def exact(self) -> bool:
+        """Whether the whole file was read to make the estimate."""
+        return self.sampled_bytes >= self.file_bytes
+
+    def __str__(self) -> str:
+        fraction = self.sampled_bytes / self.file_bytes if self.file_bytes else 1.0
+        return "\n".join(
+            [
+                f"Sampled {self.sampled_bytes:,} of {self.file_bytes:,} bytes "
+                f"({fraction:.1%}), {self.sampled_records:,} records",
+                f"Forward primer sites: {self.forward_sites_per_kb:.3g} per kb",
+                f"Reverse primer sites: {self.reverse_sites_per_kb:.3g} per kb",
+                f"Expected products: {self.products:,.0f} "
+                f"(95% CI {self.products_low:,.0f} - {self.products_high:,.0f})",
+                f"Expected runtime: {self.runtime_seconds:.3g} s",
+                f"Expected output size: {self.output_bytes:,.0f} bytes",
+            ]
+        )
+
+
+def estimate(
+    primer_file: str,
+    sequence_file: str,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    header: bool = True,
+    cols: str = "all",
+    samples: int = DEFAULT_SAMPLES,
+    sample_bytes: int = DEFAULT_SAMPLE_BYTES,
+) -> CostEstimate:
+    """Estimates the number of products, runtime, and output size of get_pcr_products without running it.
+
+    Inputs
+    ------
+    primer_file, sequence_file, min_product_length, max_product_length, header, cols
+        The same as get_pcr_products. The products are counted with the same size limits, and the
+        output size is measured for the selected columns.
+
+    samples: int
+        The number of evenly spaced windows of sequence_file to search. Defaults to 16.
+
+    sample_bytes: int
+        The size of each window. Defaults to 64 KiB. Windows start and end inside of records, and
+        the products that start in a window are counted. Each window is read up to
+        max_product_length - 1 bases past its end, or sample_bytes bases if max_product_length is
+        None, to complete those products, so longer products are missed. If the windows would cover
+        the whole file, the whole file is searched instead, and the estimate is exact.
+
+    Outputs
+    -------
+    A CostEstimate. Printing it gives a short summary.
+
+    Raises
+    ------
+    ValueError
+        Raised if samples or sample_bytes are not positive, or if sequence_file is gzip compressed,
+        since compressed files can't be read from the middle.
+    """
+    if samples < 1 or sample_bytes < 1:
+        raise ValueError("samples and sample_bytes must be positive integers")
+    if is_gzipped(sequence_file):
+        raise ValueError(f"{sequence_file} is gzip compressed and can't be sampled")
+
+    forward_primer, reverse_primer = read_sequences_from_file(primer_file)
+    column_indices = parse_selected_cols(cols)
+
+    file_bytes = os.path.getsize(sequence_file)
+    if samples * sample_bytes >= file_bytes:
+        windows = [(0, file_bytes)]
+    else:
+        windows = [(file_bytes * i // samples, sample_bytes) for i in range(samples)]
+    overlap = sample_bytes if max_product_length is None else max_product_length - 1
+    forward_sequence = normalize_primer(forward_primer.sequence)
+    reverse_sequence = primer_reverse_complement(reverse_primer.sequence)
+
+    sample_counts = []
+    # Stands in for the header of a record whose header is before the start of a window
+    last_header = ""
+    for start, size in windows:
+        counts = SampleCounts()
+        parse_start = time.perf_counter()
+        pieces, counts.bytes_read = _read_window(
+            sequence_file, start, size, overlap, last_header
+        )
+        counts.parse_seconds = time.perf_counter() - parse_start
+
+        for sequence, counted_bases in pieces:
+            last_header = sequence.header
+            counts.records += 1
+            counts.bases += len(sequence)
+
+            search_start = time.perf_counter()
+            products = [
+                product
+                for product in iter_pcr_products(
+                    sequence,
+                    forward_primer,
+                    reverse_primer,
+                    min_product_length,
+                    max_product_length,
+                )
+                # Products starting past the end of the window belong to the file after it
+                if product.start < counted_bases
+            ]
+            counts.search_seconds += time.perf_counter() - search_start
+
+            counts.products += len(products)
+            counts.output_bytes += sum(
+                len(format_output_line(product.fields(), column_indices)) + 1
+                for product in products
+            )
+            search_sequence = fold_case(sequence.sequence)
+            counts.forward_sites += len(
+                find_primer_sites(search_sequence, forward_sequence)
+            )
+            counts.reverse_sites += len(
+                find_primer_sites(search_sequence, reverse_sequence)
+            )
+        sample_counts.append(counts)
+
+    header_bytes = len(header_line(column_indices)) + 1 if header else 0
+    return _extrapolate(sample_counts, file_bytes, header_bytes)
+
+
+def _read_window(
+    sequence_file: str, start: int, size: int, overlap: int, last_header: str
+) -> Tuple[List[Tuple[FastaSequence, int]], int]:
+    # Returns the records or parts of records in the [start, start + size) byte range, each with
+    # the number of its bases in the range, and the number of bytes read from the range. The last
+    # record is read up to overlap bases past the range. A record that starts before the range is
+    # named last_header, or the first header of the file if that is empty.
+    with open(sequence_file, "rb") as fin:
+        if start > 0 and not last_header:
+            last_header = fin.readline(MAX_HEADER_BYTES).decode()[1:].strip()
+        in_header = start > 0 and _starts_in_header(fin, start)
+        fin.seek(start)
+        data = fin.read(size)
+        lines = data.decode(errors="replace").split("\n")
+        if in_header:
+            # The window starts in the middle of a header, which can't be used
+            lines = lines[1:]
+
+        pieces: List[Tuple[str, List[str], int]] = []
+        for line in lines:
+            if line.startswith(">"):
+                pieces.append((line[1:].strip(), [], 0))
+                continue
+            bases = line.strip()
+            if not bases:
+                continue
+            if not pieces:
+                pieces.append((last_header, [], 0))
+            header, parts, counted_bases = pieces[-1]
+            parts.append(bases)
+            pieces[-1] = (header, parts, counted_bases + len(bases))
+
+        # Unless the window ended on a header, its last record goes on past the window
+        if pieces and not lines[-1].startswith(">"):
+            pieces[-1][1].append(_read_bases(fin, overlap))
+
+    return [
+        (FastaSequence(header, "".join(parts)), counted_bases)
+        for header, parts, counted_bases in pieces
+    ], len(data)
+
+
+def _starts_in_header(fin: BinaryIO, position: int) -> bool:
+    # Whether the byte at position is in a header line. Lines longer than MAX_HEADER_BYTES are
+    # taken to be sequence lines, so that a long unwrapped sequence line isn't read in full.
+    look_back = min(position, MAX_HEADER_BYTES)
+    fin.seek(position - look_back)
+    before = fin.read(look_back)
+    line_start = before.rfind(b"\n") + 1
+    if line_start == 0 and look_back < position:
+        return False
+    return before[line_start:].startswith(b">")
+
+
+def _read_bases(fin: BinaryIO, bases: int) -> str:
+    # Reads up to a number of bases from fin, which is in a sequence line or at the start of a
+    # line, stopping at the next header. A sequence line never starts with ">", so a line that
+    # continues from the previous chunk can't be taken for a header.
+    parts: List[str] = []
+    while bases > 0:
+        chunk = fin.read(max(bases, READ_CHUNK_BYTES))
+        if not chunk:
+            break
+        for line in chunk.decode(errors="replace").split("\n"):
+            if line.startswith(">"):
+                return "".join(parts)
+            line = line.strip()[:bases]
+            parts.append(line)
+            bases -= len(line)
+    return "".join(parts)
+
+
+def _extrapolate(
+    sample_counts: List[SampleCounts], file_bytes: int, header_bytes: int
+) -> CostEstimate:
+    sampled_bytes = sum(counts.bytes_read for counts in sample_counts)
+    # The estimate is only exact if every byte of the file was read
+    exact = sampled_bytes >= file_bytes
+    sampled_bases = sum(counts.bases for counts in sample_counts)
+    products = sum(counts.products for counts in sample_counts)
+    scale = 1.0 if exact or not sampled_bytes else file_bytes / sampled_bytes
+
+    expected_products = products * scale
+    if exact:
+        products_low = products_high = expected_products
+    elif products == 0:
+        products_low = 0.0
+        products_high = RULE_OF_THREE * scale
+    else:
+        # Each sample gives its own estimate for the whole file, and the spread of those
+        # estimates gives the standard error of their mean
+        per_sample = [
+            counts.products * file_bytes / counts.bytes_read
+            for counts in sample_counts
+            if counts.bytes_read
+        ]
+        standard_error = _standard_deviation(per_sample) / math.sqrt(len(per_sample))
+        # The products found in the samples are certain to be there
+        products_low = max(
+            float(products), expected_products - CONFIDENCE_Z * standard_error
+        )
+        products_high = expected_products + CONFIDENCE_Z * standard_error
+
+    output_bytes = sum(counts.output_bytes for counts in sample_counts)
+    runtime = sum(
+        counts.parse_seconds + counts.search_seconds for counts in sample_counts
+    )
+    kilobases = sampled_bases / 1000 if sampled_bases else 1.0
+    return CostEstimate(
+        file_bytes=file_bytes,
+        sampled_bytes=sampled_bytes,
+        sampled_records=sum(counts.records for counts in sample_counts),
+        forward_sites_per_kb=sum(c.forward_sites for c in sample_counts) / kilobases,
+        reverse_sites_per_kb=sum(c.reverse_sites for c in sample_counts) / kilobases,
+        products=expected_products,
+        products_low=products_low,
+        products_high=products_high,
+        runtime_seconds=runtime * scale,
+        output_bytes=output_bytes * scale + header_bytes,
+    )
+
+
+def _standard_deviation(values: List[float]) -> float:
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1))
@@ -0,0 +1,506 @@
+"""
+An FM-index over a set of target sequences for fast exact and approximate primer site lookup.
+
+The index is made up of the Burrows-Wheeler transform (BWT) of the concatenated sequences,
+occurrence counts sampled every occ_sample rows of the BWT, and the suffix array sampled at every
+sa_sample-th text position. Looking up a primer takes time proportional to the length of the primer
+and the number of sites found, rather than the size of the database, so it is worth building an
+index for references that are searched many times.
+
+The suffix array is built in pure Python, which takes a few seconds (around 3 s on a recent machine,
+and up to 10 s on slower ones) and about 110 MB of memory per megabase of sequence, growing slightly
+faster than linearly. Building an index is practical for references of up to a few tens of
+megabases, such as bacterial genomes or amplicon databases. Larger references should be searched
+with get_pcr_products, which streams the sequence file, or split into shards (see ispcr.sharding).
+Once built, an index takes about 2 bytes per base on disk, and can be saved and loaded again in a
+fraction of the build time.
+"""
+import json
+import re
+import struct
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain, islice, repeat
+from operator import add, mul, ne
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import products_from_sites
+from ispcr.normalize import fold_case, normalize_primer, primer_reverse_complement
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import (
+    SequenceLike,
+    as_fasta_sequence,
+    format_results,
+    iter_sequences,
+    read_sequences_from_file,
+)
+
+if TYPE_CHECKING:
+    from ispcr.thermo import ThermoFilter
+
+SEPARATOR = "$"
+# The end of the text must sort before the separators for the LF-mapping to hold everywhere
+TERMINATOR = "#"
+FMINDEX_MAGIC = b"ISPCRFMI\x01"
+MISMATCH_BASES = "ACGT"
+SOFT_MASKED_REGEX = re.compile("[a-z]+")
+
+
+def build_suffix_array(text: str) -> List[int]:
+    """Returns the suffix array of text using prefix doubling.
+
+    Suffixes are first sorted by their first k characters, for the largest power of two k whose
+    characters can be packed into a single 64-bit key, which is 16 characters for DNA. Each round
+    after that sorts them by the ranks of their first k characters and of the k after them, again
+    packed into a single key, doubling k until every suffix has a distinct rank. The ranks and
+    keys are kept in arrays of machine integers, so only the suffix array itself and the keys of
+    the sort are Python objects. This takes O(n log^2 n) time and around 100 bytes of memory per
+    character of text.
+    """
+    n = len(text)
+    if n == 0:
+        return []
+
+    # Characters are numbered from 1, so that the end of the text, which packs as 0, sorts
+    # before every character
+    alphabet = {character: rank for rank, character in enumerate(sorted(set(text)), 1)}
+    base = len(alphabet) + 1
+    keys = array("q", map(alphabet.__getitem__, text))
+    k = 1
+    while base ** (2 * k) < 2**63:
+        keys = _pack(keys, base**k, k)
+        k *= 2
+
+    rank = array("q", bytes(8 * n))
+    suffix_array = list(range(n))
+    while True:
+        suffix_array.sort(key=keys.__getitem__)
+
+        # Suffixes get the same rank as the suffix before them unless their keys differ
+        sorted_keys = array("q", map(keys.__getitem__, suffix_array))
+        changes = map(ne, islice(sorted_keys, 1, None), sorted_keys)
+        for position, position_rank in zip(
+            suffix_array, accumulate(chain((1,), changes))
+        ):
+            rank[position] = position_rank
+        if rank[suffix_array[-1]] == n:
+            return suffix_array
+
+        # Ranks are at most n, so the keys are below (n + 1) ** 2 and fit in 64 bits for any
+        # text that fits in memory
+        keys = _pack(rank, n + 1, k)
+        k *= 2
+
+
+def _pack(values: array, base: int, k: int) -> array:
+    # Packs each value with the value k places after it, or with 0 past the end of the text
+    return array(
+        "q",
+        map(
+            add,
+            map(mul, values, repeat(base)),
+            chain(islice(values, k, None), repeat(0)),
+        ),
+    )
+
+
+class FMIndex:
+    """An FM-index over a set of sequences.
+
+    Sequences are joined with SEPARATOR and the text is ended with TERMINATOR. Neither of them
+    matches a primer, so primer sites never span two sequences. The BWT is built over the upper
+    case text, so soft-masked regions are searched as well, while text keeps the original case of
+    the sequences. Sites are reported per sequence and are paired with the same code as
+    calculate_pcr_product, so the products, including the case of their sequences, are identical to
+    an exact search when max_mismatches is 0. See the module docstring for the size of reference
+    that an index can be built for.
+
+    Example
+    -------
+    >>> index = FMIndex.from_file("tests/test_data/sequences/met_r.fa")
+    >>> index.save("met_r.fmi")
+    >>> index = FMIndex.load("met_r.fmi")
+    >>> index.calculate(("forward", "GGAG"), ("reverse", "TAAT"), max_product_length=250)
+    """
+
+    def __init__(
+        self,
+        headers: List[str],
+        offsets: List[int],
+        text: str,
+        bwt: str,
+        sampled_suffixes: Dict[int, int],
+        sa_sample: int,
+        occ_sample: int,
+        checkpoints: Optional[Dict[str, array]] = None,
+    ) -> None:
+        self.headers = headers
+        self.offsets = offsets
+        self.text = text
+        self.bwt = bwt
+        self.sampled_suffixes = sampled_suffixes
+        self.sa_sample = sa_sample
+        self.occ_sample = occ_sample
+
+        self.alphabet = sorted(set(bwt))
+        self.first_rows: Dict[str, int] = {}
+        total = 0
+        for character in self.alphabet:
+            self.first_rows[character] = total
+            total += bwt.count(character)
+
+        if checkpoints is None:
+            checkpoints = {}
+            for character in self.alphabet:
+                counts = array("q", [0])
+                for block_start in range(0, len(bwt), occ_sample):
+                    counts.append(
+                        counts[-1]
+                        + bwt.count(character, block_start, block_start + occ_sample)
+                    )
+                checkpoints[character] = counts
+        self.checkpoints = checkpoints
+
+    @classmethod
+    def build(
+        cls,
+        sequences: Iterable[SequenceLike],
+        sa_sample: int = 32,
+        occ_sample: int = 64,
+    ) -> "FMIndex":
+        """Builds an index over FastaSequences or (header, sequence) tuples.
+
+        The sequences are indexed in upper case, so that soft-masked regions are searched as well,
+        but keep their case in the products.
+        """
+        if sa_sample < 1 or occ_sample < 1:
+            raise ValueError("sa_sample and occ_sample must be positive integers")
+
+        headers = []
+        offsets = []
+        parts = []
+        position = 0
+        for sequence in iter_sequences(sequences):
+            headers.append(sequence.header)
+            offsets.append(position)
+            parts.append(sequence.sequence)
+            position += len(sequence) + 1
+        text = SEPARATOR.join(parts) + TERMINATOR
+        folded_text = fold_case(text)
+
+        suffix_array = build_suffix_array(folded_text)
+        bwt = "".join([folded_text[i - 1] for i in suffix_array])
+        del folded_text
+        sampled_suffixes = {
+            row: text_position
+            for row, text_position in enumerate(suffix_array)
+            if text_position % sa_sample == 0
+        }
+
+        return cls(headers, offsets, text, bwt, sampled_suffixes, sa_sample, occ_sample)
+
+    @classmethod
+    def from_file(
+        cls, sequence_file: str, sa_sample: int = 32, occ_sample: int = 64
+    ) -> "FMIndex":
+        """Builds an index over the sequences in a fasta file."""
+        return cls.build(
+            read_sequences_from_file(sequence_file),
+            sa_sample=sa_sample,
+            occ_sample=occ_sample,
+        )
+
+    def save(self, index_file: str) -> None:
+        """Saves the index so it can be loaded again without rebuilding it.
+
+        The text isn't saved, since it can be recovered from the BWT, so the file holds the BWT, the
+        occurrence checkpoints, the sampled suffix array, and the soft-masked regions of the text.
+        """
+        metadata = json.dumps(
+            {
+                "headers": self.headers,
+                "offsets": self.offsets,
+                "sa_sample": self.sa_sample,
+                "occ_sample": self.occ_sample,
+                "alphabet": self.alphabet,
+            }
+        ).encode()
+        rows = array("q", sorted(self.sampled_suffixes))
+        positions = array("q", [self.sampled_suffixes[row] for row in rows])
+        checkpoints = array("q")
+        for character in self.alphabet:
+            checkpoints.extend(self.checkpoints[character])
+        soft_masked = array("q")
+        for match in SOFT_MASKED_REGEX.finditer(self.text):
+            soft_masked.extend(match.span())
+        with open(index_file, "wb") as fout:
+            fout.write(FMINDEX_MAGIC)
+            for block in (
+                metadata,
+                self.bwt.encode(),
+                rows.tobytes(),
+                positions.tobytes(),
+                checkpoints.tobytes(),
+                soft_masked.tobytes(),
+            ):
+                fout.write(struct.pack("<Q", len(block)))
+                fout.write(block)
+
+    @classmethod
+    def load(cls, index_file: str) -> "FMIndex":
+        """Loads an index saved with save.
+
+        The text is recovered by inverting the BWT, which takes under a second per megabase.
+        """
+        with open(index_file, "rb") as fin:
+            if fin.read(len(FMINDEX_MAGIC)) != FMINDEX_MAGIC:
+                raise ValueError(f"{index_file} is not an ispcr FM-index file")
+            blocks = []
+            for _ in range(6):
+                (block_size,) = struct.unpack("<Q", fin.read(8))
+                blocks.append(fin.read(block_size))
+
+        metadata = json.loads(blocks[0])
+        bwt = blocks[1].decode()
+        rows, positions = array("q"), array("q")
+        rows.frombytes(blocks[2])
+        positions.frombytes(blocks[3])
+        all_checkpoints, soft_masked = array("q"), array("q")
+        all_checkpoints.frombytes(blocks[4])
+        soft_masked.frombytes(blocks[5])
+
+        # Every character has one checkpoint per block of the BWT, plus the leading 0
+        checkpoint_count = -(-len(bwt) // metadata["occ_sample"]) + 1
+        checkpoints = {}
+        for i, character in enumerate(metadata["alphabet"]):
+            start = i * checkpoint_count
+            end = start + checkpoint_count
+            checkpoints[character] = all_checkpoints[start:end]
+        text = _restore_case(_invert_bwt(bwt), soft_masked)
+        return cls(
+            metadata["headers"],
+            metadata["offsets"],
+            text,
+            bwt,
+            dict(zip(rows, positions)),
+            metadata["sa_sample"],
+            metadata["occ_sample"],
+            checkpoints,
+        )
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    def sequence(self, i: int) -> FastaSequence:
+        """Returns the i-th sequence in the index."""
+        start = self.offsets[i]
+        if i + 1 < len(self.offsets):
+            end = self.offsets[i + 1] - 1
+        else:
+            end = len(self.text) - 1
+        return FastaSequence(self.headers[i], self.text[start:end])
+
+    def occurrences(self, character: str, row: int) -> int:
+        """Returns the number of times character appears in the first row rows of the BWT."""
+        checkpoints = self.checkpoints.get(character)
+        if checkpoints is None:
+            return 0
+        block = row // self.occ_sample
+        return int(checkpoints[block]) + self.bwt.count(
+            character, block * self.occ_sample, row
+        )
+
+    def _extend(self, character: str, low: int, high: int) -> Tuple[int, int]:
+        # Narrows the range of rows prefixed by a pattern to those prefixed by character + pattern
+        first_row = self.first_rows.get(character)
+        if first_row is None:
+            return 0, 0
+        return (
+            first_row + self.occurrences(character, low),
+            first_row + self.occurrences(character, high),
+        )
+
+    def _ranges(self, pattern: str, max_mismatches: int) -> List[Tuple[int, int]]:
+        # Backward search, backtracking into the other bases while mismatches remain
+        ranges = []
+        stack = [(len(pattern), 0, len(self.bwt), max_mismatches)]
+        while stack:
+            remaining, low, high, mismatches_left = stack.pop()
+            if remaining == 0:
+                ranges.append((low, high))
+                continue
+            character = pattern[remaining - 1]
+            candidates = MISMATCH_BASES if mismatches_left else character
+            if character not in candidates:
+                candidates += character
+            for candidate in candidates:
+                new_low, new_high = self._extend(candidate, low, high)
+                if new_low < new_high:
+                    stack.append(
+                        (
+                            remaining - 1,
+                            new_low,
+                            new_high,
+                            mismatches_left - (candidate != character),
+                        )
+                    )
+        return ranges
+
+    def _locate_row(self, row: int) -> int:
+        # Walks backwards through the text with LF-mapping until a sampled suffix is reached
+        steps = 0
+        while row not in self.sampled_suffixes:
+            character = self.bwt[row]
+            row = self.first_rows[character] + self.occurrences(character, row)
+            steps += 1
+        return self.sampled_suffixes[row] + steps
+
+    def count(self, pattern: str) -> int:
+        """Returns the number of exact occurrences of pattern in the indexed sequences."""
+        return sum(high - low for low, high in self._ranges(pattern, 0))
+
+    def locate(self, pattern: str, max_mismatches: int = 0) -> List[int]:
+        """Returns the sorted positions in the concatenated text where pattern occurs
+        with at most max_mismatches substitutions."""
+        if not pattern:
+            return []
+        return sorted(
+            self._locate_row(row)
+            for low, high in self._ranges(pattern, max_mismatches)
+            for row in range(low, high)
+        )
+
+    def primer_sites(
+        self,
+        primer: str,
+        max_mismatches: int = 0,
+        thermo: Union["ThermoFilter", None] = None,
+        reverse: bool = False,
+    ) -> Dict[int, List[int]]:
+        """Returns the sorted binding sites of a primer, keyed by the index of each sequence.
+
+        If thermo is given, only the sites that pass its thresholds are returned. Exact sites are
+        all the same duplex, so the primer is checked once, but sites with mismatches are each
+        scored by their own sequence in the text. reverse is whether primer is the reverse
+        complement of the primer, as with the primer at the end of a product.
+        """
+        if thermo is not None and not max_mismatches:
+            if not thermo.accepts_primer(primer, reverse):
+                return {}
+            thermo = None
+        positions = self.locate(primer, max_mismatches)
+        if thermo is not None:
+            positions = thermo.filter_sites(self.text, positions, len(primer), reverse)
+
+        sites: Dict[int, List[int]] = {}
+        for position in positions:
+            i = bisect_right(self.offsets, position) - 1
+            sites.setdefault(i, []).append(position - self.offsets[i])
+        return sites
+
+    def iter_products(
+        self,
+        forward_primer: SequenceLike,
+        reverse_primer: SequenceLike,
+        min_product_length: Union[int, None] = None,
+        max_product_length: Union[int, None] = None,
+        max_mismatches: int = 0,
+        thermo: Union["ThermoFilter", None] = None,
+    ) -> Iterator[PCRProduct]:
+        """Yields the products amplified by a pair of primers in the indexed sequences.
+
+        Primer sites are allowed up to max_mismatches substitutions each. Products are yielded in
+        the same order as get_pcr_products. If thermo is given, the sites that don't pass its
+        thresholds are dropped before they are paired (see primer_sites), so weak sites with
+        mismatches don't produce products.
+        """
+        forward_primer = as_fasta_sequence(forward_primer)
+        reverse_primer = as_fasta_sequence(reverse_primer)
+
+        all_forward_sites = self.primer_sites(
+            normalize_primer(forward_primer.sequence), max_mismatches, thermo
+        )
+        if not all_forward_sites:
+            return
+        all_reverse_sites = self.primer_sites(
+            primer_reverse_complement(reverse_primer.sequence),
+            max_mismatches,
+            thermo,
+            reverse=True,
+        )
+
+        for i in sorted(all_forward_sites.keys() & all_reverse_sites.keys()):
+            yield from products_from_sites(
+                self.sequence(i),
+                forward_primer,
+                reverse_primer,
+                all_forward_sites[i],
+                all_reverse_sites[i],
+                min_product_length,
+                max_product_length,
+            )
+
+    def calculate(
+        self,
+        forward_primer: SequenceLike,
+        reverse_primer: SequenceLike,
+        min_product_length: Union[int, None] = None,
+        max_product_length: Union[int, None] = None,
+        header: bool = True,
+        cols: str = "all",
+        max_mismatches: int = 0,
+        thermo: Union["ThermoFilter", None] = None,
+    ) -> str:
+        """Returns the products amplified by a pair of primers in the indexed sequences.
+
+        The arguments and the output are the same as SequenceDatabase.calculate.
+        """
+        return format_results(
+            self.iter_products(
+                forward_primer,
+                reverse_primer,
+                min_product_length,
+                max_product_length,
+                max_mismatches,
+                thermo,
+            ),
+            cols=cols,
+            header=header,
+        )
+
+
+def _invert_bwt(bwt: str) -> str:
+    # Recovers the text from its BWT by following the LF-mapping back from the row of the
+    # TERMINATOR suffix, which sorts first
+    next_rows: Dict[str, int] = {}
+    total = 0
+    for character in sorted(set(bwt)):
+        next_rows[character] = total
+        total += bwt.count(character)
+    lf = array("q", bytes(8 * len(bwt)))
+    for row, character in enumerate(bwt):
+        lf[row] = next_rows[character]
+        next_rows[character] += 1
+
+    characters = []
+    row = 0
+    for _ in range(len(bwt) - 1):
+        characters.append(bwt[row])
+        row = lf[row]
+    characters.reverse()
+    characters.append(TERMINATOR)
+    return "".join(characters)
+
+
+def _restore_case(text: str, soft_masked: array) -> str:
+    # Lower cases the (start, end) regions of the text, which are stored flattened
+    parts = []
+    previous_end = 0
+    for i in range(0, len(soft_masked), 2):
+        start, end = soft_masked[i], soft_masked[i + 1]
+        parts.append(text[previous_end:start])
+        parts.append(text[start:end].lower())
+        previous_end = end
+    parts.append(text[previous_end:])
+    return "".join(parts)
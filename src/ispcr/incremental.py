@@ -0,0 +1,210 @@
+"""
+Incremental re-runs against a sequence database that changes a little between runs.
+
+The results of every record are kept in a SQLite state file, keyed by a hash of the record's header and
+sequence. On the next run, only the records whose hash isn't in the state file are searched, the results
+of the others are read back from it, and the results of records that are no longer in the sequence file
+are dropped. The options of the run and the primers are hashed as well, and if they change, every record
+is searched again. The merged results are identical to those of a full run with get_pcr_products.
+
+Example
+-------
+>>> run = update_pcr_products("primers.fa", "sequences.fa", "primers.state.db")
+>>> print(f"Searched {run.searched} of {run.searched + run.reused} records")
+"""
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Set, Union
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import check_primers, iter_pcr_products, parse_orientations
+from ispcr.pipeline import prefetch
+from ispcr.sharding import read_shard_lines
+from ispcr.utils import (
+    format_output_line,
+    header_line,
+    parse_selected_cols,
+    read_fasta,
+    read_sequences_from_file,
+)
+
+if TYPE_CHECKING:
+    from ispcr.thermo import ThermoFilter
+
+# The size of the hashes that identify records and run options in the state file
+STATE_DIGEST_SIZE = 16
+
+
+@dataclass
+class IncrementalRun:
+    """The results of an incremental run, and how many records were searched to get them.
+
+    results is the same string that get_pcr_products returns. searched is the number of new or changed
+    records, reused is the number of records whose results were read from the state file, and removed
+    is the number of records in the state file that are no longer in the sequence file.
+    """
+
+    results: str
+    searched: int
+    reused: int
+    removed: int
+
+
+def _digest(data: str) -> bytes:
+    return hashlib.blake2b(data.encode(), digest_size=STATE_DIGEST_SIZE).digest()
+
+
+def _record_digest(sequence: FastaSequence) -> bytes:
+    return _digest(f"{sequence.header}\n{sequence.sequence}")
+
+
+def update_pcr_products(
+    primer_file: str,
+    sequence_file: str,
+    state_file: str,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    header: bool = True,
+    cols: str = "all",
+    output_file: Union[bool, str] = False,
+    header_pattern: Union[str, None] = None,
+    sequence_ids: Union[Iterable[str], None] = None,
+    orientations: Union[str, Iterable[str]] = "FR",
+    circular: Union[bool, str] = False,
+    ambiguous: str = "literal",
+    thermo: Union["ThermoFilter", None] = None,
+) -> IncrementalRun:
+    """Runs get_pcr_products, only searching the records that changed since the last run with the same state file.
+
+    Inputs
+    ------
+    state_file: str
+        The SQLite file holding the results of each record from the previous run. It is created if it doesn't
+        exist, and is updated to match sequence_file once the run finishes. If the run fails, the state file is
+        left as it was. Use a separate state file for each primer pair. Changing the primers or any of the
+        options that change the results of a record starts the state over, so every record is searched again.
+
+    All other arguments are the same as get_pcr_products. output_file is written with the merged results.
+
+    Outputs
+    -------
+    An IncrementalRun with the merged results, which are identical to the results of get_pcr_products with
+    the same arguments, and the number of records that were searched, reused, and removed.
+    """
+    forward_primer, reverse_primer = read_sequences_from_file(primer_file)
+    check_primers(forward_primer, reverse_primer, ambiguous)
+    orientations = parse_orientations(orientations)
+    column_indices = parse_selected_cols(cols, orientations != ("FR",))
+    fingerprint = _digest(
+        json.dumps(
+            [
+                forward_primer.header,
+                forward_primer.sequence,
+                reverse_primer.header,
+                reverse_primer.sequence,
+                min_product_length,
+                max_product_length,
+                column_indices,
+                orientations,
+                circular,
+                ambiguous,
+                repr(thermo),
+            ]
+        )
+    )
+
+    lines = [header_line(column_indices)] if header else []
+    seen: Set[bytes] = set()
+    searched = reused = 0
+
+    sequences = prefetch(
+        read_fasta(
+            read_shard_lines(sequence_file),
+            min_length=min_product_length,
+            header_pattern=header_pattern,
+            sequence_ids=sequence_ids,
+        )
+    )
+    connection = sqlite3.connect(state_file)
+    try:
+        _reset_if_changed(connection, fingerprint)
+        for sequence in sequences:
+            digest = _record_digest(sequence)
+            seen.add(digest)
+            row = connection.execute(
+                "SELECT lines FROM records WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is not None:
+                record_lines: str = row[0]
+                reused += 1
+            else:
+                record_lines = "\n".join(
+                    format_output_line(product.fields(), column_indices)
+                    for product in iter_pcr_products(
+                        sequence,
+                        forward_primer,
+                        reverse_primer,
+                        min_product_length,
+                        max_product_length,
+                        orientations,
+                        circular,
+                        ambiguous,
+                        thermo,
+                    )
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?)",
+                    (digest, record_lines),
+                )
+                searched += 1
+            if record_lines:
+                lines.append(record_lines)
+
+        removed = _remove_unseen(connection, seen)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        # Stops the reader thread if the search failed
+        sequences.close()
+        connection.close()
+
+    results = "\n".join(lines)
+    if isinstance(output_file, str):
+        with open(output_file, "w") as fout:
+            fout.write(results)
+
+    return IncrementalRun(results, searched, reused, removed)
+
+
+def _reset_if_changed(connection: sqlite3.Connection, fingerprint: bytes) -> None:
+    # Starts the state over if the primers or the options have changed since the last run
+    connection.execute("CREATE TABLE IF NOT EXISTS settings (fingerprint BLOB)")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS records (digest BLOB PRIMARY KEY, lines TEXT)"
+    )
+    row = connection.execute("SELECT fingerprint FROM settings").fetchone()
+    if row is not None and row[0] == fingerprint:
+        return
+    connection.execute("DELETE FROM settings")
+    connection.execute("DELETE FROM records")
+    connection.execute("INSERT INTO settings VALUES (?)", (fingerprint,))
+
+
+def _remove_unseen(connection: sqlite3.Connection, seen: Set[bytes]) -> int:
+    # Drops the records that are no longer in the sequence file and returns how many there were
+    connection.execute("CREATE TEMPORARY TABLE seen (digest BLOB PRIMARY KEY)")
+    connection.executemany(
+        "INSERT OR IGNORE INTO seen VALUES (?)", ((digest,) for digest in seen)
+    )
+    (removed,) = connection.execute(
+        "SELECT COUNT(*) FROM records WHERE digest NOT IN (SELECT digest FROM seen)"
+    ).fetchone()
+    connection.execute(
+        "DELETE FROM records WHERE digest NOT IN (SELECT digest FROM seen)"
+    )
+    connection.execute("DROP TABLE seen")
+    return int(removed)
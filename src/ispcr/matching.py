@@ -0,0 +1,387 @@
+"""
+This module contains the primer site search and pairing used during in silico PCR.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.normalize import (
+    find_degenerate_sites,
+    fold_case,
+    is_unambiguous,
+    normalize_primer,
+    primer_reverse_complement,
+)
+from ispcr.PCRProduct import PCRProduct
+
+if TYPE_CHECKING:
+    from ispcr.thermo import ThermoFilter
+
+# The primer at the start of the product followed by the primer at the end of it
+ORIENTATIONS = ("FR", "RF", "FF", "RR")
+
+
+def find_primer_sites(
+    sequence: str, primer: str, ambiguous: str = "literal"
+) -> List[int]:
+    """Returns the start positions of every exact match of a primer in a sequence.
+
+    Overlapping matches are all reported, and the positions are returned in ascending order.
+    The search is case-sensitive, so both strings should already be normalized (see
+    ispcr.normalize). If ambiguous is "expand", ambiguous bases in the primer match any
+    of the bases they stand for.
+
+    Example
+    -------
+    >>> find_primer_sites("AAAA", "AA")
+    [0, 1, 2]
+    """
+    sites: List[int] = []
+    if not primer:
+        return sites
+
+    if ambiguous == "expand" and not is_unambiguous(primer):
+        return find_degenerate_sites(sequence, primer)
+
+    position = sequence.find(primer)
+    while position != -1:
+        sites.append(position)
+        position = sequence.find(primer, position + 1)
+
+    return sites
+
+
+def check_primers(
+    forward_primer: FastaSequence,
+    reverse_primer: FastaSequence,
+    ambiguous: str = "literal",
+) -> None:
+    """Checks that a pair of primers can be searched for with an ambiguity policy.
+
+    Use it to fail before any files are opened, since iter_pcr_products only checks the primers
+    once it is given a sequence.
+
+    Raises
+    ------
+    ValueError
+        Raised if ambiguous is not one of ispcr.normalize.AMBIGUITY_POLICIES.
+
+    InvalidBaseError
+        Raised if either primer is rejected by ispcr.normalize.normalize_primer.
+    """
+    normalize_primer(forward_primer.sequence, ambiguous)
+    normalize_primer(reverse_primer.sequence, ambiguous)
+
+
+def pair_primer_sites(
+    forward_sites: Sequence[int],
+    reverse_sites: Sequence[int],
+    reverse_primer_length: int,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+) -> Iterator[Tuple[int, int]]:
+    """Pairs sorted forward and reverse primer sites into (start, end) product coordinates.
+
+    reverse_sites are the start positions of the reverse complement of the reverse primer. Since
+    both lists are sorted, the reverse sites that give a product in the desired size range for
+    a forward site are found with a binary search, so sites that are out of range are never visited.
+
+    Raises
+    ------
+    ValueError
+        Raised if min_product_length is larger than max_product_length.
+    """
+    _check_product_limits(min_product_length, max_product_length)
+
+    for forward_site in forward_sites:
+        first, last = _reverse_site_range(
+            forward_site,
+            reverse_sites,
+            reverse_primer_length,
+            min_product_length,
+            max_product_length,
+        )
+        for reverse_site in reverse_sites[first:last]:
+            yield forward_site, reverse_site + reverse_primer_length
+
+
+def count_paired_sites(
+    forward_sites: Sequence[int],
+    reverse_sites: Sequence[int],
+    reverse_primer_length: int,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+) -> int:
+    """Returns the number of products pair_primer_sites would yield without building them."""
+    _check_product_limits(min_product_length, max_product_length)
+    count = 0
+    for forward_site in forward_sites:
+        first, last = _reverse_site_range(
+            forward_site,
+            reverse_sites,
+            reverse_primer_length,
+            min_product_length,
+            max_product_length,
+        )
+        count += last - first
+    return count
+
+
+def _check_product_limits(
+    min_product_length: Union[int, None], max_product_length: Union[int, None]
+) -> None:
+    if (
+        min_product_length is not None
+        and max_product_length is not None
+        and max_product_length < min_product_length
+    ):
+        raise ValueError("min_product_length cannot be larger than max_product_length")
+
+
+def _reverse_site_range(
+    forward_site: int,
+    reverse_sites: Sequence[int],
+    reverse_primer_length: int,
+    min_product_length: Union[int, None],
+    max_product_length: Union[int, None],
+) -> Tuple[int, int]:
+    # Returns the slice of reverse_sites that form a product in the desired size range
+    lowest_site = forward_site
+    if min_product_length is not None:
+        lowest_site = max(
+            lowest_site, forward_site + min_product_length - reverse_primer_length
+        )
+    first = bisect_left(reverse_sites, lowest_site)
+
+    if max_product_length is None:
+        return first, len(reverse_sites)
+
+    highest_site = forward_site + max_product_length - reverse_primer_length
+    return first, max(first, bisect_right(reverse_sites, highest_site, lo=first))
+
+
+def parse_orientations(orientations: Union[str, Iterable[str]]) -> Tuple[str, ...]:
+    """Returns a tuple of orientations from either an iterable of orientations or a string.
+
+    A string can be "all" or any orientations separated by whitespace or commas, such as "FR FF".
+
+    Raises
+    ------
+    ValueError
+        Raised if any of the orientations is not one of ORIENTATIONS.
+    """
+    if isinstance(orientations, str):
+        if orientations == "all":
+            return ORIENTATIONS
+        orientations = orientations.replace(",", " ").split()
+
+    parsed = tuple(orientations)
+    for orientation in parsed:
+        if orientation not in ORIENTATIONS:
+            raise ValueError(
+                f"Invalid orientation: {orientation}. "
+                f"Options are {', '.join(ORIENTATIONS)}."
+            )
+    if not parsed:
+        raise ValueError("At least one orientation must be given")
+    return parsed
+
+
+def is_circular(sequence: FastaSequence, circular: Union[bool, str]) -> bool:
+    """Returns whether a sequence should be searched as a circular sequence.
+
+    circular is either a bool that applies to every sequence, or a regular expression that
+    marks the sequences whose header matches it as circular, such as "plasmid|mitochondri".
+    """
+    if isinstance(circular, str):
+        return re.search(circular, sequence.header) is not None
+    return circular
+
+
+def find_origin_sites(
+    sequence: str, primer: str, ambiguous: str = "literal"
+) -> List[int]:
+    """Returns the start positions of the matches of a primer that span the origin of a circular sequence.
+
+    Only the last len(primer) - 1 bases of the sequence joined to its first len(primer) - 1 bases are
+    searched, so the sequence is never copied. The sites are returned in ascending order and all lie
+    after the sites found by find_primer_sites.
+    """
+    overlap = len(primer) - 1
+    if overlap < 1 or len(sequence) <= overlap:
+        return []
+    junction = sequence[-overlap:] + sequence[:overlap]
+    offset = len(sequence) - overlap
+    return [offset + site for site in find_primer_sites(junction, primer, ambiguous)]
+
+
+def iter_pcr_products(
+    sequence: FastaSequence,
+    forward_primer: FastaSequence,
+    reverse_primer: FastaSequence,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    orientations: Union[str, Iterable[str]] = ("FR",),
+    circular: Union[bool, str] = False,
+    ambiguous: str = "literal",
+    thermo: Union["ThermoFilter", None] = None,
+) -> Iterator[PCRProduct]:
+    """Yields the products amplified by a pair of primers against a single sequence.
+
+    This is the generator behind calculate_pcr_product. It yields PCRProduct objects as they are
+    found instead of formatting them, so they can be passed straight on to a writer.
+
+    orientations selects which primer combinations to report. Each orientation names the primer
+    binding the plus strand at the start of the product followed by the primer whose reverse complement
+    binds at the end of it, so "FR" is the designed product, "RF" has the primers swapped, and "FF" and
+    "RR" are amplified by a single primer. The sites of each primer and its reverse complement are only
+    searched for once, no matter how many orientations are requested. Products are yielded grouped by
+    orientation in the order given.
+
+    If the sequence is circular (see is_circular), products that span the origin are also reported.
+    These have an end coordinate smaller than their start coordinate, measured from the origin. The
+    sites spanning the origin are found by searching a junction of twice the primer length, and the
+    sites near the start of the sequence are reused as sites past its end, so the sequence is never
+    copied. Products are never longer than the sequence itself.
+
+    Matching is case-insensitive, so primers are found in soft-masked regions, but the products keep
+    the case of the sequence. ambiguous sets how ambiguous bases in the primers are handled, and is
+    one of ispcr.normalize.AMBIGUITY_POLICIES. N and other ambiguous bases in the sequence only ever
+    match the same code in a primer.
+
+    If thermo is given, a primer that doesn't pass its thresholds isn't searched for, so no products
+    are built from it. Sites are exact matches, so this is a check of each primer rather than of each
+    site, except for degenerate primers with ambiguous="expand", whose sites are checked one by one
+    (see ispcr.thermo).
+    """
+    orientations = parse_orientations(orientations)
+    circular = is_circular(sequence, circular)
+    primers = {
+        "F": normalize_primer(forward_primer.sequence, ambiguous),
+        "R": normalize_primer(reverse_primer.sequence, ambiguous),
+    }
+
+    # A sequence shorter than the minimum product length can't produce any products,
+    # so there's no need to search it.
+    if min_product_length is not None and len(sequence) < min_product_length:
+        return
+
+    search_sequence = fold_case(sequence.sequence)
+    plus_sites: Dict[str, List[int]] = {}
+    minus_sites: Dict[str, List[int]] = {}
+
+    sequence_length = len(sequence)
+    if circular:
+        if max_product_length is None or max_product_length > sequence_length:
+            max_product_length = sequence_length
+        longest_product = max_product_length
+
+    for orientation in orientations:
+        left, right = orientation[0], orientation[1]
+        if left not in plus_sites:
+            plus_sites[left] = _search_sites(
+                search_sequence, primers[left], circular, ambiguous, thermo
+            )
+        if not plus_sites[left]:
+            continue
+        if right not in minus_sites:
+            minus_sites[right] = _search_sites(
+                search_sequence,
+                primer_reverse_complement(primers[right]),
+                circular,
+                ambiguous,
+                thermo,
+                reverse=True,
+            )
+
+        reverse_sites = minus_sites[right]
+        if circular:
+            # The sites at the start of the sequence also bind past its end, but only those
+            # close enough to the origin can end a product that is within the size limit
+            right_length = len(primers[right])
+            reverse_sites = reverse_sites + [
+                site + sequence_length
+                for site in reverse_sites
+                if site + right_length <= longest_product
+            ]
+
+        yield from products_from_sites(
+            sequence,
+            forward_primer,
+            reverse_primer,
+            plus_sites[left],
+            reverse_sites,
+            min_product_length,
+            max_product_length,
+            orientation,
+        )
+
+
+def _search_sites(
+    sequence: str,
+    primer: str,
+    circular: bool,
+    ambiguous: str,
+    thermo: Union["ThermoFilter", None],
+    reverse: bool = False,
+) -> List[int]:
+    # The sites of a primer, including those spanning the origin if the sequence is circular,
+    # that pass the thermodynamic thresholds. reverse is whether primer is a reverse complement.
+    # Every site of a primer that can't match more than one sequence is a copy of the primer,
+    # so the primer is checked once instead of each of its sites.
+    exact = ambiguous != "expand" or is_unambiguous(primer)
+    if thermo is not None and exact and not thermo.accepts_primer(primer, reverse):
+        return []
+    sites = find_primer_sites(sequence, primer, ambiguous)
+    if circular:
+        sites.extend(find_origin_sites(sequence, primer, ambiguous))
+    if thermo is not None and not exact:
+        sites = thermo.filter_sites(sequence, sites, len(primer), reverse)
+    return sites
+
+
+def products_from_sites(
+    sequence: FastaSequence,
+    forward_primer: FastaSequence,
+    reverse_primer: FastaSequence,
+    forward_sites: Sequence[int],
+    reverse_sites: Sequence[int],
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    orientation: str = "FR",
+) -> Iterator[PCRProduct]:
+    """Yields the products formed by pairing primer sites that have already been found in a sequence.
+
+    This allows callers that find or cache primer sites in other ways to share the pairing and the
+    construction of the products with iter_pcr_products. forward_sites and reverse_sites are the sites
+    at the start and end of the product for the given orientation.
+
+    Products that end past the end of the sequence are treated as wrapping around the origin of a
+    circular sequence, and their end coordinate is measured from the origin.
+    """
+    right_primer = forward_primer if orientation[1] == "F" else reverse_primer
+    sequence_length = len(sequence)
+    for start, end in pair_primer_sites(
+        forward_sites,
+        reverse_sites,
+        len(right_primer),
+        min_product_length,
+        max_product_length,
+    ):
+        product_length = end - start
+        if end > sequence_length:
+            end -= sequence_length
+            product_sequence = sequence.sequence[start:] + sequence.sequence[:end]
+        else:
+            product_sequence = sequence.sequence[start:end]
+        yield PCRProduct(
+            forward_primer.header,
+            reverse_primer.header,
+            start,
+            end,
+            product_length,
+            sequence.header,
+            product_sequence,
+            orientation,
+        )
@@ -0,0 +1,157 @@
+"""
+Cross-pairing of every primer in a multiplex panel with every other primer.
+"""
+from dataclasses import dataclass, field
+from typing import Iterable, List, Union
+
+from ispcr.matching import (
+    count_paired_sites,
+    find_primer_sites,
+    products_from_sites,
+)
+from ispcr.normalize import fold_case, normalize_primer, primer_reverse_complement
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import (
+    SequenceLike,
+    as_fasta_sequence,
+    iter_sequences,
+    open_fasta,
+    read_fasta,
+    read_sequences_from_file,
+)
+
+
+@dataclass
+class CrossPairResult:
+    """The results of cross-pairing a panel of primers.
+
+    counts[i][j] is the number of products amplified with primers[i] as the forward primer and
+    primers[j] as the reverse primer. products is only filled in if it was requested.
+    """
+
+    primers: List[str]
+    counts: List[List[int]]
+    products: List[PCRProduct] = field(default_factory=list)
+
+    def matrix(self) -> str:
+        """Returns the counts as a tab-separated matrix with forward primers as rows and
+        reverse primers as columns."""
+        lines = ["\t".join(["forward_primer"] + self.primers)]
+        for primer, row in zip(self.primers, self.counts):
+            lines.append("\t".join([primer] + [str(count) for count in row]))
+        return "\n".join(lines)
+
+
+def cross_pair_products(
+    primers: Iterable[SequenceLike],
+    targets: Iterable[Union[SequenceLike, bytes, bytearray, memoryview]],
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    keep_products: bool = False,
+) -> CrossPairResult:
+    """Finds the products amplified by every forward primer combined with every reverse primer.
+
+    This is meant for catching cross-amplification in multiplex panels. Each primer is used both as
+    a forward primer and, through its reverse complement, as a reverse primer, including paired with
+    itself. The binding sites of each primer are only searched for once per target, and every pair
+    of site lists is then combined with the same bounded pairing as calculate_pcr_product.
+
+    Inputs
+    ------
+    primers: Iterable[FastaSequence | Tuple[str, str]]
+        The primers in the panel, as FastaSequences or (header, sequence) tuples.
+
+    targets: Iterable[FastaSequence | Tuple[str, str] | bytes]
+        The sequences to test the primers against. See batch_pcr_products.
+
+    min_product_length: None | int
+        If provided, only count those products whose length are greater than or equal to this number.
+
+    max_product_length: None | int
+        If provided, only count those products whose length are less than or equal to this number.
+
+    keep_products: bool
+        Whether or not to return the individual products as well as their counts. Defaults to False,
+        in which case the products are counted without being built.
+
+    Outputs
+    -------
+    A CrossPairResult holding the N x N product count matrix and, optionally, the products.
+    """
+    panel = [as_fasta_sequence(primer) for primer in primers]
+    site_sequences = [normalize_primer(primer.sequence) for primer in panel]
+    reverse_complements = [
+        primer_reverse_complement(primer.sequence) for primer in panel
+    ]
+    result = CrossPairResult(
+        primers=[primer.header for primer in panel],
+        counts=[[0] * len(panel) for _ in panel],
+    )
+
+    for sequence in iter_sequences(targets):
+        if min_product_length is not None and len(sequence) < min_product_length:
+            continue
+
+        search_sequence = fold_case(sequence.sequence)
+        forward_sites = [
+            find_primer_sites(search_sequence, site_sequence)
+            for site_sequence in site_sequences
+        ]
+        reverse_sites = [
+            find_primer_sites(search_sequence, reverse_site_sequence)
+            for reverse_site_sequence in reverse_complements
+        ]
+
+        for i, forward_primer in enumerate(panel):
+            if not forward_sites[i]:
+                continue
+            for j, reverse_primer in enumerate(panel):
+                if not reverse_sites[j]:
+                    continue
+                if keep_products:
+                    new_products = list(
+                        products_from_sites(
+                            sequence,
+                            forward_primer,
+                            reverse_primer,
+                            forward_sites[i],
+                            reverse_sites[j],
+                            min_product_length,
+                            max_product_length,
+                        )
+                    )
+                    result.products.extend(new_products)
+                    result.counts[i][j] += len(new_products)
+                else:
+                    result.counts[i][j] += count_paired_sites(
+                        forward_sites[i],
+                        reverse_sites[j],
+                        len(reverse_primer),
+                        min_product_length,
+                        max_product_length,
+                    )
+
+    return result
+
+
+def get_cross_pair_products(
+    primer_file: str,
+    sequence_file: str,
+    min_product_length: Union[int, None] = None,
+    max_product_length: Union[int, None] = None,
+    keep_products: bool = False,
+) -> CrossPairResult:
+    """Same as cross_pair_products, but reads the primers and targets from fasta files.
+
+    Unlike get_pcr_products, the primer file can contain any number of primers. Both files can be
+    gzip compressed.
+    """
+    primers = read_sequences_from_file(primer_file)
+    with open_fasta(sequence_file) as fin:
+        return cross_pair_products(
+            primers,
+            read_fasta(fin, min_length=min_product_length),
+            min_product_length=min_product_length,
+            max_product_length=max_product_length,
+            keep_products=keep_products,
+        )
@@ -0,0 +1,133 @@
+"""
+Normalization of primers and target sequences before they are searched.
+
+Everything here is built on str.translate tables, which run in C, so that normalizing a sequence
+never loops over its bases in Python.
+"""
+import re
+from functools import lru_cache
+from typing import List, Pattern
+
+# The bases that each IUPAC nucleotide code stands for
+IUPAC_BASES = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "T",
+    "R": "AG",
+    "Y": "CT",
+    "S": "CG",
+    "W": "AT",
+    "K": "GT",
+    "M": "AC",
+    "B": "CGT",
+    "D": "AGT",
+    "H": "ACT",
+    "V": "ACG",
+    "N": "ACGT",
+}
+
+_CODES = "ACGTRYSWKMBDHVN"
+_COMPLEMENTS = "TGCAYRSWMKVHDBN"
+
+# Complements every IUPAC code, keeping its case
+COMPLEMENT_TABLE = str.maketrans(
+    _CODES + _CODES.lower(), _COMPLEMENTS + _COMPLEMENTS.lower()
+)
+# Complements A, C, G, T, and N only, keeping their case
+DNA_COMPLEMENT_TABLE = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+
+# Deleting the supported characters leaves only the unsupported ones behind
+UNAMBIGUOUS_DELETE_TABLE = str.maketrans("", "", "ACGT")
+IUPAC_DELETE_TABLE = str.maketrans("", "", _CODES)
+DNA_DELETE_TABLE = str.maketrans("", "", "ACGTNacgtn")
+
+# How ambiguous bases in primers are handled:
+#   literal - they are compared letter for letter, so they only match the same code in a target
+#   expand - they match any of the bases they stand for
+#   error - primers containing them are rejected
+AMBIGUITY_POLICIES = ("literal", "expand", "error")
+
+
+class InvalidBaseError(ValueError):
+    pass
+
+
+def fold_case(sequence: str) -> str:
+    """Returns a sequence in upper case.
+
+    Soft-masked (lower case) bases have to be upper cased to be matched by upper case primers.
+    Sequences that are already in upper case are returned as they are instead of being copied,
+    so fully upper case references don't pay for the case-insensitive search.
+    """
+    if sequence.isupper():
+        return sequence
+    return sequence.upper()
+
+
+def check_ambiguity_policy(ambiguous: str) -> None:
+    """Raises a ValueError if ambiguous is not one of AMBIGUITY_POLICIES."""
+    if ambiguous not in AMBIGUITY_POLICIES:
+        raise ValueError(
+            f"Invalid ambiguous base policy: {ambiguous}. "
+            f"Options are {', '.join(AMBIGUITY_POLICIES)}."
+        )
+
+
+@lru_cache(maxsize=1024)
+def normalize_primer(primer: str, ambiguous: str = "literal") -> str:
+    """Returns a primer in upper case after checking its bases against an ambiguity policy.
+
+    Raises
+    ------
+    InvalidBaseError
+        Raised if the primer contains a character that is not an IUPAC nucleotide code, or
+        if it contains an ambiguous base and ambiguous is "error".
+    """
+    check_ambiguity_policy(ambiguous)
+    primer = primer.upper()
+    unsupported = primer.translate(IUPAC_DELETE_TABLE)
+    if unsupported:
+        raise InvalidBaseError(f"Base {unsupported[0]} not supported in {primer}")
+    if ambiguous == "error" and not is_unambiguous(primer):
+        raise InvalidBaseError(
+            f"{primer} contains ambiguous bases: {primer.translate(UNAMBIGUOUS_DELETE_TABLE)}"
+        )
+    return primer
+
+
+@lru_cache(maxsize=1024)
+def primer_reverse_complement(primer: str) -> str:
+    """Returns the reverse complement of a primer in upper case, including any ambiguous bases.
+
+    The results are cached, since the same primers are complemented for every target sequence.
+
+    Raises
+    ------
+    InvalidBaseError
+        Raised if the primer contains a character that is not an IUPAC nucleotide code.
+    """
+    return normalize_primer(primer).translate(COMPLEMENT_TABLE)[::-1]
+
+
+def is_unambiguous(primer: str) -> bool:
+    """Returns True if a primer only contains A, C, G, and T."""
+    return not primer.upper().translate(UNAMBIGUOUS_DELETE_TABLE)
+
+
+@lru_cache(maxsize=1024)
+def degenerate_pattern(primer: str) -> Pattern:
+    """Returns a regular expression matching every sequence that a degenerate primer stands for.
+
+    The pattern is a lookahead, so that overlapping matches are all found by finditer.
+    """
+    pattern = []
+    for base in normalize_primer(primer):
+        bases = IUPAC_BASES[base]
+        pattern.append(bases if len(bases) == 1 else f"[{bases}]")
+    return re.compile(f"(?=({''.join(pattern)}))")
+
+
+def find_degenerate_sites(sequence: str, primer: str) -> List[int]:
+    """Returns the start positions of every match of a degenerate primer in an upper case sequence."""
+    return [match.start() for match in degenerate_pattern(primer).finditer(sequence)]
@@ -0,0 +1,193 @@
+"""
+Bounded-queue pipelines that overlap reading, searching, and writing.
+
+get_pcr_products and write_pcr_products run as three stages: a reader thread reads, decompresses, and
+parses the sequence file, the calling thread searches the sequences, and a writer thread writes the
+results out. The stages are connected by bounded queues, so a stage that gets ahead of the next one
+blocks instead of buffering the whole file in memory. Reading and writing files and decompressing them
+release the GIL, so their latency is hidden behind the search.
+"""
+import queue
+import threading
+from types import TracebackType
+from typing import (
+    Any,
+    Callable,
+    Generator,
+    Generic,
+    Iterable,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+DEFAULT_QUEUE_SIZE = 64
+# The number of results that are passed to the writer thread at a time
+DEFAULT_BATCH_SIZE = 1024
+# How often a blocked stage checks whether the other end of its queue has stopped
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    # Carries an exception from a background thread to the thread that is waiting on it
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+def _put(items: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    # Blocks until there is room in the queue, unless the other end has stopped
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def check_queue_size(maxsize: int) -> None:
+    """Raises a ValueError if maxsize is not a valid size for the queues of a pipeline."""
+    if maxsize < 1:
+        raise ValueError("The queue size must be a positive integer")
+
+
+def prefetch(
+    iterable: Iterable[T], maxsize: int = DEFAULT_QUEUE_SIZE
+) -> Generator[T, None, None]:
+    """Yields the items of an iterable that is consumed in a background thread.
+
+    The thread stays at most maxsize items ahead of the caller. Exceptions raised while consuming
+    the iterable are raised again in the caller, and the thread is stopped if the caller stops
+    iterating early. The thread only starts on the first item, and is only stopped once the generator
+    is closed, so close it (for example with contextlib.closing) if the caller can stop early.
+
+    Example
+    -------
+    >>> with open("sequences.fa") as fin, closing(prefetch(read_fasta(fin))) as sequences:
+    ...     for sequence in sequences:
+    ...         print(sequence.header)
+    """
+    check_queue_size(maxsize)
+    items: "queue.Queue[Any]" = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def produce() -> None:
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not _put(items, item, stop):
+                    return
+            _put(items, _DONE, stop)
+        except BaseException as e:
+            _put(items, _Failure(e), stop)
+        finally:
+            # Generators have to be closed by the thread that runs them
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name="ispcr-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class BackgroundConsumer(Generic[T]):
+    """Passes items to a function in a background thread, such as the write method of a file.
+
+    put blocks once maxsize items are waiting, so the caller can't get arbitrarily far ahead of
+    the consumer. Exceptions raised by the consumer are raised again by the next call to put or by
+    close. Use it as a context manager to make sure that every item is consumed.
+
+    If finish is given, it is called in the background thread once every item has been consumed,
+    or once the consumer has failed. Use it to close resources that have to be closed by the
+    thread that used them, such as SQLite connections.
+
+    Example
+    -------
+    >>> with open("results.tsv", "w") as fout, BackgroundConsumer(fout.write) as output:
+    ...     output.put("forward_primer\treverse_primer")
+    """
+
+    def __init__(
+        self,
+        consume: Callable[[T], Any],
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        finish: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        check_queue_size(maxsize)
+        self._consume = consume
+        self._finish = finish
+        self._items: "queue.Queue[Any]" = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name="ispcr-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                item = self._items.get()
+                if item is _DONE:
+                    break
+                self._consume(item)
+        except BaseException as e:
+            self._error = e
+            self._stop.set()
+        finally:
+            self._run_finish()
+
+    def _run_finish(self) -> None:
+        # An error from finish is only reported if the consumer itself didn't fail
+        if self._finish is None:
+            return
+        try:
+            self._finish()
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def put(self, item: T) -> None:
+        if not _put(self._items, item, self._stop):
+            self._raise_error()
+
+    def close(self) -> None:
+        """Waits for every item to be consumed."""
+        _put(self._items, _DONE, self._stop)
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self) -> "BackgroundConsumer[T]":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Still write out what was found so far, but don't hide the original error
+            _put(self._items, _DONE, self._stop)
+            self._thread.join()
@@ -0,0 +1,100 @@
+"""
+A cheap k-mer prefilter used to skip target sequences that cannot be amplified.
+"""
+from typing import FrozenSet, Iterable, List, Set, Tuple
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.normalize import fold_case, normalize_primer, primer_reverse_complement
+
+DEFAULT_KMER_SIZE = 12
+
+
+class PrimerKmerFilter:
+    """Rejects target sequences that are missing the 3'-terminal k-mers of a primer pair.
+
+    A product can only be amplified from a target that contains the forward primer and the
+    reverse complement of the reverse primer, so a target that is missing either of their
+    3'-terminal k-mers can be skipped without running the full search. The check never
+    rejects a target that would have produced a product, so the final results are unchanged.
+
+    The filter is made up of groups of k-mers. A target passes the filter if every k-mer
+    of at least one group is present in it.
+
+    Example
+    -------
+    >>> kmer_filter = PrimerKmerFilter.from_primers(forward_primer, reverse_primer)
+    >>> kmer_filter.accepts("GGAGCATGCTATGTCGTAGCTGATGCAATTA")
+    True
+    """
+
+    def __init__(self, groups: Iterable[Iterable[str]]) -> None:
+        self.groups: Tuple[FrozenSet[str], ...] = tuple(
+            frozenset(group) for group in groups
+        )
+        self.kmers: FrozenSet[str] = frozenset().union(*self.groups)
+        self.overlap = max((len(kmer) for kmer in self.kmers), default=1) - 1
+
+    @classmethod
+    def from_primers(
+        cls,
+        forward_primer: FastaSequence,
+        reverse_primer: FastaSequence,
+        k: int = DEFAULT_KMER_SIZE,
+        orientations: Iterable[str] = ("FR",),
+    ) -> "PrimerKmerFilter":
+        """Builds a filter from the 3'-terminal k-mers of a forward and reverse primer.
+
+        The 3' end of the primer at the end of a product binds the plus strand as the first k bases
+        of its reverse complement, so that is the k-mer that is looked for in the target. There is
+        one group of k-mers for each orientation (see iter_pcr_products).
+        """
+        primers = {
+            "F": normalize_primer(forward_primer.sequence),
+            "R": normalize_primer(reverse_primer.sequence),
+        }
+        groups = []
+        for orientation in orientations:
+            left, right = orientation[0], orientation[1]
+            left_kmer = terminal_kmer(primers[left], k)
+            right_kmer = primer_reverse_complement(terminal_kmer(primers[right], k))
+            groups.append([left_kmer, right_kmer])
+        return cls(groups)
+
+    def accepts(self, sequence: str) -> bool:
+        """Returns True if the sequence contains every k-mer of at least one group, ignoring case."""
+        sequence = fold_case(sequence)
+        found = {kmer for kmer in self.kmers if kmer in sequence}
+        return self._any_group_found(found)
+
+    def accepts_lines(self, lines: List[str]) -> bool:
+        """Same as accepts, but checks the lines of a fasta record without joining them.
+
+        The last few bases of each line are carried over to the next one so that k-mers
+        spanning a line break are still found.
+        """
+        remaining = set(self.kmers)
+        found: Set[str] = set()
+        tail = ""
+        overlap = self.overlap
+        for line in lines:
+            window = tail + fold_case(line)
+            for kmer in remaining:
+                if kmer in window:
+                    found.add(kmer)
+            if found:
+                remaining -= found
+                if self._any_group_found(found):
+                    return True
+            tail = window[-overlap:] if overlap else ""
+        return self._any_group_found(found)
+
+    def _any_group_found(self, found: Iterable[str]) -> bool:
+        found_kmers = set(found)
+        return any(group <= found_kmers for group in self.groups)
+
+
+def terminal_kmer(sequence: str, k: int = DEFAULT_KMER_SIZE) -> str:
+    """Returns the last k bases of a sequence, or the entire sequence if it is shorter than k."""
+    if k < 1:
+        raise ValueError("k must be a positive integer")
+    return sequence[-k:]
@@ -0,0 +1,141 @@
+"""
+A file-backed container for in silico PCR results that keeps memory use under a budget.
+"""
+import shutil
+import sys
+from types import TracebackType
+from typing import IO, Iterable, Iterator, List, Optional, Type
+
+# The approximate memory used by each line on top of its characters: the string object
+# itself and its pointer in the list holding it
+LINE_OVERHEAD = sys.getsizeof("") + 8
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+class PCRResults:
+    """The lines of a set of results, kept in memory up to a memory budget.
+
+    Once the lines held in memory take up more than memory_budget bytes, they are moved to the end
+    of a temporary file and memory is freed again, so a run that produces tens of millions of products
+    never holds more than the budget in memory. The lines are always read back out in the order they
+    were added. The temporary file is deleted when the results are closed.
+
+    The results can be iterated over line by line or written out to a file with write, neither of which
+    reads the whole temporary file into memory at once, or joined into a single string with getvalue.
+
+    Example
+    -------
+    >>> with get_pcr_results("primers.fa", "sequences.fa", memory_budget=2**20) as results:
+    ...     for line in results:
+    ...         print(line)
+    """
+
+    def __init__(
+        self, memory_budget: Optional[int] = None, temp_dir: Optional[str] = None
+    ) -> None:
+        if memory_budget is not None and memory_budget < 0:
+            raise ValueError("memory_budget cannot be negative")
+        self.memory_budget = memory_budget
+        self.temp_dir = temp_dir
+        self._lines: List[str] = []
+        self._buffered_size = 0
+        self._spill_file: Optional[IO[str]] = None
+        self._spilled_count = 0
+
+    @property
+    def spilled(self) -> bool:
+        """Whether any lines have been moved to the temporary file."""
+        return self._spilled_count > 0
+
+    def __len__(self) -> int:
+        return self._spilled_count + len(self._lines)
+
+    def extend(self, lines: Iterable[str]) -> None:
+        """Adds lines to the end of the results, spilling them to disk if they pass the budget."""
+        for line in lines:
+            self._lines.append(line)
+            self._buffered_size += len(line) + LINE_OVERHEAD
+        if self.memory_budget is not None and self._buffered_size > self.memory_budget:
+            self._spill()
+
+    def _spill(self) -> None:
+        if not self._lines:
+            return
+        if self._spill_file is None:
+            # Most runs never spill, so tempfile is only imported when one does
+            import tempfile
+
+            self._spill_file = tempfile.TemporaryFile(
+                "w+", prefix="ispcr_", suffix=".tsv", dir=self.temp_dir
+            )
+        # Lines are separated rather than terminated by newlines, like the joined results
+        if self._spilled_count:
+            self._spill_file.write("\n")
+        self._spill_file.write("\n".join(self._lines))
+        self._spilled_count += len(self._lines)
+        self._lines = []
+        self._buffered_size = 0
+
+    def _rewound_spill_file(self) -> IO[str]:
+        # Finishes off any writes and goes back to the start of the spilled lines
+        assert self._spill_file is not None
+        self._spill_file.flush()
+        self._spill_file.seek(0)
+        return self._spill_file
+
+    def __iter__(self) -> Iterator[str]:
+        if self.spilled:
+            spill_file = self._rewound_spill_file()
+            for line in spill_file:
+                yield line.rstrip("\n")
+            spill_file.seek(0, 2)
+        yield from self._lines
+
+    def write_to(self, fout: IO[str]) -> None:
+        """Writes the results to an open file, separated by newlines."""
+        if self.spilled:
+            spill_file = self._rewound_spill_file()
+            shutil.copyfileobj(spill_file, fout)
+            spill_file.seek(0, 2)
+            if self._lines:
+                fout.write("\n")
+        fout.write("\n".join(self._lines))
+
+    def write(self, output_file: str) -> None:
+        """Writes the results to a file, separated by newlines, in the same format as get_pcr_products."""
+        with open(output_file, "w") as fout:
+            self.write_to(fout)
+
+    def getvalue(self) -> str:
+        """Returns the results joined into a single string, the same as get_pcr_products."""
+        if not self.spilled:
+            return "\n".join(self._lines)
+        spill_file = self._rewound_spill_file()
+        spilled = spill_file.read()
+        spill_file.seek(0, 2)
+        if not self._lines:
+            return spilled
+        return "\n".join([spilled] + self._lines)
+
+    def __str__(self) -> str:
+        return self.getvalue()
+
+    def close(self) -> None:
+        """Deletes the temporary file. The results can't be read after they are closed."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self._lines = []
+        self._spilled_count = 0
+
+    def __enter__(self) -> "PCRResults":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
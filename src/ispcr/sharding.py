@@ -0,0 +1,191 @@
+"""
+Splitting a search across several processes or nodes, and merging their outputs back together.
+
+A fasta file is split into shard_count byte ranges of nearly the same size, and every record belongs
+to the shard in which its header line starts. Each node only needs the path to the file and its own
+shard index to find its records, so no index file or coordination between the nodes is needed, and
+every node gets a similar number of bases to search. Shards are numbered in file order, so merging
+their outputs in shard order gives the same output as a single run.
+
+Example
+-------
+On each of 4 nodes, with i from 0 to 3:
+>>> write_pcr_products(primer_file, sequence_file, f"shard_{i}.tsv", shard_index=i, shard_count=4)
+
+Then, once every node is done:
+>>> merge_shard_outputs([f"shard_{i}.tsv" for i in range(4)], "results.tsv")
+"""
+import os
+import shutil
+from typing import Iterator, Sequence, Tuple
+
+from ispcr.utils import is_gzipped, open_fasta
+
+# The output formats whose shard outputs can be merged
+MERGE_FORMATS = ("tsv", "bed", "sqlite", "columnar")
+# The size of the chunks that shard outputs are copied in
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def shard_byte_range(
+    file_size: int, shard_index: int, shard_count: int
+) -> Tuple[int, int]:
+    """Returns the [start, end) byte range of a shard of a file.
+
+    Raises
+    ------
+    ValueError
+        Raised if shard_count is not positive or shard_index is not between 0 and shard_count - 1.
+    """
+    if shard_count < 1:
+        raise ValueError("shard_count must be a positive integer")
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(
+            f"shard_index must be between 0 and {shard_count - 1}, got {shard_index}"
+        )
+    return (
+        file_size * shard_index // shard_count,
+        file_size * (shard_index + 1) // shard_count,
+    )
+
+
+def read_shard_lines(
+    sequence_file: str, shard_index: int = 0, shard_count: int = 1
+) -> Iterator[str]:
+    """Yields the lines of the fasta records that belong to one shard of a file.
+
+    The file is read from the start of the shard's byte range up to the first header line past its
+    end, so each node only reads its own shard. The lines can be passed on to read_fasta.
+
+    Gzip compressed files can be read, but can't be split into more than one shard since
+    they can't be read from the middle.
+    """
+    start, end = shard_byte_range(
+        os.path.getsize(sequence_file), shard_index, shard_count
+    )
+    if shard_count == 1:
+        with open_fasta(sequence_file) as fin:
+            yield from fin
+        return
+    if is_gzipped(sequence_file):
+        raise ValueError(f"{sequence_file} is gzip compressed and can't be sharded")
+    yield from read_byte_range_lines(sequence_file, start, end)
+
+
+def read_byte_range_lines(sequence_file: str, start: int, end: int) -> Iterator[str]:
+    """Yields the lines of the fasta records whose header line starts in the [start, end) byte
+    range of an uncompressed file, including the lines of the last record past end."""
+    with open(sequence_file, "rb") as fin:
+        position = 0
+        if start > 0:
+            # Skip ahead to the first line that starts inside of the range
+            fin.seek(start - 1)
+            position = start - 1 + len(fin.readline())
+
+        in_range = False
+        for line in fin:
+            if line.startswith(b">"):
+                if position >= end:
+                    break
+                in_range = True
+            if in_range:
+                yield line.decode()
+            position += len(line)
+
+
+def merge_shard_outputs(
+    shard_files: Sequence[str],
+    output_file: str,
+    output_format: str = "tsv",
+    header: bool = True,
+) -> None:
+    """Merges the outputs of the shards of a run into a single output file.
+
+    Inputs
+    ------
+    shard_files: Sequence[str]
+        The output files of the shards, in shard order.
+
+    output_file: str
+        The file to write the merged results to. This will overwrite the file.
+
+    output_format: str
+        The format of the shard outputs, one of MERGE_FORMATS. The dedup format can't be merged, since
+        each shard numbers its amplicons on its own.
+
+    header: bool
+        Whether or not the tsv shard outputs were written with a header. The header is only
+        written out once. Defaults to True.
+
+    A merged tsv file is identical to the output file of a single run with the same options. The
+    other formats contain the same products in the same order.
+    """
+    if output_format == "tsv":
+        _merge_tsv(shard_files, output_file, header)
+    elif output_format == "bed":
+        _merge_files(shard_files, output_file, b"")
+    elif output_format == "columnar":
+        # The writers are only needed for merging, so they aren't imported with the reader
+        from ispcr.writers import COLUMNAR_MAGIC
+
+        _merge_files(shard_files, output_file, COLUMNAR_MAGIC)
+    elif output_format == "sqlite":
+        _merge_sqlite(shard_files, output_file)
+    else:
+        raise ValueError(
+            f"Invalid output format: {output_format}. "
+            f"Options are {', '.join(MERGE_FORMATS)}."
+        )
+
+
+def _merge_tsv(shard_files: Sequence[str], output_file: str, header: bool) -> None:
+    # Shard outputs are separated rather than terminated by newlines, so one is added
+    # between every non-empty piece.
+    written = False
+    with open(output_file, "w") as fout:
+        for i, shard_file in enumerate(shard_files):
+            with open(shard_file) as fin:
+                if header:
+                    header_line = fin.readline().rstrip("\n")
+                    if i == 0:
+                        fout.write(header_line)
+                        written = True
+                chunk = fin.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    continue
+                if written:
+                    fout.write("\n")
+                fout.write(chunk)
+                shutil.copyfileobj(fin, fout, COPY_CHUNK_SIZE)
+                written = True
+
+
+def _merge_files(shard_files: Sequence[str], output_file: str, magic: bytes) -> None:
+    # Concatenates files that start with the same magic bytes, keeping only the first copy
+    with open(output_file, "wb") as fout:
+        fout.write(magic)
+        for shard_file in shard_files:
+            with open(shard_file, "rb") as fin:
+                if fin.read(len(magic)) != magic:
+                    raise ValueError(f"{shard_file} is not a valid shard output")
+                shutil.copyfileobj(fin, fout, COPY_CHUNK_SIZE)
+
+
+def _merge_sqlite(shard_files: Sequence[str], output_file: str) -> None:
+    import sqlite3
+
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    if not shard_files:
+        return
+    shutil.copyfile(shard_files[0], output_file)
+    connection = sqlite3.connect(output_file)
+    try:
+        for shard_file in shard_files[1:]:
+            connection.execute("ATTACH DATABASE ? AS shard", (shard_file,))
+            connection.execute("INSERT INTO products SELECT * FROM shard.products")
+            connection.commit()
+            connection.execute("DETACH DATABASE shard")
+        connection.commit()
+    finally:
+        connection.close()
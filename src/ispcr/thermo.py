@@ -0,0 +1,258 @@
+"""
+Nearest-neighbor thermodynamics of primers and their binding sites, used to drop implausible primers before
+their sites are paired.
+
+Primer sites are exact matches, so the duplex at every site of a primer is the same perfectly matched duplex,
+and the thresholds of a ThermoFilter are really a check of the primer itself: a primer that fails them
+isn't searched for at all. The exceptions are a degenerate primer searched with ambiguous="expand", which
+matches several concrete sequences, and the sites with mismatches found by FMIndex.iter_products. Each of
+their sites is checked on its own, scored by the sequence of the site as if the primer matched it
+perfectly, since the parameters of mismatched stacks aren't included.
+
+The melting temperature and the 3' end stability of a sequence are sums over its dinucleotide stacks, which
+are looked up in precomputed tables. The stacks are summed once into prefix sums, so the whole sequence and
+its 3' end are both read off the same pass. The results are cached per sequence, so most checks cost a
+single dictionary lookup.
+"""
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, NamedTuple, Sequence, Tuple, Union
+
+from ispcr.normalize import COMPLEMENT_TABLE, fold_case
+
+# The unified nearest-neighbor parameters of SantaLucia (1998) as (enthalpy in kcal/mol,
+# entropy in cal/(K mol)) for each stack, written 5' to 3' on the primer strand
+_STACKS = {
+    "AA": (-7.9, -22.2),
+    "AT": (-7.2, -20.4),
+    "TA": (-7.2, -21.3),
+    "CA": (-8.5, -22.7),
+    "GT": (-8.4, -22.4),
+    "CT": (-7.8, -21.0),
+    "GA": (-8.2, -22.2),
+    "CG": (-10.6, -27.2),
+    "GC": (-9.8, -24.4),
+    "GG": (-8.0, -19.9),
+}
+
+
+def _stack_table() -> Dict[str, Tuple[float, float]]:
+    # A stack has the same parameters as its reverse complement, so the 10 unique stacks
+    # fill in all 16 dinucleotides
+    table = {}
+    for stack, parameters in _STACKS.items():
+        table[stack] = parameters
+        table[stack.translate(COMPLEMENT_TABLE)[::-1]] = parameters
+    return table
+
+
+STACK_TABLE = _stack_table()
+# Initiation parameters for a duplex, applied once for each of its terminal base pairs
+TERMINAL_GC = (0.1, -2.8)
+TERMINAL_AT = (2.3, 4.1)
+
+GAS_CONSTANT = 1.987
+KELVIN = 273.15
+# The temperature that the 3' end stability is given at
+STABILITY_TEMPERATURE = 37 + KELVIN
+# The number of bases at the 3' end of a primer that its stability is measured over
+THREE_PRIME_LENGTH = 5
+
+# The defaults of Primer3: 50 nM of each primer and 50 mM of monovalent cations
+DEFAULT_PRIMER_CONCENTRATION = 50e-9
+DEFAULT_SODIUM = 0.05
+
+
+class SiteThermodynamics(NamedTuple):
+    """The thermodynamics of a primer bound to a site.
+
+    tm is the melting temperature in °C, gc is the GC content in percent, and three_prime_dg
+    is the free energy of the last THREE_PRIME_LENGTH bases of the primer at 37 °C in kcal/mol.
+    The more negative three_prime_dg is, the more stable the 3' end of the primer is.
+    """
+
+    tm: float
+    gc: float
+    three_prime_dg: float
+
+
+@lru_cache(maxsize=4096)
+def site_thermodynamics(
+    site: str,
+    primer_concentration: float = DEFAULT_PRIMER_CONCENTRATION,
+    sodium: float = DEFAULT_SODIUM,
+) -> SiteThermodynamics:
+    """Returns the thermodynamics of a primer bound to a perfectly matching site.
+
+    site is the upper case sequence of the site written 5' to 3' in the same direction as the
+    primer that binds it. Stacks containing N or any other base that is not A, C, G, or T don't
+    add to the totals.
+
+    Example
+    -------
+    >>> site_thermodynamics("ACGTTGCA").gc
+    50.0
+    """
+    if not site:
+        return SiteThermodynamics(0.0, 0.0, 0.0)
+
+    stacks = [
+        STACK_TABLE.get(first + second, (0.0, 0.0))
+        for first, second in zip(site, site[1:])
+    ]
+    enthalpies = [0.0] + list(accumulate(enthalpy for enthalpy, _ in stacks))
+    entropies = [0.0] + list(accumulate(entropy for _, entropy in stacks))
+
+    enthalpy = enthalpies[-1]
+    entropy = entropies[-1]
+    for terminal in (site[0], site[-1]):
+        initiation = TERMINAL_GC if terminal in "GC" else TERMINAL_AT
+        enthalpy += initiation[0]
+        entropy += initiation[1]
+    entropy += 0.368 * len(stacks) * math.log(sodium)
+    tm = 1000 * enthalpy / (entropy + GAS_CONSTANT * math.log(primer_concentration / 4))
+
+    # The 3' end is the difference between the prefix sums of the whole site and of
+    # everything before its last THREE_PRIME_LENGTH bases
+    end = max(0, len(stacks) - (THREE_PRIME_LENGTH - 1))
+    end_enthalpy = enthalpies[-1] - enthalpies[end]
+    end_entropy = entropies[-1] - entropies[end]
+    three_prime_dg = end_enthalpy - STABILITY_TEMPERATURE * end_entropy / 1000
+
+    gc = 100 * (site.count("G") + site.count("C")) / len(site)
+    return SiteThermodynamics(tm - KELVIN, gc, three_prime_dg)
+
+
+def site_sequence(sequence: str, site: int, length: int, reverse: bool = False) -> str:
+    """Returns the sequence of a primer site, written in the same direction as the primer.
+
+    Sites of the reverse complement of a primer (reverse=True) are reverse complemented back.
+    Sites that run past the end of the sequence wrap around to its start, like the sites
+    spanning the origin of a circular sequence.
+    """
+    end = site + length
+    if end > len(sequence):
+        bases = sequence[site:] + sequence[: end - len(sequence)]
+    else:
+        bases = sequence[site:end]
+    if reverse:
+        return bases.translate(COMPLEMENT_TABLE)[::-1]
+    return bases
+
+
+@dataclass(frozen=True)
+class ThermoFilter:
+    """Thresholds that primers have to pass for their binding sites to be paired into products.
+
+    Each threshold is optional, and a primer only has to pass the ones that are set. Since sites are
+    exact matches, iter_pcr_products checks each primer once with accepts_primer, and only checks
+    the individual sites of degenerate primers that are searched with ambiguous="expand". tm is in °C,
+    gc in percent, and three_prime_dg in kcal/mol (see SiteThermodynamics). Weakly bound 3' ends have
+    a three_prime_dg close to 0, so max_three_prime_dg drops them, and min_three_prime_dg drops 3'
+    ends so stable that they prime from mismatched sites.
+
+    Example
+    -------
+    >>> thermo = ThermoFilter(min_tm=55, min_gc=40, max_gc=60)
+    >>> get_pcr_products("primers.fa", "sequences.fa", thermo=thermo)
+    """
+
+    min_tm: Union[float, None] = None
+    max_tm: Union[float, None] = None
+    min_gc: Union[float, None] = None
+    max_gc: Union[float, None] = None
+    min_three_prime_dg: Union[float, None] = None
+    max_three_prime_dg: Union[float, None] = None
+    primer_concentration: float = DEFAULT_PRIMER_CONCENTRATION
+    sodium: float = DEFAULT_SODIUM
+
+    def __post_init__(self) -> None:
+        for low, high in (
+            (self.min_tm, self.max_tm),
+            (self.min_gc, self.max_gc),
+            (self.min_three_prime_dg, self.max_three_prime_dg),
+        ):
+            if low is not None and high is not None and high < low:
+                raise ValueError(
+                    "A minimum threshold cannot be larger than its maximum"
+                )
+        if self.primer_concentration <= 0 or self.sodium <= 0:
+            raise ValueError("primer_concentration and sodium must be positive")
+
+    def accepts(self, thermodynamics: SiteThermodynamics) -> bool:
+        """Returns whether a site passes every threshold."""
+        return (
+            _within(thermodynamics.tm, self.min_tm, self.max_tm)
+            and _within(thermodynamics.gc, self.min_gc, self.max_gc)
+            and _within(
+                thermodynamics.three_prime_dg,
+                self.min_three_prime_dg,
+                self.max_three_prime_dg,
+            )
+        )
+
+    def accepts_primer(self, primer: str, reverse: bool = False) -> bool:
+        """Returns whether an upper case primer, bound to a perfectly matching site, passes every threshold.
+
+        reverse is whether primer is the reverse complement of the primer, as with the primer at the
+        end of a product, in which case it is reverse complemented back before it is checked.
+        """
+        return self.accepts(
+            site_thermodynamics(
+                site_sequence(primer, 0, len(primer), reverse),
+                self.primer_concentration,
+                self.sodium,
+            )
+        )
+
+    def filter_sites(
+        self, sequence: str, sites: Sequence[int], length: int, reverse: bool = False
+    ) -> List[int]:
+        """Returns the sites of a primer in a sequence that pass every threshold.
+
+        The sites keep their order. reverse is whether the sites are of the reverse complement of
+        the primer, as with the sites at the end of a product. Soft-masked sites are scored the
+        same as upper case ones.
+        """
+        return [
+            site
+            for site in sites
+            if self.accepts(
+                site_thermodynamics(
+                    fold_case(site_sequence(sequence, site, length, reverse)),
+                    self.primer_concentration,
+                    self.sodium,
+                )
+            )
+        ]
+
+
+def annotate_sites(
+    sequence: str,
+    sites: Sequence[int],
+    length: int,
+    reverse: bool = False,
+    primer_concentration: float = DEFAULT_PRIMER_CONCENTRATION,
+    sodium: float = DEFAULT_SODIUM,
+) -> List[SiteThermodynamics]:
+    """Returns the thermodynamics of every site of a primer in an upper case sequence.
+
+    Example
+    -------
+    >>> sequence = "ATGCTGATGCATGCTA"
+    >>> annotate_sites(sequence, find_primer_sites(sequence, "ATGC"), 4)
+    """
+    return [
+        site_thermodynamics(
+            site_sequence(sequence, site, length, reverse),
+            primer_concentration,
+            sodium,
+        )
+        for site in sites
+    ]
+
+
+def _within(value: float, low: Union[float, None], high: Union[float, None]) -> bool:
+    return (low is None or value >= low) and (high is None or value <= high)
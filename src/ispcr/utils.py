@@ -2,9 +2,27 @@
 This module contains various utilities used during in silico PCR.
 """
 
-from typing import Iterator, List, TextIO, Union
+import gzip
+import re
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from ispcr.FastaSequence import FastaSequence
+from ispcr.normalize import DNA_COMPLEMENT_TABLE, DNA_DELETE_TABLE
+
+if TYPE_CHECKING:
+    from ispcr.PCRProduct import PCRProduct
+    from ispcr.prefilter import PrimerKmerFilter
 
 COLUMN_HEADERS = {
     "fpri": 0,
@@ -14,12 +32,20 @@ COLUMN_HEADERS = {
     "length": 4,
     "pname": 5,
     "pseq": 6,
+    "orient": 7,
 }
 
+# Anything that can be used in place of a FastaSequence
+SequenceLike = Union[FastaSequence, Tuple[str, str]]
+
 BASE_HEADER = (
     "forward_primer\treverse_primer\tstart\tend\tlength\tproduct_name\tproduct_sequence"
 )
 
+# The names of every output column. The orientation column is only included in "all" when
+# products in orientations other than FR are requested.
+OUTPUT_COLUMNS = BASE_HEADER.split() + ["orientation"]
+
 
 def desired_product_size(
     potential_product_length: int,
@@ -68,7 +94,9 @@ def reverse_complement(dna_string: str) -> str:
     Inputs
     ------
     dna_string: str
-        A string representing a DNA sequence. Supported bases are A, C, G, and T.
+        A string representing a DNA sequence. Supported bases are A, C, G, T, and N, in either case.
+        The case of each base is kept. See ispcr.normalize.primer_reverse_complement for primers
+        containing other ambiguous bases.
 
     Outputs
     -------
@@ -77,7 +105,7 @@ def reverse_complement(dna_string: str) -> str:
     Raises
     ------
     KeyError
-        Raised if there is a base in dna_string that is not one of ACGT.
+        Raised if there is a base in dna_string that is not one of ACGTN.
 
     Example
     -------
@@ -85,22 +113,67 @@ def reverse_complement(dna_string: str) -> str:
     'TCAGC'
     """
 
-    complements = {"A": "T", "C": "G", "G": "C", "T": "A"}
-    try:
-        rev_seq = "".join([complements[s] for s in dna_string[::-1]])
-    except KeyError as e:
-        print(f"Base {e.args} not supported.")
-        raise
-    return rev_seq
+    unsupported = dna_string.translate(DNA_DELETE_TABLE)
+    if unsupported:
+        print(f"Base {unsupported[0]} not supported.")
+        raise KeyError(unsupported[0])
+    return dna_string.translate(DNA_COMPLEMENT_TABLE)[::-1]
+
+
+def as_fasta_sequence(sequence: SequenceLike) -> FastaSequence:
+    """
+    Returns a FastaSequence for either a FastaSequence or a (header, sequence) tuple.
+    """
+    if isinstance(sequence, FastaSequence):
+        return sequence
+    header, dna_string = sequence
+    return FastaSequence(header, dna_string)
+
 
+def iter_sequences(
+    sequences: Iterable[Union[SequenceLike, bytes, bytearray, memoryview]]
+) -> Iterator[FastaSequence]:
+    """
+    Yields FastaSequences from an iterable of FastaSequences, (header, sequence) tuples, or bytes
+    buffers holding fasta-formatted text. A buffer can hold any number of records.
+    """
+    for sequence in sequences:
+        if isinstance(sequence, (bytes, bytearray, memoryview)):
+            yield from read_fasta(bytes(sequence).decode().splitlines())
+        else:
+            yield as_fasta_sequence(sequence)
 
-def read_fasta(fasta_file: TextIO) -> Iterator[FastaSequence]:
+
+def read_fasta(
+    fasta_file: Iterable[str],
+    prefilter: Optional["PrimerKmerFilter"] = None,
+    min_length: Optional[int] = None,
+    header_pattern: Optional[str] = None,
+    sequence_ids: Optional[Iterable[str]] = None,
+) -> Iterator[FastaSequence]:
     """An iterator for fasta files.
 
+    Records can be skipped while the file is being read by supplying any of the optional filters.
+    Records that are rejected because of their header are never stored, and records that are too
+    short are only measured, so in neither case is a sequence string built for them.
+
     Inputs
     ------
-    fasta_file: TextIO
-        An open file for reading
+    fasta_file: Iterable[str]
+        An open file for reading, or any other iterable of lines
+
+    prefilter: None | PrimerKmerFilter
+        If provided, records are checked against the filter before their sequence lines are joined,
+        and records that are rejected are skipped. Defaults to None, which yields every record.
+
+    min_length: None | int
+        If provided, records whose sequences are shorter than this number are skipped.
+
+    header_pattern: None | str
+        If provided, only records whose header matches this regular expression are yielded.
+
+    sequence_ids: None | Iterable[str]
+        If provided, only records whose ID (the header up to the first whitespace) is in this collection are yielded.
 
     Outputs
     -------
@@ -114,31 +187,86 @@ def read_fasta(fasta_file: TextIO) -> Iterator[FastaSequence]:
         print(f'{name}\n{seq}')
 
     """
+    wanted_header = _header_filter(header_pattern, sequence_ids)
+
+    def wanted_sequence(seq: List[str], seq_length: int) -> bool:
+        if min_length is not None and seq_length < min_length:
+            return False
+        return prefilter is None or prefilter.accepts_lines(seq)
+
     name = None
+    keep = False
     seq: List[str] = []
+    seq_length = 0
     for line in fasta_file:
-        line = line.rstrip()
         if line.startswith(">"):
-            if name:
-                header = name
-                sequence = "".join(seq)
-                yield FastaSequence(header, sequence)
-            name, seq = line[1:], []
-        else:
+            if keep and name and wanted_sequence(seq, seq_length):
+                yield FastaSequence(name, "".join(seq))
+            name, seq, seq_length = line[1:].rstrip(), [], 0
+            keep = wanted_header(name)
+        elif keep:
+            line = line.rstrip()
             seq.append(line)
-    if name:
-        header = name
-        sequence = "".join(seq)
-        yield FastaSequence(header, sequence)
+            seq_length += len(line)
+    if keep and name and wanted_sequence(seq, seq_length):
+        yield FastaSequence(name, "".join(seq))
+
 
+def _header_filter(
+    header_pattern: Optional[str], sequence_ids: Optional[Iterable[str]]
+) -> Callable[[str], bool]:
+    # Returns a function that decides whether a record is wanted from its header alone
+    header_regex = re.compile(header_pattern) if header_pattern is not None else None
+    allowed_ids = set(sequence_ids) if sequence_ids is not None else None
 
-def read_sequences_from_file(primer_file: str) -> List[FastaSequence]:
+    def wanted_header(header: str) -> bool:
+        if header_regex is not None and not header_regex.search(header):
+            return False
+        if allowed_ids is not None:
+            fields = header.split(maxsplit=1)
+            return bool(fields) and fields[0] in allowed_ids
+        return True
+
+    return wanted_header
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_gzipped(file_path: str) -> bool:
+    """Returns True if a file is gzip compressed, whatever its extension."""
+    with open(file_path, "rb") as fin:
+        return fin.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def open_fasta(file_path: str) -> IO[str]:
+    """Opens a fasta file for reading, decompressing it if it is gzip compressed."""
+    if is_gzipped(file_path):
+        return gzip.open(file_path, "rt")
+    return open(file_path)
+
+
+def read_sequences_from_file(
+    primer_file: str,
+    prefilter: Optional["PrimerKmerFilter"] = None,
+    min_length: Optional[int] = None,
+    header_pattern: Optional[str] = None,
+    sequence_ids: Optional[Iterable[str]] = None,
+) -> List[FastaSequence]:
     """
     Reads a fasta file, converts the sequences to FastaSequences, and returns them in a list.
+    Any filters provided are passed on to read_fasta, and only the sequences that pass them are returned.
+    The file can be gzip compressed.
     """
     sequences = []
-    with open(primer_file) as fin:
-        for fasta_sequence in read_fasta(fin):
+    with open_fasta(primer_file) as fin:
+        for fasta_sequence in read_fasta(
+            fin,
+            prefilter=prefilter,
+            min_length=min_length,
+            header_pattern=header_pattern,
+            sequence_ids=sequence_ids,
+        ):
             sequences.append(fasta_sequence)
 
     return sequences
@@ -179,9 +307,45 @@ def filter_output_line(output_line: str, column_indices: List[int]) -> str:
         return "\t".join([columns[i] for i in column_indices])
 
 
-def parse_selected_cols(cols: str) -> List[int]:
+def format_output_line(
+    fields: Sequence[Union[str, int]], column_indices: List[int]
+) -> str:
+    """
+    Builds a single tab-separated line of isPCR results from the selected fields of a product.
+    Unlike filter_output_line, the fields are never joined and re-split.
+    """
+    return "\t".join([str(fields[i]) for i in column_indices])
+
+
+def header_line(column_indices: List[int]) -> str:
+    """
+    Returns the header line for the selected columns.
+    """
+    return format_output_line(OUTPUT_COLUMNS, column_indices)
+
+
+def format_results(
+    products: Iterable["PCRProduct"],
+    cols: str = "all",
+    header: bool = True,
+    include_orientation: bool = False,
+) -> str:
+    """
+    Formats products as the tab-separated string returned by get_pcr_products.
+    """
+    selected_column_indices = parse_selected_cols(cols, include_orientation)
+    lines = []
+    if header is True:
+        lines.append(header_line(selected_column_indices))
+    for product in products:
+        lines.append(format_output_line(product.fields(), selected_column_indices))
+    return "\n".join(lines)
+
+
+def parse_selected_cols(cols: str, include_orientation: bool = False) -> List[int]:
     """
-    Returns a list of int indices based on a column header string.
+    Returns a list of int indices based on a column header string. If include_orientation is True,
+    "all" includes the orientation column.
     """
     if cols != "all":
         if not is_valid_cols_string(cols):
@@ -189,7 +353,9 @@ def parse_selected_cols(cols: str) -> List[int]:
         else:
             selected_column_indices = get_column_indices(cols)
     else:
-        selected_column_indices = list(range(len(BASE_HEADER.split())))
+        selected_column_indices = list(
+            range(len(BASE_HEADER.split()) + include_orientation)
+        )
     return selected_column_indices
 
 
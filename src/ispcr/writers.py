@@ -0,0 +1,454 @@
+"""
+Streaming writers for in silico PCR results.
+
+Each writer takes PCRProduct objects one at a time and buffers them before writing them out,
+so products can be written as they are found without building the full results in memory.
+"""
+import hashlib
+import os
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from types import TracebackType
+from typing import IO, TYPE_CHECKING, Dict, Iterable, List, Optional, Type, TypeVar
+
+from ispcr.normalize import fold_case
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import format_output_line, header_line, parse_selected_cols
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# The size of the hashes that identify unique amplicon sequences
+AMPLICON_DIGEST_SIZE = 16
+AMPLICON_HEADER = "amplicon_id\tlength\tdigest\tproduct_sequence"
+MEMBERSHIP_HEADER = (
+    "forward_primer\treverse_primer\tstart\tend\tproduct_name\torientation\tamplicon_id"
+)
+
+# FR products are amplified from the plus strand and RF products from the minus strand. FF and
+# RR products come from a single primer binding both strands, so they have no strand.
+BED_STRANDS = {"FR": "+", "RF": "-", "FF": ".", "RR": "."}
+
+COLUMNAR_MAGIC = b"ISPCRCOL\x01"
+COLUMNAR_INT_FIELDS = ("start", "end", "length")
+COLUMNAR_STR_FIELDS = (
+    "forward_primer",
+    "reverse_primer",
+    "product_name",
+    "product_sequence",
+    "orientation",
+)
+
+
+WriterType = TypeVar("WriterType", bound="ProductWriter")
+
+
+class ProductWriter(ABC):
+    """Base class for the streaming product writers.
+
+    Subclasses implement write_batch, which receives a list of buffered products. Writers can be
+    used as context managers, which makes sure that any buffered products are written out.
+
+    Example
+    -------
+    >>> with TSVWriter("results.tsv", cols="pname start end") as writer:
+    ...     writer.write_all(iter_pcr_products(sequence, forward_primer, reverse_primer))
+    """
+
+    def __init__(self, output_file: str, batch_size: int = 10000) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.output_file = output_file
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer: List[PCRProduct] = []
+
+    def write(self, product: PCRProduct) -> None:
+        """Buffers a single product, writing out the buffer once it is full."""
+        self._buffer.append(product)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, products: Iterable[PCRProduct]) -> int:
+        """Writes every product in an iterable and returns the number of products written."""
+        count_before = self.count
+        for product in products:
+            self.write(product)
+        return self.count - count_before
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.write_batch(self._buffer)
+            self._buffer = []
+
+    @abstractmethod
+    def write_batch(self, products: List[PCRProduct]) -> None:
+        """Writes out a batch of buffered products."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self: WriterType) -> WriterType:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class TSVWriter(ProductWriter):
+    """Writes products as tab-separated lines, in the same format as get_pcr_products.
+
+    The cols string is parsed once when the writer is created. If include_orientation is True,
+    "all" includes the orientation column.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        cols: str = "all",
+        header: bool = True,
+        batch_size: int = 10000,
+        include_orientation: bool = False,
+    ) -> None:
+        super().__init__(output_file, batch_size)
+        self.column_indices = parse_selected_cols(cols, include_orientation)
+        self._fout: IO[str] = open(output_file, "w")
+        self._first_line = True
+        if header:
+            self._write_lines([header_line(self.column_indices)])
+
+    def _write_lines(self, lines: List[str]) -> None:
+        # Lines are separated rather than terminated by newlines to match get_pcr_products
+        if not self._first_line:
+            self._fout.write("\n")
+        self._fout.write("\n".join(lines))
+        self._first_line = False
+
+    def write_batch(self, products: List[PCRProduct]) -> None:
+        column_indices = self.column_indices
+        self._write_lines(
+            [
+                format_output_line(product.fields(), column_indices)
+                for product in products
+            ]
+        )
+
+    def close(self) -> None:
+        super().close()
+        self._fout.close()
+
+
+class BEDWriter(ProductWriter):
+    """Writes products in BED6 format for viewing in a genome browser.
+
+    The name of each feature is the forward and reverse primer names joined by an underscore, and
+    the strand comes from the orientation of the product (see BED_STRANDS). FF and RR products
+    have no strand, so their orientation is added to the end of the name instead. BED features
+    can't wrap around, so a product spanning the origin of a circular sequence is written as two
+    features with the same name, one running to the end of the sequence and one from its start.
+    """
+
+    def __init__(self, output_file: str, batch_size: int = 10000) -> None:
+        super().__init__(output_file, batch_size)
+        self._fout: IO[str] = open(output_file, "w")
+
+    def write_batch(self, products: List[PCRProduct]) -> None:
+        lines = []
+        for product in products:
+            name = f"{product.forward_primer}_{product.reverse_primer}"
+            strand = BED_STRANDS[product.orientation]
+            if strand == ".":
+                name = f"{name}_{product.orientation}"
+            chrom = product.product_name.split()[0]
+            if product.end < product.start:
+                # The sequence length isn't stored, but the wrapped product covers all of it
+                # between start and end
+                sequence_length = product.start + product.length - product.end
+                lines.append(
+                    f"{chrom}\t{product.start}\t{sequence_length}\t{name}\t0\t{strand}\n"
+                )
+                lines.append(f"{chrom}\t0\t{product.end}\t{name}\t0\t{strand}\n")
+            else:
+                lines.append(
+                    f"{chrom}\t{product.start}\t{product.end}\t{name}\t0\t{strand}\n"
+                )
+        self._fout.write("".join(lines))
+
+    def close(self) -> None:
+        super().close()
+        self._fout.close()
+
+
+class SQLiteWriter(ProductWriter):
+    """Writes products to a table in a SQLite database using batched inserts.
+
+    Indexes on the product name and on the primer pair are created when the writer is closed,
+    which is faster than keeping them up to date during the inserts. If the table already exists
+    in output_file, it is replaced, so running the same command twice doesn't duplicate its rows.
+
+    SQLite connections can only be used by the thread that opened them, so the connection is opened
+    by the first write or close rather than when the writer is created. The writer can then be
+    created in one thread and written and closed in another, like write_pcr_products does.
+    """
+
+    def __init__(
+        self, output_file: str, table: str = "products", batch_size: int = 10000
+    ) -> None:
+        super().__init__(output_file, batch_size)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        self._connection: Optional["sqlite3.Connection"] = None
+
+    def _connect(self) -> "sqlite3.Connection":
+        if self._connection is None:
+            # sqlite3 is only imported once it is needed, since it is slow to import
+            import sqlite3
+
+            table = self.table
+            self._connection = sqlite3.connect(self.output_file)
+            self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self._connection.execute(
+                f"CREATE TABLE {table} ("
+                "forward_primer TEXT, reverse_primer TEXT, start INTEGER, end INTEGER, "
+                "length INTEGER, product_name TEXT, product_sequence TEXT, orientation TEXT)"
+            )
+        return self._connection
+
+    def write_batch(self, products: List[PCRProduct]) -> None:
+        self._connect().executemany(
+            f"INSERT INTO {self.table} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [product.fields() for product in products],
+        )
+
+    def close(self) -> None:
+        super().close()
+        table = self.table
+        connection = self._connect()
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_product_name ON {table} (product_name)"
+        )
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_primer_pair "
+            f"ON {table} (forward_primer, reverse_primer)"
+        )
+        connection.commit()
+        connection.close()
+
+
+class ColumnarWriter(ProductWriter):
+    """Writes products to a compact binary columnar file.
+
+    The file starts with COLUMNAR_MAGIC and is followed by one block per batch. Each block is
+    the number of rows as a little-endian uint32, then the start, end, and length columns as
+    little-endian int64 arrays, then each string column as an array of uint32 byte lengths
+    followed by the concatenated UTF-8 strings. Use read_columnar_file to read one back in.
+    """
+
+    def __init__(self, output_file: str, batch_size: int = 10000) -> None:
+        super().__init__(output_file, batch_size)
+        self._fout: IO[bytes] = open(output_file, "wb")
+        self._fout.write(COLUMNAR_MAGIC)
+
+    def write_batch(self, products: List[PCRProduct]) -> None:
+        self._fout.write(struct.pack("<I", len(products)))
+        for field in COLUMNAR_INT_FIELDS:
+            column = array("q", [getattr(product, field) for product in products])
+            self._fout.write(_to_little_endian(column).tobytes())
+        for field in COLUMNAR_STR_FIELDS:
+            encoded = [getattr(product, field).encode() for product in products]
+            lengths = array("I", [len(value) for value in encoded])
+            self._fout.write(_to_little_endian(lengths).tobytes())
+            self._fout.write(b"".join(encoded))
+
+    def close(self) -> None:
+        super().close()
+        self._fout.close()
+
+
+class DedupWriter(ProductWriter):
+    """Writes each unique amplicon sequence once, along with a table of the targets it was found in.
+
+    Product sequences are hashed as they are written, and only the hashes of the amplicons seen so
+    far are kept in memory. The first time a sequence is seen, it gets the next amplicon ID and a line
+    in output_file, which has the columns of AMPLICON_HEADER. Every product gets a line in
+    membership_file, with the columns of MEMBERSHIP_HEADER, pointing to the ID of its sequence.
+    Sequences are compared in upper case, so soft-masked copies of an amplicon are the same amplicon.
+
+    membership_file defaults to output_file with ".members" added before its extension, such as
+    results.members.tsv for results.tsv.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        membership_file: Optional[str] = None,
+        header: bool = True,
+        batch_size: int = 10000,
+    ) -> None:
+        super().__init__(output_file, batch_size)
+        if membership_file is None:
+            root, extension = os.path.splitext(output_file)
+            membership_file = f"{root}.members{extension}"
+        self.membership_file = membership_file
+        self._amplicon_ids: Dict[bytes, int] = {}
+        self._amplicons: IO[str] = open(output_file, "w")
+        self._members: IO[str] = open(membership_file, "w")
+        # Lines are separated rather than terminated by newlines, like the tsv format
+        self._separators = ["", ""]
+        if header:
+            self._amplicons.write(AMPLICON_HEADER)
+            self._members.write(MEMBERSHIP_HEADER)
+            self._separators = ["\n", "\n"]
+
+    @property
+    def amplicon_count(self) -> int:
+        """The number of unique amplicons written so far."""
+        return len(self._amplicon_ids)
+
+    def write_batch(self, products: List[PCRProduct]) -> None:
+        amplicon_lines = []
+        member_lines = []
+        for product in products:
+            sequence = fold_case(product.product_sequence)
+            digest = hashlib.blake2b(
+                sequence.encode(), digest_size=AMPLICON_DIGEST_SIZE
+            ).digest()
+            amplicon_id = self._amplicon_ids.get(digest)
+            if amplicon_id is None:
+                amplicon_id = len(self._amplicon_ids) + 1
+                self._amplicon_ids[digest] = amplicon_id
+                amplicon_lines.append(
+                    f"{amplicon_id}\t{len(sequence)}\t{digest.hex()}\t{sequence}"
+                )
+            member_lines.append(
+                f"{product.forward_primer}\t{product.reverse_primer}\t{product.start}\t"
+                f"{product.end}\t{product.product_name}\t{product.orientation}\t{amplicon_id}"
+            )
+        self._write_lines(0, self._amplicons, amplicon_lines)
+        self._write_lines(1, self._members, member_lines)
+
+    def _write_lines(self, i: int, fout: IO[str], lines: List[str]) -> None:
+        if lines:
+            fout.write(self._separators[i] + "\n".join(lines))
+            self._separators[i] = "\n"
+
+    def close(self) -> None:
+        super().close()
+        self._amplicons.close()
+        self._members.close()
+
+
+def _to_little_endian(column: array) -> array:
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _read_exactly(fin: IO[bytes], size: int) -> bytes:
+    data = fin.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of columnar file")
+    return data
+
+
+def read_columnar_file(input_file: str) -> List[PCRProduct]:
+    """Reads the products written by a ColumnarWriter back in."""
+    products = []
+    with open(input_file, "rb") as fin:
+        if fin.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{input_file} is not an ispcr columnar file")
+        while True:
+            row_count_bytes = fin.read(4)
+            if not row_count_bytes:
+                break
+            (row_count,) = struct.unpack("<I", row_count_bytes)
+
+            int_columns = []
+            for _field in COLUMNAR_INT_FIELDS:
+                column = array("q")
+                column.frombytes(_read_exactly(fin, row_count * column.itemsize))
+                int_columns.append(_to_little_endian(column))
+
+            str_columns = []
+            for _field in COLUMNAR_STR_FIELDS:
+                lengths = array("I")
+                lengths.frombytes(_read_exactly(fin, row_count * lengths.itemsize))
+                _to_little_endian(lengths)
+                data = _read_exactly(fin, sum(lengths)).decode()
+                values: List[str] = []
+                offset = 0
+                for length in lengths:
+                    end = offset + length
+                    values.append(data[offset:end])
+                    offset = end
+                str_columns.append(values)
+
+            starts, ends, product_lengths = int_columns
+            (
+                forward_primers,
+                reverse_primers,
+                names,
+                product_sequences,
+                orientations,
+            ) = str_columns
+            for i in range(row_count):
+                products.append(
+                    PCRProduct(
+                        forward_primers[i],
+                        reverse_primers[i],
+                        starts[i],
+                        ends[i],
+                        product_lengths[i],
+                        names[i],
+                        product_sequences[i],
+                        orientations[i],
+                    )
+                )
+
+    return products
+
+
+WRITERS: Dict[str, Type[ProductWriter]] = {
+    "tsv": TSVWriter,
+    "bed": BEDWriter,
+    "sqlite": SQLiteWriter,
+    "columnar": ColumnarWriter,
+    "dedup": DedupWriter,
+}
+
+
+def get_writer(
+    output_format: str,
+    output_file: str,
+    cols: str = "all",
+    header: bool = True,
+    include_orientation: bool = False,
+) -> ProductWriter:
+    """Returns a writer for one of the supported output formats: tsv, bed, sqlite, columnar, or dedup.
+
+    cols and include_orientation only apply to the tsv format, and header to the tsv and dedup formats.
+    """
+    if output_format not in WRITERS:
+        raise ValueError(
+            f"Unsupported output format: {output_format}. "
+            f"Options are {', '.join(WRITERS)}."
+        )
+    if output_format == "tsv":
+        return TSVWriter(
+            output_file,
+            cols=cols,
+            header=header,
+            include_orientation=include_orientation,
+        )
+    if output_format == "dedup":
+        return DedupWriter(output_file, header=header)
+    return WRITERS[output_format](output_file)
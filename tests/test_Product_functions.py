@@ -1,10 +1,14 @@
-from typing import Iterator, List
+from typing import Iterator, List, Tuple, Union
 
 import pytest
 
-from ispcr import calculate_pcr_product, get_pcr_products
+from ispcr import batch_pcr_products, calculate_pcr_product, get_pcr_products
 from ispcr.FastaSequence import FastaSequence
-from ispcr.utils import InvalidColumnSelectionError
+from ispcr.utils import (
+    InvalidColumnSelectionError,
+    SequenceLike,
+    read_sequences_from_file,
+)
 
 
 class TestCalculatePCRPRoduct:
@@ -115,6 +119,20 @@ class TestCalculatePCRPRoduct:
 
         assert expected_results == actual_results
 
+    def test_overlapping_primer_sites(self) -> None:
+        # Both primers bind at two overlapping sites in the repeats, and every forward site
+        # is paired with every reverse site after it
+        expected_results = "f\tr\t0\t7\t7\trepeats\tAAAATTT\nf\tr\t0\t8\t8\trepeats\tAAAATTTT\nf\tr\t1\t7\t6\trepeats\tAAATTT\nf\tr\t1\t8\t7\trepeats\tAAATTTT"
+
+        actual_results = calculate_pcr_product(
+            sequence=FastaSequence("repeats", "AAAATTTT"),
+            forward_primer=FastaSequence("f", "AAA"),
+            reverse_primer=FastaSequence("r", "AAA"),
+            header=False,
+        )
+
+        assert expected_results == actual_results
+
 
 class TestGetPCRProducts:
     def test_simple_sequence(self) -> None:
@@ -179,3 +197,83 @@ class TestGetPCRProducts:
         )
 
         assert expected_results == actual_result
+
+    def test_sequence_ids(self) -> None:
+        expected_results = ""
+        actual_results = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file="tests/test_data/sequences/single_test.fa",
+            header=False,
+            sequence_ids=["not_a_sequence_in_the_file"],
+        )
+
+        assert expected_results == actual_results
+
+    def test_circular_header_pattern(self) -> None:
+        expected_results = "forward_primer.f\treverse_primer.r\t11\t11\t31\tplasmid_1 circular\tGGAGCATGCTATGTCGTAGCTGATGCAATTA"
+        actual_results = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file="tests/test_data/sequences/circular.fa",
+            header=False,
+            circular="circular",
+        )
+
+        assert expected_results == actual_results
+
+
+class TestBatchPCRProducts:
+    @pytest.fixture(scope="class")
+    def primer_pairs(self) -> Iterator[List[Tuple[FastaSequence, FastaSequence]]]:
+        forward_primer = FastaSequence("test_forward", "GGAG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        yield [(forward_primer, reverse_primer)]
+
+    def test_target_types(
+        self, primer_pairs: List[Tuple[FastaSequence, FastaSequence]]
+    ) -> None:
+        sequence_string = "GGAGCATGCTATGTCGTAGCTGATGCAATTA"
+        targets: List[Union[SequenceLike, bytes]] = [
+            FastaSequence("fasta_sequence", sequence_string),
+            ("tuple", sequence_string),
+            f">bytes_1\n{sequence_string[:10]}\n{sequence_string[10:]}\n>bytes_2\nCCCC\n".encode(),
+        ]
+        expected_names = ["fasta_sequence", "tuple", "bytes_1"]
+        actual_products = batch_pcr_products(primer_pairs, targets)
+        actual_names = [product.product_name for product in actual_products]
+
+        assert expected_names == actual_names
+        assert all(product.length == 31 for product in actual_products)
+
+    def test_matches_get_pcr_products(self) -> None:
+        expected_results = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file="tests/test_data/sequences/met_r.fa",
+            max_product_length=300,
+            header=False,
+        )
+
+        forward_primer, reverse_primer = read_sequences_from_file(
+            "tests/test_data/primers/test_primers_1.fa"
+        )
+        with open("tests/test_data/sequences/met_r.fa", "rb") as fin:
+            targets = [fin.read()]
+        actual_products = batch_pcr_products(
+            [(forward_primer, reverse_primer)], targets, max_product_length=300
+        )
+        actual_results = "\n".join(str(product) for product in actual_products)
+
+        assert expected_results == actual_results
+
+    def test_multiple_primer_pairs(self) -> None:
+        primer_pairs = [
+            (("pair_1.f", "GGAG"), ("pair_1.r", "TAAT")),
+            (("pair_2.f", "GCAT"), ("pair_2.r", "TAAT")),
+        ]
+        targets = [("test_sequence", "GGAGCATGCTATGTCGTAGCTGATGCAATTA")]
+        expected = ["pair_1.f", "pair_2.f"]
+        actual = [
+            product.forward_primer
+            for product in batch_pcr_products(primer_pairs, targets)
+        ]
+
+        assert expected == actual
@@ -0,0 +1,105 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from ispcr import get_pcr_products
+from ispcr.aio import (
+    _databases,
+    aget_pcr_products,
+    aiter_products,
+    aload_database,
+)
+from ispcr.database import SequenceDatabase
+from ispcr.PCRProduct import PCRProduct
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestAsyncPCR:
+    @pytest.fixture(scope="class")
+    def database(self) -> Iterator[SequenceDatabase]:
+        yield SequenceDatabase.from_file(SEQUENCE_FILE)
+
+    def test_aget_pcr_products(self) -> None:
+        expected = get_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, max_product_length=200, header=False
+        )
+        actual = asyncio.run(
+            aget_pcr_products(
+                PRIMER_FILE, SEQUENCE_FILE, max_product_length=200, header=False
+            )
+        )
+
+        assert expected == actual
+
+    def test_aiter_products(self, database: SequenceDatabase) -> None:
+        async def collect() -> List[PCRProduct]:
+            return [
+                product
+                async for product in aiter_products(
+                    database, ("f", "GGAG"), ("r", "TAAT"), chunk_size=3
+                )
+            ]
+
+        expected = list(database.iter_products(("f", "GGAG"), ("r", "TAAT")))
+        actual = asyncio.run(collect())
+
+        assert expected == actual
+
+    def test_aiter_products_cancellation(self, database: SequenceDatabase) -> None:
+        seen_names = []
+
+        async def consume() -> None:
+            async for product in aiter_products(
+                database, ("f", "GGAG"), ("r", "TAAT"), chunk_size=1
+            ):
+                seen_names.append(product.product_name)
+                # Cancel the request as soon as the first product arrives
+                asyncio.current_task().cancel()  # type: ignore
+
+        async def run_request() -> None:
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.ensure_future(consume())
+
+        asyncio.run(run_request())
+        all_names = {
+            product.product_name
+            for product in database.iter_products(("f", "GGAG"), ("r", "TAAT"))
+        }
+
+        assert len(set(seen_names)) == 1
+        assert len(all_names) > 1
+
+    def test_aload_database_is_shared(self) -> None:
+        async def load_concurrently() -> List[SequenceDatabase]:
+            return list(
+                await asyncio.gather(
+                    aload_database(SEQUENCE_FILE), aload_database(SEQUENCE_FILE)
+                )
+            )
+
+        first_database, second_database = asyncio.run(load_concurrently())
+
+        assert first_database is second_database
+        assert len(first_database) == 20
+
+    def test_aload_database_replaces_modified_file(self, tmp_path: Path) -> None:
+        sequence_file = tmp_path / "sequences.fa"
+        sequence_file.write_text(">first\nGGAGCCCCATTA\n")
+
+        async def load() -> SequenceDatabase:
+            return await aload_database(str(sequence_file))
+
+        first_database = asyncio.run(load())
+        sequence_file.write_text(">first\nGGAGCCCCATTA\n>second\nGGAGATTA\n")
+        mtime = os.path.getmtime(sequence_file) + 10
+        os.utime(sequence_file, (mtime, mtime))
+        second_database = asyncio.run(load())
+
+        assert len(first_database) == 1
+        assert len(second_database) == 2
+        assert _databases[os.path.abspath(sequence_file)][0] == mtime
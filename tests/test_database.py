@@ -0,0 +1,112 @@
+from typing import Iterator, List
+
+import pytest
+
+from ispcr import SequenceDatabase, get_pcr_products
+from ispcr.database import NO_SITES
+from ispcr.FastaSequence import FastaSequence
+from ispcr.utils import InvalidColumnSelectionError, read_sequences_from_file
+
+
+class TestSequenceDatabase:
+    @pytest.fixture(scope="class")
+    def database(self) -> Iterator[SequenceDatabase]:
+        yield SequenceDatabase.from_file("tests/test_data/sequences/met_r.fa")
+
+    @pytest.fixture(scope="class")
+    def primers(self) -> Iterator[List[FastaSequence]]:
+        yield read_sequences_from_file("tests/test_data/primers/test_primers_1.fa")
+
+    def test_length(self, database: SequenceDatabase) -> None:
+        assert len(database) == 20
+
+    def test_index_by_header(self, database: SequenceDatabase) -> None:
+        first_sequence = database[0]
+
+        assert first_sequence.header in database
+        assert database[first_sequence.header] == first_sequence
+
+    def test_matches_get_pcr_products(
+        self, database: SequenceDatabase, primers: List[FastaSequence]
+    ) -> None:
+        expected = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file="tests/test_data/sequences/met_r.fa",
+            min_product_length=50,
+            max_product_length=300,
+        )
+        forward_primer, reverse_primer = primers
+        actual = database.calculate(
+            forward_primer,
+            reverse_primer,
+            min_product_length=50,
+            max_product_length=300,
+        )
+
+        assert expected == actual
+
+    def test_repeated_queries_use_cache(
+        self, database: SequenceDatabase, primers: List[FastaSequence]
+    ) -> None:
+        forward_primer, reverse_primer = primers
+        first_results = database.calculate(forward_primer, reverse_primer)
+        cached_sites = database._site_cache[forward_primer.sequence]
+        second_results = database.calculate(forward_primer, reverse_primer)
+
+        assert first_results == second_results
+        assert database._site_cache[forward_primer.sequence] is cached_sites
+        assert all(cached_sites.searched)
+
+    def test_cache_only_stores_bound_sequences(self) -> None:
+        database = SequenceDatabase(
+            [
+                FastaSequence("bound", "CCGGAGCC"),
+                FastaSequence("unbound", "CCCCCCCC"),
+            ]
+        )
+        sites = database.primer_sites("GGAG")
+        cached_sites = database._site_cache["GGAG"]
+
+        assert sites[0] == [2]
+        assert cached_sites.sites == {0: [2]}
+        assert sites[1] is NO_SITES
+
+    def test_tuple_primers(
+        self, database: SequenceDatabase, primers: List[FastaSequence]
+    ) -> None:
+        forward_primer, reverse_primer = primers
+        expected = list(database.iter_products(forward_primer, reverse_primer))
+        actual = list(
+            database.iter_products(
+                (forward_primer.header, forward_primer.sequence),
+                (reverse_primer.header, reverse_primer.sequence),
+            )
+        )
+
+        assert expected == actual
+
+    def test_invalid_cols_string(self, database: SequenceDatabase) -> None:
+        with pytest.raises(InvalidColumnSelectionError):
+            database.calculate(("f", "GGAG"), ("r", "TAAT"), cols="invalid cols")
+
+    def test_sequence_range(self, database: SequenceDatabase) -> None:
+        expected = [
+            product
+            for product in database.iter_products(("f", "GGAG"), ("r", "TAAT"))
+            if product.product_name in {database[5].header, database[6].header}
+        ]
+        actual = list(
+            database.iter_products(("f", "GGAG"), ("r", "TAAT"), start=5, stop=7)
+        )
+
+        assert expected == actual
+
+    def test_cache_size_limit(self) -> None:
+        database = SequenceDatabase(
+            [FastaSequence("test_sequence", "GGAGCATGCTATGTCGTAGCTGATGCAATTA")],
+            cache_size=1,
+        )
+        database.primer_sites("GGAG")
+        database.primer_sites("ATTA")
+
+        assert list(database._site_cache) == ["ATTA"]
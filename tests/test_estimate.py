@@ -0,0 +1,131 @@
+import gzip
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from ispcr import get_pcr_products
+from ispcr.cli import main
+from ispcr.estimate import estimate
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+# One forward site followed by one reverse site, which pair into a single 28 bp product
+AMPLICON = "GGAG" + "C" * 10 + "ATTA" + "C" * 10
+
+
+def primer_file(tmp_path: Path) -> Path:
+    primers = tmp_path / "primers.fa"
+    primers.write_text(">forward_primer\nGGAG\n>reverse_primer\nTAAT\n")
+    return primers
+
+
+class TestEstimate:
+    def test_small_file_is_exact(self) -> None:
+        results = get_pcr_products(PRIMER_FILE, SEQUENCE_FILE, max_product_length=500)
+        cost = estimate(PRIMER_FILE, SEQUENCE_FILE, max_product_length=500)
+
+        assert cost.exact
+        assert cost.products == cost.products_low == cost.products_high
+        assert cost.products == len(results.splitlines()) - 1
+        assert cost.output_bytes == pytest.approx(len(results) + 1)
+
+    def test_sampled_estimate(self) -> None:
+        expected = len(
+            get_pcr_products(
+                PRIMER_FILE, SEQUENCE_FILE, max_product_length=500, header=False
+            ).splitlines()
+        )
+        cost = estimate(
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            max_product_length=500,
+            samples=4,
+            sample_bytes=1000,
+        )
+
+        assert not cost.exact
+        assert cost.sampled_bytes < os.path.getsize(SEQUENCE_FILE)
+        assert cost.products_low <= cost.products <= cost.products_high
+        assert cost.products == pytest.approx(expected, rel=0.5)
+
+    def test_no_products_sampled(self) -> None:
+        cost = estimate(
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            max_product_length=10,
+            samples=2,
+            sample_bytes=1000,
+        )
+
+        assert cost.products == cost.products_low == 0
+        assert cost.products_high > 0
+
+    @pytest.mark.parametrize("line_length", [60, None])
+    def test_samples_inside_long_record(
+        self, tmp_path: Path, line_length: Optional[int]
+    ) -> None:
+        # A single 280 kb record with one product every 28 bp, wrapped or on a single line
+        sequence = AMPLICON * 10000
+        if line_length is not None:
+            sequence = "\n".join(
+                sequence[start:][:line_length]
+                for start in range(0, len(sequence), line_length)
+            )
+        sequence_file = tmp_path / "genome.fa"
+        sequence_file.write_text(f">genome\n{sequence}\n")
+
+        cost = estimate(
+            str(primer_file(tmp_path)),
+            str(sequence_file),
+            max_product_length=28,
+            samples=4,
+            sample_bytes=5000,
+        )
+
+        assert not cost.exact
+        assert cost.sampled_bytes == 4 * 5000
+        assert cost.sampled_records == 4
+        assert cost.products == pytest.approx(10000, rel=0.05)
+
+    def test_exact_when_every_byte_is_read(self, tmp_path: Path) -> None:
+        sequence_file = tmp_path / "genome.fa"
+        sequence_file.write_text(f">genome\n{AMPLICON * 10}\n")
+
+        cost = estimate(
+            str(primer_file(tmp_path)),
+            str(sequence_file),
+            max_product_length=28,
+            samples=1,
+            sample_bytes=os.path.getsize(sequence_file),
+        )
+
+        assert cost.exact
+        assert "(95% CI 10 - 10)" in str(cost)
+
+    def test_gzipped_file(self, tmp_path: Path) -> None:
+        gzipped_file = str(tmp_path / "met_r.fa.gz")
+        with open(SEQUENCE_FILE, "rb") as fin, gzip.open(gzipped_file, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+
+        with pytest.raises(ValueError):
+            estimate(PRIMER_FILE, gzipped_file)
+
+    @pytest.mark.parametrize("samples,sample_bytes", [(0, 1000), (4, 0)])
+    def test_invalid_samples(self, samples: int, sample_bytes: int) -> None:
+        with pytest.raises(ValueError):
+            estimate(
+                PRIMER_FILE, SEQUENCE_FILE, samples=samples, sample_bytes=sample_bytes
+            )
+
+    def test_command(self, capsys: pytest.CaptureFixture) -> None:
+        assert (
+            main(
+                ["estimate", PRIMER_FILE, SEQUENCE_FILE, "--max-product-length", "500"]
+            )
+            == 0
+        )
+
+        assert "Expected products: 63 (95% CI 63 - 63)" in capsys.readouterr().out
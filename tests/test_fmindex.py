@@ -0,0 +1,177 @@
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pytest
+
+from ispcr import get_pcr_products
+from ispcr.database import SequenceDatabase
+from ispcr.FastaSequence import FastaSequence
+from ispcr.fmindex import FMIndex, build_suffix_array
+from ispcr.matching import find_primer_sites, iter_pcr_products
+from ispcr.thermo import ThermoFilter
+from ispcr.utils import read_sequences_from_file
+
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestSuffixArray:
+    def test_banana(self) -> None:
+        expected = [6, 5, 3, 1, 0, 4, 2]
+        actual = build_suffix_array("banana$")
+
+        assert expected == actual
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "GGAGCATGCTATGTCGTAGCTGATGCAATTA$ACGTTGCA$",
+            # Repeats longer than the first packed keys take several more rounds to sort
+            "ACGT" * 20 + "A" * 40 + "$ACGTACGTN$" + "T" * 70 + "#",
+        ],
+    )
+    def test_matches_naive_sort(self, text: str) -> None:
+        expected = sorted(range(len(text)), key=lambda i: text[i:])
+        actual = build_suffix_array(text)
+
+        assert expected == actual
+
+
+class TestFMIndex:
+    @pytest.fixture(scope="class")
+    def index(self) -> Iterator[FMIndex]:
+        yield FMIndex.from_file(SEQUENCE_FILE, sa_sample=8, occ_sample=16)
+
+    @pytest.fixture(scope="class")
+    def sequences(self) -> Iterator[List[str]]:
+        yield [
+            fasta_sequence.sequence
+            for fasta_sequence in read_sequences_from_file(SEQUENCE_FILE)
+        ]
+
+    def test_count(self, index: FMIndex, sequences: List[str]) -> None:
+        expected = sum(
+            len(find_primer_sites(sequence, "GGAG")) for sequence in sequences
+        )
+
+        assert index.count("GGAG") == expected
+
+    def test_exact_sites(self, index: FMIndex, sequences: List[str]) -> None:
+        expected = {
+            i: find_primer_sites(sequence, "TTAGC")
+            for i, sequence in enumerate(sequences)
+            if "TTAGC" in sequence
+        }
+        actual = index.primer_sites("TTAGC")
+
+        assert expected == actual
+
+    def test_mismatch_sites(self, index: FMIndex, sequences: List[str]) -> None:
+        primer = "GATTAG"
+
+        def mismatches(site: str) -> int:
+            return sum(a != b for a, b in zip(site, primer))
+
+        expected = {}
+        for i, sequence in enumerate(sequences):
+            sites = [
+                position
+                for position in range(len(sequence) - len(primer) + 1)
+                if mismatches(sequence[position:][: len(primer)]) <= 1
+            ]
+            if sites:
+                expected[i] = sites
+        actual = index.primer_sites(primer, max_mismatches=1)
+
+        assert expected == actual
+
+    def test_matches_get_pcr_products(self, index: FMIndex) -> None:
+        expected = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file=SEQUENCE_FILE,
+            max_product_length=300,
+        )
+        forward_primer, reverse_primer = read_sequences_from_file(
+            "tests/test_data/primers/test_primers_1.fa"
+        )
+        actual = index.calculate(forward_primer, reverse_primer, max_product_length=300)
+
+        assert expected == actual
+
+    def test_mismatch_products_include_exact_products(self) -> None:
+        database = SequenceDatabase.from_file(SEQUENCE_FILE)
+        index = FMIndex.build(database)
+        exact_products = set(
+            database.iter_products(
+                ("f", "GGAGA"), ("r", "TAATC"), max_product_length=400
+            )
+        )
+        approximate_products = set(
+            index.iter_products(
+                ("f", "GGAGA"),
+                ("r", "TAATC"),
+                max_product_length=400,
+                max_mismatches=1,
+            )
+        )
+
+        assert exact_products < approximate_products
+
+    def test_thermo_drops_weak_mismatched_sites(self) -> None:
+        # The forward primer binds exactly at 0 and with one mismatch at 10, where the site
+        # has a lower GC content than the primer
+        sequence = "GGCGCATTTTGGCACATTTTCGCGGC"
+        index = FMIndex.build([("target", sequence)])
+        thermo = ThermoFilter(min_gc=80)
+
+        def starts(thermo: Optional[ThermoFilter]) -> List[int]:
+            return [
+                product.start
+                for product in index.iter_products(
+                    ("f", "GGCGCA"), ("r", "GCCGCG"), max_mismatches=1, thermo=thermo
+                )
+            ]
+
+        assert starts(None) == [0, 10]
+        assert starts(thermo) == [0]
+        assert index.primer_sites("GGCGCA", thermo=thermo) == {0: [0]}
+        assert index.primer_sites("GGCGCA", thermo=ThermoFilter(max_gc=50)) == {}
+
+    def test_save_and_load(self, index: FMIndex, tmp_path: Path) -> None:
+        index_file = str(tmp_path / "met_r.fmi")
+        index.save(index_file)
+        loaded_index = FMIndex.load(index_file)
+
+        assert loaded_index.headers == index.headers
+        assert loaded_index.primer_sites("GGAG") == index.primer_sites("GGAG")
+        assert loaded_index.sequence(3) == index.sequence(3)
+        assert loaded_index.text == index.text
+        assert loaded_index.checkpoints == index.checkpoints
+
+    def test_soft_masked_products_keep_case(self, tmp_path: Path) -> None:
+        sequences = [
+            FastaSequence("masked", "ccggagCCCCattaCC"),
+            FastaSequence("unmasked", "GGAGCCCCATTA"),
+        ]
+        forward_primer = FastaSequence("f", "GGAG")
+        reverse_primer = FastaSequence("r", "TAAT")
+        index = FMIndex.build(sequences)
+        index_file = str(tmp_path / "masked.fmi")
+        index.save(index_file)
+        loaded_index = FMIndex.load(index_file)
+        expected = [
+            product
+            for sequence in sequences
+            for product in iter_pcr_products(sequence, forward_primer, reverse_primer)
+        ]
+        actual = list(index.iter_products(forward_primer, reverse_primer))
+
+        assert expected == actual
+        assert loaded_index.text == index.text
+        assert expected[0].product_sequence == "ggagCCCCatta"
+
+    def test_load_bad_file(self, tmp_path: Path) -> None:
+        index_file = tmp_path / "bad.fmi"
+        index_file.write_bytes(b"not an index")
+
+        with pytest.raises(ValueError):
+            FMIndex.load(str(index_file))
@@ -0,0 +1,103 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from ispcr import get_pcr_products
+from ispcr.cli import main
+from ispcr.incremental import update_pcr_products
+from ispcr.utils import read_sequences_from_file
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+def write_records(fasta_file: Path, records: List[List[str]]) -> None:
+    fasta_file.write_text(
+        "".join(f">{header}\n{sequence}\n" for header, sequence in records)
+    )
+
+
+class TestIncremental:
+    @pytest.fixture
+    def records(self) -> List[List[str]]:
+        return [
+            [sequence.header, sequence.sequence]
+            for sequence in read_sequences_from_file(SEQUENCE_FILE)
+        ]
+
+    def test_rerun_only_searches_changes(
+        self, tmp_path: Path, records: List[List[str]]
+    ) -> None:
+        sequence_file = tmp_path / "sequences.fa"
+        state_file = str(tmp_path / "state.db")
+        write_records(sequence_file, records)
+
+        first = update_pcr_products(
+            PRIMER_FILE, str(sequence_file), state_file, max_product_length=500
+        )
+        second = update_pcr_products(
+            PRIMER_FILE, str(sequence_file), state_file, max_product_length=500
+        )
+
+        assert (first.searched, first.reused, first.removed) == (len(records), 0, 0)
+        assert (second.searched, second.reused, second.removed) == (0, len(records), 0)
+        assert first.results == second.results
+
+        # Change one record, remove another, and add a new one
+        records[0][1] = records[0][1][::-1]
+        del records[5]
+        records.insert(10, ["new_record", records[3][1] + records[4][1]])
+        write_records(sequence_file, records)
+        third = update_pcr_products(
+            PRIMER_FILE, str(sequence_file), state_file, max_product_length=500
+        )
+
+        assert (third.searched, third.reused, third.removed) == (2, len(records) - 2, 2)
+        assert third.results == get_pcr_products(
+            PRIMER_FILE, str(sequence_file), max_product_length=500
+        )
+
+    def test_changed_options_start_over(
+        self, tmp_path: Path, records: List[List[str]]
+    ) -> None:
+        state_file = str(tmp_path / "state.db")
+        update_pcr_products(PRIMER_FILE, SEQUENCE_FILE, state_file, cols="pname start")
+        run = update_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, state_file, cols="pname start end"
+        )
+
+        assert run.searched == len(records)
+        assert run.results == get_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, cols="pname start end"
+        )
+
+    def test_bad_arguments_raised_before_opening_state(self, tmp_path: Path) -> None:
+        state_file = tmp_path / "state.db"
+
+        with pytest.raises(ValueError):
+            update_pcr_products(
+                PRIMER_FILE, SEQUENCE_FILE, str(state_file), ambiguous="bogus"
+            )
+
+        assert not state_file.exists()
+
+    def test_command(self, tmp_path: Path) -> None:
+        output_file = tmp_path / "results.tsv"
+        args = [
+            "update",
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            "--state-file",
+            str(tmp_path / "state.db"),
+            "-o",
+            str(output_file),
+            "--max-product-length",
+            "500",
+        ]
+
+        assert main(args) == 0
+        assert main(args) == 0
+        assert output_file.read_text() == get_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, max_product_length=500
+        )
@@ -0,0 +1,249 @@
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import (
+    find_origin_sites,
+    find_primer_sites,
+    iter_pcr_products,
+    pair_primer_sites,
+    parse_orientations,
+)
+from ispcr.PCRProduct import PCRProduct
+
+
+class TestFindPrimerSites:
+    def test_no_sites(self) -> None:
+        assert find_primer_sites("ACGTACGT", "TTT") == []
+
+    def test_multiple_sites(self) -> None:
+        expected = [0, 4]
+        actual = find_primer_sites("ACGTACGT", "ACG")
+
+        assert expected == actual
+
+    def test_overlapping_sites(self) -> None:
+        expected = [0, 1, 2]
+        actual = find_primer_sites("AAAA", "AA")
+
+        assert expected == actual
+
+    def test_empty_primer(self) -> None:
+        assert find_primer_sites("ACGT", "") == []
+
+
+class TestPairPrimerSites:
+    def test_all_pairs_downstream(self) -> None:
+        expected = [(0, 14), (0, 24), (10, 14), (10, 24)]
+        actual = list(pair_primer_sites([0, 10], [10, 20], 4))
+
+        assert expected == actual
+
+    def test_reverse_upstream_skipped(self) -> None:
+        expected = [(10, 34)]
+        actual = list(pair_primer_sites([10], [5, 30], 4))
+
+        assert expected == actual
+
+    def test_length_range(self) -> None:
+        expected = [(0, 24), (10, 34)]
+        actual = list(
+            pair_primer_sites(
+                [0, 10],
+                [10, 20, 30, 40],
+                4,
+                min_product_length=15,
+                max_product_length=24,
+            )
+        )
+
+        assert expected == actual
+
+    def test_improper_limits(self) -> None:
+        with pytest.raises(ValueError):
+            list(pair_primer_sites([0], [10], 4, 200, 100))
+
+
+class TestIterPCRProducts:
+    @pytest.fixture(scope="class")
+    def primers(self) -> Iterator[List[FastaSequence]]:
+        forward_primer = FastaSequence("test_forward", "GGAG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        yield [forward_primer, reverse_primer]
+
+    def test_simple_sequence(self, primers: List[FastaSequence]) -> None:
+        sequence = FastaSequence("test_sequence", "GGAGCATGCTATGTCGTAGCTGATGCAATTA")
+        expected = [
+            PCRProduct(
+                "test_forward",
+                "test_reverse",
+                0,
+                31,
+                31,
+                "test_sequence",
+                "GGAGCATGCTATGTCGTAGCTGATGCAATTA",
+            )
+        ]
+
+        forward_primer, reverse_primer = primers
+        actual = list(iter_pcr_products(sequence, forward_primer, reverse_primer))
+
+        assert expected == actual
+
+    def test_sequence_shorter_than_min_length(
+        self, primers: List[FastaSequence]
+    ) -> None:
+        sequence = FastaSequence("test_sequence", "GGAGATTA")
+
+        forward_primer, reverse_primer = primers
+        actual = list(
+            iter_pcr_products(
+                sequence, forward_primer, reverse_primer, min_product_length=10
+            )
+        )
+
+        assert actual == []
+
+    def test_product_str(self) -> None:
+        product = PCRProduct("f", "r", 0, 8, 8, "target", "GGAGATTA")
+
+        assert str(product) == "f\tr\t0\t8\t8\ttarget\tGGAGATTA"
+
+
+class TestOrientations:
+    @pytest.fixture(scope="class")
+    def primers(self) -> Iterator[List[FastaSequence]]:
+        forward_primer = FastaSequence("test_forward", "GGAG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        yield [forward_primer, reverse_primer]
+
+    def test_parse_orientations(self) -> None:
+        assert parse_orientations("all") == ("FR", "RF", "FF", "RR")
+        assert parse_orientations("FR, FF") == ("FR", "FF")
+        assert parse_orientations(["RR"]) == ("RR",)
+
+    def test_invalid_orientation(self) -> None:
+        with pytest.raises(ValueError):
+            parse_orientations("FR XY")
+
+    def test_no_orientations(self) -> None:
+        with pytest.raises(ValueError):
+            parse_orientations("")
+
+    def test_default_is_designed_product(self, primers: List[FastaSequence]) -> None:
+        # The forward primer binds both strands here, which only shows up as an FF product
+        sequence = FastaSequence("test_sequence", "GGAGCCATTACCCTCC")
+        forward_primer, reverse_primer = primers
+        products = list(iter_pcr_products(sequence, forward_primer, reverse_primer))
+
+        assert [product.orientation for product in products] == ["FR"]
+
+    def test_all_orientations(self, primers: List[FastaSequence]) -> None:
+        # GGAG at 0, ATTA (reverse complement of TAAT) at 6, CTCC (reverse complement of GGAG)
+        # at 12, TAAT at 18, and ATTA at 24
+        sequence = FastaSequence("test_sequence", "GGAGCCATTACCCTCCGGTAATGGATTA")
+        forward_primer, reverse_primer = primers
+        products = list(
+            iter_pcr_products(
+                sequence, forward_primer, reverse_primer, orientations="all"
+            )
+        )
+        actual = [
+            (product.orientation, product.start, product.end) for product in products
+        ]
+        expected = [
+            ("FR", 0, 10),
+            ("FR", 0, 28),
+            ("FF", 0, 16),
+            ("RR", 18, 28),
+        ]
+
+        assert sorted(expected) == sorted(actual)
+
+    def test_swapped_primers(self, primers: List[FastaSequence]) -> None:
+        sequence = FastaSequence("test_sequence", "TAATCCCCTCC")
+        forward_primer, reverse_primer = primers
+        products = list(
+            iter_pcr_products(
+                sequence, forward_primer, reverse_primer, orientations="RF"
+            )
+        )
+
+        assert [(product.start, product.end) for product in products] == [(0, 11)]
+        assert products[0].orientation == "RF"
+
+
+class TestCircularSequences:
+    @pytest.fixture(scope="class")
+    def primers(self) -> Iterator[List[FastaSequence]]:
+        forward_primer = FastaSequence("test_forward", "GGAG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        yield [forward_primer, reverse_primer]
+
+    @pytest.mark.parametrize(
+        "sequence,expected",
+        [
+            # Product spanning the origin
+            ("CAATTACCCCGGAGCATG", [(10, 6, 14, "GGAGCATGCAATTA")]),
+            # Forward primer site spanning the origin
+            ("AGCCATTACCCCGG", [(12, 8, 10, "GGAGCCATTA")]),
+            # Reverse primer site spanning the origin
+            ("TACCCCGGAGCCAT", [(6, 2, 10, "GGAGCCATTA")]),
+        ],
+    )
+    def test_wrapped_products(
+        self,
+        primers: List[FastaSequence],
+        sequence: str,
+        expected: List[Tuple[int, int, int, str]],
+    ) -> None:
+        forward_primer, reverse_primer = primers
+        products = iter_pcr_products(
+            FastaSequence("test_sequence", sequence),
+            forward_primer,
+            reverse_primer,
+            circular=True,
+        )
+        actual = [
+            (product.start, product.end, product.length, product.product_sequence)
+            for product in products
+        ]
+
+        assert expected == actual
+
+    def test_linear_sequence(self, primers: List[FastaSequence]) -> None:
+        forward_primer, reverse_primer = primers
+        sequence = FastaSequence("test_sequence", "CAATTACCCCGGAGCATG")
+        products = iter_pcr_products(sequence, forward_primer, reverse_primer)
+
+        assert list(products) == []
+
+    def test_max_product_length(self, primers: List[FastaSequence]) -> None:
+        forward_primer, reverse_primer = primers
+        sequence = FastaSequence("test_sequence", "CAATTACCCCGGAGCATG")
+        products = iter_pcr_products(
+            sequence,
+            forward_primer,
+            reverse_primer,
+            max_product_length=13,
+            circular=True,
+        )
+
+        assert list(products) == []
+
+    def test_products_are_shorter_than_the_sequence(
+        self, primers: List[FastaSequence]
+    ) -> None:
+        # Without a limit, the product ending at ATTA would also be found after going around twice
+        forward_primer, reverse_primer = primers
+        sequence = FastaSequence("test_sequence", "GGAGCCATTA")
+        products = iter_pcr_products(
+            sequence, forward_primer, reverse_primer, circular=True
+        )
+
+        assert [(product.start, product.end) for product in products] == [(0, 10)]
+
+    def test_origin_sites(self) -> None:
+        assert find_origin_sites("TACCCCAT", "ATTA") == [6]
+        assert find_origin_sites("TACCCCAT", "CCCC") == []
@@ -0,0 +1,84 @@
+import gzip
+import shutil
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from ispcr import get_pcr_products
+from ispcr.multiplex import (
+    CrossPairResult,
+    cross_pair_products,
+    get_cross_pair_products,
+)
+
+PANEL_FILE = "tests/test_data/primers/test_panel.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestCrossPairProducts:
+    @pytest.fixture(scope="class")
+    def result(self) -> Iterator[CrossPairResult]:
+        yield get_cross_pair_products(
+            PANEL_FILE, SEQUENCE_FILE, max_product_length=300, keep_products=True
+        )
+
+    def test_matrix_shape(self, result: CrossPairResult) -> None:
+        expected_primers = ["forward_primer.f", "reverse_primer.r", "extra_primer"]
+
+        assert result.primers == expected_primers
+        assert len(result.counts) == 3
+        assert all(len(row) == 3 for row in result.counts)
+
+    def test_designed_pair_matches_get_pcr_products(
+        self, result: CrossPairResult
+    ) -> None:
+        expected = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file=SEQUENCE_FILE,
+            max_product_length=300,
+            header=False,
+        )
+        actual = "\n".join(
+            str(product)
+            for product in result.products
+            if product.forward_primer == "forward_primer.f"
+            and product.reverse_primer == "reverse_primer.r"
+        )
+
+        assert expected == actual
+        assert result.counts[0][1] == len(expected.splitlines())
+
+    def test_counts_match_products(self, result: CrossPairResult) -> None:
+        counted = get_cross_pair_products(
+            PANEL_FILE, SEQUENCE_FILE, max_product_length=300
+        )
+
+        assert counted.counts == result.counts
+        assert counted.products == []
+        assert sum(map(sum, result.counts)) == len(result.products)
+
+    def test_gzipped_sequence_file(
+        self, tmp_path: Path, result: CrossPairResult
+    ) -> None:
+        gzipped_file = str(tmp_path / "met_r.fa.gz")
+        with open(SEQUENCE_FILE, "rb") as fin, gzip.open(gzipped_file, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+
+        actual = get_cross_pair_products(
+            PANEL_FILE, gzipped_file, max_product_length=300, keep_products=True
+        )
+
+        assert actual == result
+
+    def test_self_pairing(self) -> None:
+        # GGAG and its reverse complement CTCC flank the target, so the primer amplifies it alone
+        result = cross_pair_products([("primer", "GGAG")], [("target", "GGAGTTTTCTCC")])
+
+        assert result.counts == [[1]]
+
+    def test_matrix_string(self) -> None:
+        result = CrossPairResult(primers=["a", "b"], counts=[[1, 0], [2, 3]])
+        expected = "forward_primer\ta\tb\na\t1\t0\nb\t2\t3"
+
+        assert result.matrix() == expected
@@ -0,0 +1,104 @@
+from typing import Iterator, List
+
+import pytest
+
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import find_primer_sites, iter_pcr_products
+from ispcr.normalize import (
+    InvalidBaseError,
+    find_degenerate_sites,
+    fold_case,
+    is_unambiguous,
+    normalize_primer,
+    primer_reverse_complement,
+)
+from ispcr.utils import reverse_complement
+
+
+class TestNormalization:
+    def test_fold_case(self) -> None:
+        sequence = "ACGTN"
+
+        assert fold_case(sequence) is sequence
+        assert fold_case("acGTn") == "ACGTN"
+
+    def test_reverse_complement_keeps_case(self) -> None:
+        assert reverse_complement("aaCGtN") == "NaCGtt"
+
+    def test_primer_reverse_complement(self) -> None:
+        assert primer_reverse_complement("ggrn") == "NYCC"
+        assert primer_reverse_complement("ACGTRYSWKMBDHVN") == "NBDHVKMWSRYACGT"
+
+    def test_unsupported_base(self) -> None:
+        with pytest.raises(InvalidBaseError):
+            primer_reverse_complement("GGXG")
+
+    @pytest.mark.parametrize("ambiguous", ["literal", "expand"])
+    def test_ambiguous_primer(self, ambiguous: str) -> None:
+        assert normalize_primer("ggrg", ambiguous) == "GGRG"
+
+    def test_ambiguous_primer_error(self) -> None:
+        assert normalize_primer("GGAG", "error") == "GGAG"
+        with pytest.raises(InvalidBaseError):
+            normalize_primer("GGRG", "error")
+
+    def test_invalid_policy(self) -> None:
+        with pytest.raises(ValueError):
+            normalize_primer("GGAG", "ignore")
+
+    def test_is_unambiguous(self) -> None:
+        assert is_unambiguous("acgt")
+        assert not is_unambiguous("ACGN")
+
+    def test_degenerate_sites(self) -> None:
+        # Overlapping matches of GGRG are all found, while N in the sequence never matches
+        assert find_degenerate_sites("GGAGGGGGNG", "GGRG") == [0, 3, 4]
+        assert find_primer_sites("GGAGGGGGNG", "GGRG", ambiguous="expand") == [0, 3, 4]
+        assert find_primer_sites("GGAGGGGGNG", "GGRG") == []
+
+
+class TestNormalizedProducts:
+    @pytest.fixture(scope="class")
+    def primers(self) -> Iterator[List[FastaSequence]]:
+        forward_primer = FastaSequence("test_forward", "GGAG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        yield [forward_primer, reverse_primer]
+
+    def test_soft_masked_sequence(self, primers: List[FastaSequence]) -> None:
+        forward_primer, reverse_primer = primers
+        sequence = FastaSequence("test_sequence", "ccggagCATGCTAttacc")
+        products = list(iter_pcr_products(sequence, forward_primer, reverse_primer))
+
+        assert [(product.start, product.end) for product in products] == [(2, 16)]
+        assert products[0].product_sequence == "ggagCATGCTAtta"
+
+    def test_degenerate_primers(self) -> None:
+        forward_primer = FastaSequence("test_forward", "GGRG")
+        reverse_primer = FastaSequence("test_reverse", "YAAT")
+        sequence = FastaSequence("test_sequence", "GGAGCCATTACCGGGGCCATTG")
+
+        literal = list(iter_pcr_products(sequence, forward_primer, reverse_primer))
+        expanded = list(
+            iter_pcr_products(
+                sequence, forward_primer, reverse_primer, ambiguous="expand"
+            )
+        )
+
+        assert literal == []
+        assert [(product.start, product.end) for product in expanded] == [
+            (0, 10),
+            (0, 22),
+            (12, 22),
+        ]
+
+    def test_ambiguous_error(self) -> None:
+        forward_primer = FastaSequence("test_forward", "GGNG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        sequence = FastaSequence("test_sequence", "GGAGCCATTA")
+
+        with pytest.raises(InvalidBaseError):
+            list(
+                iter_pcr_products(
+                    sequence, forward_primer, reverse_primer, ambiguous="error"
+                )
+            )
@@ -0,0 +1,249 @@
+"""
+Scaling and memory tests for the hot paths.
+
+Each timing test runs the same work at two sizes, where the second is SCALE times the first, and checks that
+the runtime grows by less than a limit set by the expected complexity of the work (see growth_limit). Linear
+work grows 4 times and quadratic work 16 times, so the limit of linear work is 8, which leaves plenty of
+room for timer noise while still catching quadratic regressions. The runs are timed in CPU time and the
+runs at the two sizes are interleaved, so that a busy machine doesn't skew the ratio. The memory tests check
+tracemalloc peaks against a fraction of the input or output size, which catches code that holds a whole
+file in memory. The whole module runs in a few seconds.
+"""
+import math
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pytest
+
+from ispcr import calculate_pcr_product, get_pcr_results
+from ispcr.FastaSequence import FastaSequence
+from ispcr.fmindex import FMIndex
+from ispcr.matching import find_primer_sites, pair_primer_sites
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import read_fasta
+from ispcr.writers import TSVWriter
+
+SCALE = 4
+REPEATS = 5
+
+FORWARD_PRIMER = FastaSequence("forward_primer", "GGAG")
+REVERSE_PRIMER = FastaSequence("reverse_primer", "TAAT")
+# One forward site followed by one reverse site, which pair into a single 28 bp product
+AMPLICON = "GGAG" + "C" * 10 + "ATTA" + "C" * 10
+# A forward and a reverse site every 10 bp, so every forward site pairs with the reverse
+# sites after it and a short sequence has many more bases of products than of sequence
+DENSE_SITES = "GGAGATTACC"
+
+
+def growth_limit(expected: float, regression: float = SCALE**2) -> float:
+    # Halfway, on a log scale, between the expected growth and the growth of the regression
+    # the test should catch, which leaves the same room for noise as for the regression
+    return math.sqrt(expected * regression)
+
+
+LINEAR_GROWTH_LIMIT = growth_limit(SCALE)
+
+
+def timed(function: Callable[[], Any]) -> float:
+    # CPU time rather than wall clock time, which would count the time the process spends
+    # waiting for other processes on a busy machine
+    start = time.process_time()
+    function()
+    return time.process_time() - start
+
+
+def time_ratio(small: Callable[[], Any], large: Callable[[], Any]) -> float:
+    # The fastest of several runs is the least affected by whatever else the machine is
+    # doing, and alternating the runs spreads a busy spell over both sizes
+    small_timings, large_timings = [], []
+    for _ in range(REPEATS):
+        small_timings.append(timed(small))
+        large_timings.append(timed(large))
+    return min(large_timings) / min(small_timings)
+
+
+def growth(function: Callable[[int], Any], size: int) -> float:
+    return time_ratio(lambda: function(size), lambda: function(SCALE * size))
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def random_sequence(length: int, seed: int = 0) -> str:
+    return "".join(random.Random(seed).choices("ACGT", k=length))
+
+
+def write_fasta(fasta_file: Path, records: int, record_length: int) -> None:
+    with open(fasta_file, "w") as fout:
+        for i in range(records):
+            sequence = random_sequence(record_length, seed=i)
+            fout.write(f">record_{i}\n")
+            for start in range(0, record_length, 60):
+                end = start + 60
+                fout.write(sequence[start:end] + "\n")
+
+
+class TestScaling:
+    def test_calculate_pcr_product(self) -> None:
+        def run(forward_hits: int) -> None:
+            sequence = FastaSequence("target", AMPLICON * forward_hits)
+            calculate_pcr_product(
+                sequence, FORWARD_PRIMER, REVERSE_PRIMER, max_product_length=28
+            )
+
+        assert growth(run, 500) < LINEAR_GROWTH_LIMIT
+
+    def test_pair_dense_sites(self) -> None:
+        # Every site pairs with at most max_product_length others, so the work is linear in
+        # the number of sites even though every pair of sites could be compared
+        def run(site_count: int) -> None:
+            sites = list(range(site_count))
+            for _ in pair_primer_sites(sites, sites, 4, max_product_length=20):
+                pass
+
+        assert growth(run, 5000) < LINEAR_GROWTH_LIMIT
+
+    def test_find_primer_sites(self) -> None:
+        def run(length: int) -> None:
+            find_primer_sites("A" * length, "AAAA")
+
+        assert growth(run, 20000) < LINEAR_GROWTH_LIMIT
+
+    def test_read_fasta(self, tmp_path: Path) -> None:
+        small_file, large_file = tmp_path / "small.fa", tmp_path / "large.fa"
+        write_fasta(small_file, 50, 1000)
+        write_fasta(large_file, 50 * SCALE, 1000)
+
+        def run(fasta_file: Path) -> None:
+            with open(fasta_file) as fin:
+                for _ in read_fasta(fin):
+                    pass
+
+        ratio = time_ratio(lambda: run(small_file), lambda: run(large_file))
+
+        assert ratio < LINEAR_GROWTH_LIMIT
+
+    def test_fmindex_build(self) -> None:
+        size = 2000
+
+        def run(length: int) -> None:
+            FMIndex.build([("target", random_sequence(length))])
+
+        # Prefix doubling takes O(n log^2 n), which grows a little faster than linear work
+        expected = SCALE * (math.log(SCALE * size) / math.log(size)) ** 2
+
+        assert growth(run, size) < growth_limit(expected)
+
+    def test_fmindex_query(self) -> None:
+        # The large index is SCALE squared times the size of the small one, so that a query
+        # that scans the index grows as much as quadratic work does in the other tests
+        small = FMIndex.build([("target", random_sequence(5000))])
+        large = FMIndex.build([("target", random_sequence(5000 * SCALE**2))])
+
+        def run(index: FMIndex) -> None:
+            for _ in range(100):
+                index.count("ACGTACGTAC")
+
+        # Counting a pattern only depends on the length of the pattern
+        ratio = time_ratio(lambda: run(small), lambda: run(large))
+
+        assert ratio < growth_limit(1)
+
+
+class TestMemoryCeilings:
+    def test_read_fasta(self, tmp_path: Path) -> None:
+        fasta_file = tmp_path / "sequences.fa"
+        write_fasta(fasta_file, 200, 10000)
+        file_size = fasta_file.stat().st_size
+
+        def run() -> None:
+            with open(fasta_file) as fin:
+                for _ in read_fasta(fin):
+                    pass
+
+        # Only one record is held at a time, so the peak is set by the records and not the file
+        assert peak_memory(run) < file_size / 10
+
+    def test_streaming_writer(self, tmp_path: Path) -> None:
+        output_file = tmp_path / "results.tsv"
+
+        def products() -> Iterator[PCRProduct]:
+            for i in range(20000):
+                yield PCRProduct(
+                    "forward_primer",
+                    "reverse_primer",
+                    i,
+                    i + 28,
+                    28,
+                    "target",
+                    AMPLICON,
+                )
+
+        def run() -> None:
+            with TSVWriter(str(output_file), batch_size=200) as writer:
+                writer.write_all(products())
+
+        peak = peak_memory(run)
+
+        # Only one batch of products is held at a time
+        assert peak < output_file.stat().st_size / 10
+
+    def test_fmindex_build(self) -> None:
+        sequence = random_sequence(20000)
+
+        def run() -> None:
+            FMIndex.build([("target", sequence)])
+
+        # The ranks and keys of the suffix array are packed into arrays, which keeps the
+        # build to around 100 bytes per base
+        assert peak_memory(run) < 150 * len(sequence)
+
+    def test_fmindex_size(self, tmp_path: Path) -> None:
+        sequence = random_sequence(20000)
+        index_file = tmp_path / "index.fmi"
+        FMIndex.build([("target", sequence)]).save(str(index_file))
+
+        # The BWT takes a byte per base, and the sampled suffix array and occurrence
+        # checkpoints about another byte with the default sampling rates
+        assert index_file.stat().st_size < 3 * len(sequence)
+
+    @pytest.mark.parametrize("single_record", [False, True])
+    def test_results_memory_budget(self, tmp_path: Path, single_record: bool) -> None:
+        primer_file = tmp_path / "primers.fa"
+        primer_file.write_text(">forward_primer\nGGAG\n>reverse_primer\nTAAT\n")
+        max_product_length = 200 if single_record else 28
+
+        def run(size: int) -> None:
+            sequence_file = tmp_path / f"sequences_{size}.fa"
+            with open(sequence_file, "w") as fout:
+                if single_record:
+                    fout.write(f">record_0\n{DENSE_SITES * (6 * size)}\n")
+                else:
+                    for i in range(size):
+                        fout.write(f">record_{i}\n{AMPLICON * 100}\n")
+            with get_pcr_results(
+                str(primer_file),
+                str(sequence_file),
+                max_product_length=max_product_length,
+                memory_budget=64 * 1024,
+                queue_size=4,
+            ) as results:
+                assert results.spilled
+                for _ in results:
+                    pass
+
+        small_peak = peak_memory(lambda: run(40))
+        large_peak = peak_memory(lambda: run(40 * SCALE))
+
+        # The results spill to disk, so the peak is set by the budget and not the output,
+        # even when all of the products come from the same record
+        assert large_peak < 1.5 * small_peak
@@ -0,0 +1,201 @@
+import gzip
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+
+import ispcr
+from ispcr import get_pcr_products, write_pcr_products
+from ispcr.pipeline import BackgroundConsumer, prefetch
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestPrefetch:
+    def test_items_in_order(self) -> None:
+        assert list(prefetch(range(1000), maxsize=3)) == list(range(1000))
+
+    def test_exceptions_are_raised(self) -> None:
+        def failing() -> Iterator[int]:
+            yield 1
+            raise KeyError("bad record")
+
+        with pytest.raises(KeyError):
+            list(prefetch(failing()))
+
+    def test_bounded_queue(self) -> None:
+        produced = []
+
+        def counting() -> Iterator[int]:
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        items = prefetch(counting(), maxsize=4)
+        next(items)
+        time.sleep(0.2)
+
+        # The queue holds 4 items and the thread holds one more while it waits for room
+        assert len(produced) <= 6
+        items.close()
+
+    def test_stopping_early(self) -> None:
+        closed = threading.Event()
+
+        def endless() -> Iterator[int]:
+            try:
+                while True:
+                    yield 1
+            finally:
+                closed.set()
+
+        items = prefetch(endless(), maxsize=2)
+        assert next(items) == 1
+        items.close()
+
+        assert closed.is_set()
+
+    def test_invalid_queue_size(self) -> None:
+        with pytest.raises(ValueError):
+            list(prefetch(range(10), maxsize=0))
+
+
+class TestBackgroundConsumer:
+    def test_items_in_order(self) -> None:
+        consumed: List[int] = []
+        with BackgroundConsumer(consumed.append, maxsize=2) as output:
+            for i in range(100):
+                output.put(i)
+
+        assert consumed == list(range(100))
+
+    def test_exceptions_are_raised(self) -> None:
+        def failing(item: int) -> None:
+            raise OSError("disk full")
+
+        output: BackgroundConsumer[int] = BackgroundConsumer(failing, maxsize=1)
+        with pytest.raises(OSError):
+            for i in range(100):
+                output.put(i)
+            output.close()
+
+    def test_finish_runs_in_consumer_thread(self) -> None:
+        threads = []
+
+        def finish() -> None:
+            threads.append(threading.current_thread().name)
+
+        with BackgroundConsumer(print, maxsize=1, finish=finish):
+            pass
+
+        assert threads == ["ispcr-writer"]
+
+
+class TestPipelinedRuns:
+    def test_gzipped_sequence_file(self, tmp_path: Path) -> None:
+        gzipped_file = str(tmp_path / "met_r.fa.gz")
+        with open(SEQUENCE_FILE, "rb") as fin, gzip.open(gzipped_file, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+
+        expected = get_pcr_products(PRIMER_FILE, SEQUENCE_FILE)
+        actual = get_pcr_products(PRIMER_FILE, gzipped_file)
+
+        assert expected == actual
+
+    @pytest.mark.parametrize("header", [True, False])
+    def test_batched_output_file(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, header: bool
+    ) -> None:
+        monkeypatch.setattr(ispcr, "DEFAULT_BATCH_SIZE", 5)
+        output_file = str(tmp_path / "results.tsv")
+        results = get_pcr_products(
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            max_product_length=500,
+            header=header,
+            output_file=output_file,
+            queue_size=1,
+        )
+        with open(output_file) as fin:
+            written = fin.read()
+
+        assert results.count("\n") > 10
+        assert results == written
+
+    def test_write_pcr_products(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(ispcr, "DEFAULT_BATCH_SIZE", 5)
+        output_file = str(tmp_path / "results.tsv")
+        count = write_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, output_file, queue_size=1
+        )
+        with open(output_file) as fin:
+            written = fin.read()
+
+        assert written == get_pcr_products(PRIMER_FILE, SEQUENCE_FILE)
+        assert count == written.count("\n")
+
+    def test_write_pcr_products_batches_within_a_record(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        batch_sizes = []
+
+        class RecordingConsumer(BackgroundConsumer[Any]):
+            def put(self, item: Any) -> None:
+                batch_sizes.append(len(item))
+                super().put(item)
+
+        monkeypatch.setattr(ispcr, "DEFAULT_BATCH_SIZE", 5)
+        monkeypatch.setattr(ispcr, "BackgroundConsumer", RecordingConsumer)
+        sequence_file = tmp_path / "sequences.fa"
+        sequence_file.write_text(f">target\n{'GGAGATTA' * 23}\n")
+        count = write_pcr_products(
+            PRIMER_FILE,
+            str(sequence_file),
+            str(tmp_path / "results.tsv"),
+            max_product_length=8,
+        )
+
+        assert count == 23
+        assert batch_sizes == [5, 5, 5, 5, 3]
+
+    @pytest.mark.parametrize("run", [get_pcr_products, write_pcr_products])
+    def test_reader_stops_when_the_search_fails(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, run: Any
+    ) -> None:
+        def failing_search(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            raise RuntimeError("search failed")
+
+        monkeypatch.setattr(ispcr, "iter_pcr_products", failing_search)
+        # The exception keeps the frame of the run alive, which used to keep the reader
+        # thread and the sequence file open along with it
+        with pytest.raises(RuntimeError) as error:
+            run(
+                PRIMER_FILE,
+                SEQUENCE_FILE,
+                output_file=str(tmp_path / "results.tsv"),
+                queue_size=1,
+            )
+
+        assert error.value.__traceback__ is not None
+        assert "ispcr-reader" not in [thread.name for thread in threading.enumerate()]
+
+    def test_bad_arguments_raised_before_reading(self, tmp_path: Path) -> None:
+        sequence_file = tmp_path / "empty.fa"
+        sequence_file.write_text("")
+        output_file = tmp_path / "results.tsv"
+        output_file.write_text("previous results")
+
+        with pytest.raises(ValueError):
+            get_pcr_products(PRIMER_FILE, str(sequence_file), ambiguous="bogus")
+        with pytest.raises(ValueError):
+            write_pcr_products(
+                PRIMER_FILE, str(sequence_file), str(output_file), queue_size=0
+            )
+
+        assert output_file.read_text() == "previous results"
@@ -0,0 +1,77 @@
+from typing import Iterator
+
+import pytest
+
+from ispcr import get_pcr_products
+from ispcr.FastaSequence import FastaSequence
+from ispcr.prefilter import PrimerKmerFilter, terminal_kmer
+from ispcr.utils import read_fasta
+
+
+class TestPrimerKmerFilter:
+    @pytest.fixture(scope="class")
+    def kmer_filter(self) -> Iterator[PrimerKmerFilter]:
+        forward_primer = FastaSequence("test_forward", "CAGGAGCATG")
+        reverse_primer = FastaSequence("test_reverse", "GTTAATTGGA")
+        yield PrimerKmerFilter.from_primers(forward_primer, reverse_primer, k=4)
+
+    def test_terminal_kmer(self) -> None:
+        assert terminal_kmer("ACGTACGT", 3) == "CGT"
+
+    def test_terminal_kmer_short_sequence(self) -> None:
+        assert terminal_kmer("ACG", 5) == "ACG"
+
+    def test_terminal_kmer_invalid_k(self) -> None:
+        with pytest.raises(ValueError):
+            terminal_kmer("ACGT", 0)
+
+    def test_kmers_from_primers(self, kmer_filter: PrimerKmerFilter) -> None:
+        expected = frozenset(["CATG", "TCCA"])
+        actual = kmer_filter.kmers
+
+        assert expected == actual
+
+    def test_accepts(self, kmer_filter: PrimerKmerFilter) -> None:
+        assert kmer_filter.accepts("GGAGCATGCTATGTCGTAGCTGATCCAATTA")
+
+    def test_rejects_missing_reverse(self, kmer_filter: PrimerKmerFilter) -> None:
+        assert not kmer_filter.accepts("GGAGCATGCTATGTCGTAGCTGATGCAATTA")
+
+    def test_accepts_kmer_across_lines(self, kmer_filter: PrimerKmerFilter) -> None:
+        assert kmer_filter.accepts_lines(["GGAGCA", "TGCTATC", "CAATTA"])
+
+    def test_rejects_lines(self, kmer_filter: PrimerKmerFilter) -> None:
+        assert not kmer_filter.accepts_lines(["GGAGCA", "TGCTAT", "GCAATT"])
+
+
+class TestPrefilteredReading:
+    def test_read_fasta_skips_rejected_records(self) -> None:
+        forward_primer = FastaSequence("test_forward", "GGAG")
+        reverse_primer = FastaSequence("test_reverse", "TAAT")
+        kmer_filter = PrimerKmerFilter.from_primers(forward_primer, reverse_primer)
+
+        with open("tests/test_data/sequences/met_r.fa") as fin:
+            all_records = list(read_fasta(fin))
+        with open("tests/test_data/sequences/met_r.fa") as fin:
+            kept_records = list(read_fasta(fin, prefilter=kmer_filter))
+
+        expected = [
+            record
+            for record in all_records
+            if "GGAG" in record.sequence and "ATTA" in record.sequence
+        ]
+
+        assert expected == kept_records
+
+    def test_prefilter_does_not_change_results(self) -> None:
+        expected_results = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file="tests/test_data/sequences/met_r.fa",
+        )
+        actual_results = get_pcr_products(
+            primer_file="tests/test_data/primers/test_primers_1.fa",
+            sequence_file="tests/test_data/sequences/met_r.fa",
+            prefilter=True,
+        )
+
+        assert expected_results == actual_results
@@ -0,0 +1,107 @@
+import inspect
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from ispcr import get_pcr_products, get_pcr_results
+from ispcr.results import DEFAULT_MEMORY_BUDGET, PCRResults
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestPCRResults:
+    @pytest.fixture(scope="class")
+    def lines(self) -> List[str]:
+        return [f"line_{i}\t{i}" for i in range(25)]
+
+    @pytest.mark.parametrize("memory_budget", [None, 0, 200, 10**6])
+    def test_lines_in_order(self, lines: List[str], memory_budget: int) -> None:
+        with PCRResults(memory_budget) as results:
+            for start in range(0, len(lines), 4):
+                results.extend(lines[start:][:4])
+
+            assert len(results) == len(lines)
+            assert list(results) == lines
+            assert results.getvalue() == "\n".join(lines)
+            # Reading the results doesn't change them
+            assert list(results) == lines
+
+    def test_spilling(self, lines: List[str]) -> None:
+        with PCRResults(memory_budget=0) as results:
+            results.extend(lines)
+
+            assert results.spilled
+            assert results._lines == []
+
+        with PCRResults() as results:
+            results.extend(lines)
+
+            assert not results.spilled
+
+    def test_spilled_and_buffered_lines(self, lines: List[str]) -> None:
+        with PCRResults(memory_budget=300) as results:
+            for line in lines[:-2]:
+                results.extend([line])
+
+            assert results.spilled
+            assert results._lines
+            assert results.getvalue() == "\n".join(lines[:-2])
+
+    def test_write(self, tmp_path: Path, lines: List[str]) -> None:
+        output_file = str(tmp_path / "results.tsv")
+        with PCRResults(memory_budget=100) as results:
+            results.extend(lines[:10])
+            results.extend(lines[10:])
+            results.write(output_file)
+
+        with open(output_file) as fin:
+            assert fin.read() == "\n".join(lines)
+
+    def test_close(self, lines: List[str]) -> None:
+        results = PCRResults(memory_budget=0)
+        results.extend(lines)
+        spill_file = results._spill_file
+        results.close()
+
+        assert spill_file is not None and spill_file.closed
+        assert list(results) == []
+
+    def test_invalid_budget(self) -> None:
+        with pytest.raises(ValueError):
+            PCRResults(memory_budget=-1)
+
+
+class TestGetPCRResults:
+    @pytest.mark.parametrize("memory_budget", [0, 1000])
+    def test_matches_get_pcr_products(self, memory_budget: int) -> None:
+        expected = get_pcr_products(PRIMER_FILE, SEQUENCE_FILE)
+        with get_pcr_results(
+            PRIMER_FILE, SEQUENCE_FILE, memory_budget=memory_budget
+        ) as results:
+            assert results.spilled
+            assert results.getvalue() == expected
+            assert list(results) == expected.split("\n")
+
+    def test_same_default_budget(self) -> None:
+        # get_pcr_products spills its results by default, just like get_pcr_results
+        for function in (get_pcr_products, get_pcr_results):
+            budget = inspect.signature(function).parameters["memory_budget"].default
+
+            assert budget == DEFAULT_MEMORY_BUDGET
+
+    def test_output_file(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.tsv")
+        expected = get_pcr_products(PRIMER_FILE, SEQUENCE_FILE, header=False)
+        actual = get_pcr_products(
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            header=False,
+            output_file=output_file,
+            memory_budget=0,
+        )
+        with open(output_file) as fin:
+            written = fin.read()
+
+        assert expected == actual == written
@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from ispcr import get_pcr_products, write_pcr_products
+from ispcr.FastaSequence import FastaSequence
+from ispcr.sharding import merge_shard_outputs, read_shard_lines, shard_byte_range
+from ispcr.utils import read_fasta, read_sequences_from_file
+from ispcr.writers import read_columnar_file
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestShards:
+    def test_byte_ranges(self) -> None:
+        ranges = [shard_byte_range(10, i, 3) for i in range(3)]
+
+        assert ranges == [(0, 3), (3, 6), (6, 10)]
+
+    @pytest.mark.parametrize("shard_index,shard_count", [(0, 0), (3, 3), (-1, 2)])
+    def test_invalid_shards(self, shard_index: int, shard_count: int) -> None:
+        with pytest.raises(ValueError):
+            shard_byte_range(10, shard_index, shard_count)
+
+    @pytest.mark.parametrize("shard_count", [1, 2, 3, 7, 50])
+    def test_every_record_in_one_shard(self, shard_count: int) -> None:
+        expected = read_sequences_from_file(SEQUENCE_FILE)
+        actual: List[FastaSequence] = []
+        for shard_index in range(shard_count):
+            actual.extend(
+                read_fasta(read_shard_lines(SEQUENCE_FILE, shard_index, shard_count))
+            )
+
+        assert expected == actual
+
+    def test_shards_are_balanced(self) -> None:
+        shard_count = 4
+        longest_record = max(
+            len(sequence) for sequence in read_sequences_from_file(SEQUENCE_FILE)
+        )
+        shard_sizes = [
+            sum(
+                len(line)
+                for line in read_shard_lines(SEQUENCE_FILE, shard_index, shard_count)
+            )
+            for shard_index in range(shard_count)
+        ]
+        file_size = os.path.getsize(SEQUENCE_FILE)
+
+        for shard_size in shard_sizes:
+            # The line lengths include newlines, so leave some room for them
+            assert abs(shard_size - file_size / shard_count) < 1.1 * longest_record
+
+
+class TestMergeShards:
+    @pytest.fixture
+    def shard_files(self, tmp_path: Path) -> List[str]:
+        return [str(tmp_path / f"shard_{i}") for i in range(3)]
+
+    @pytest.mark.parametrize("header", [True, False])
+    def test_merged_tsv(
+        self, tmp_path: Path, shard_files: List[str], header: bool
+    ) -> None:
+        for shard_index, shard_file in enumerate(shard_files):
+            get_pcr_products(
+                PRIMER_FILE,
+                SEQUENCE_FILE,
+                max_product_length=500,
+                header=header,
+                output_file=shard_file,
+                shard_index=shard_index,
+                shard_count=len(shard_files),
+            )
+        merged_file = str(tmp_path / "merged.tsv")
+        merge_shard_outputs(shard_files, merged_file, header=header)
+
+        expected = get_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, max_product_length=500, header=header
+        )
+        with open(merged_file) as fin:
+            actual = fin.read()
+
+        assert expected == actual
+
+    def test_merged_columnar(self, tmp_path: Path, shard_files: List[str]) -> None:
+        for shard_index, shard_file in enumerate(shard_files):
+            write_pcr_products(
+                PRIMER_FILE,
+                SEQUENCE_FILE,
+                shard_file,
+                output_format="columnar",
+                shard_index=shard_index,
+                shard_count=len(shard_files),
+            )
+        merged_file = str(tmp_path / "merged.col")
+        merge_shard_outputs(shard_files, merged_file, output_format="columnar")
+
+        single_file = str(tmp_path / "single.col")
+        write_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, single_file, output_format="columnar"
+        )
+
+        assert read_columnar_file(single_file) == read_columnar_file(merged_file)
+
+    def test_merged_sqlite(self, tmp_path: Path, shard_files: List[str]) -> None:
+        for shard_index, shard_file in enumerate(shard_files):
+            write_pcr_products(
+                PRIMER_FILE,
+                SEQUENCE_FILE,
+                shard_file,
+                output_format="sqlite",
+                shard_index=shard_index,
+                shard_count=len(shard_files),
+            )
+        merged_file = str(tmp_path / "merged.db")
+        merge_shard_outputs(shard_files, merged_file, output_format="sqlite")
+
+        single_file = str(tmp_path / "single.db")
+        write_pcr_products(
+            PRIMER_FILE, SEQUENCE_FILE, single_file, output_format="sqlite"
+        )
+
+        query = "SELECT * FROM products ORDER BY rowid"
+        with sqlite3.connect(single_file) as single, sqlite3.connect(
+            merged_file
+        ) as merged:
+            assert single.execute(query).fetchall() == merged.execute(query).fetchall()
+
+    def test_processes_as_nodes(self, tmp_path: Path, shard_files: List[str]) -> None:
+        env = dict(os.environ)
+        src = str(Path(__file__).parent.parent / "src")
+        env["PYTHONPATH"] = os.pathsep.join(
+            [src] + [path for path in [env.get("PYTHONPATH")] if path]
+        )
+
+        nodes = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "ispcr",
+                    "run",
+                    PRIMER_FILE,
+                    SEQUENCE_FILE,
+                    "-o",
+                    shard_file,
+                    "--max-product-length",
+                    "500",
+                    "--shard-index",
+                    str(shard_index),
+                    "--shard-count",
+                    str(len(shard_files)),
+                ],
+                env=env,
+            )
+            for shard_index, shard_file in enumerate(shard_files)
+        ]
+        assert [node.wait() for node in nodes] == [0] * len(nodes)
+
+        merged_file = str(tmp_path / "merged.tsv")
+        subprocess.run(
+            [sys.executable, "-m", "ispcr", "merge", *shard_files, "-o", merged_file],
+            env=env,
+            check=True,
+        )
+
+        expected = get_pcr_products(PRIMER_FILE, SEQUENCE_FILE, max_product_length=500)
+        with open(merged_file) as fin:
+            actual = fin.read()
+
+        assert expected == actual
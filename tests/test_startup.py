@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Set, Tuple
+
+import pytest
+
+import ispcr
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+# Modules that a small search doesn't need and that should only be imported on first use
+LAZY_MODULES = (
+    "ispcr.database",
+    "ispcr.prefilter",
+    "ispcr.thermo",
+    "ispcr.writers",
+    "sqlite3",
+    "tempfile",
+)
+# Modules that importing the command line shouldn't import until a command needs them
+CLI_LAZY_MODULES = LAZY_MODULES + ("ispcr.estimate", "ispcr.incremental")
+# How many times longer than a bare interpreter a small search may take to start and run
+STARTUP_RATIO = 10
+# Set by pytest-cov so that subprocesses are measured too, which imports sqlite3 in them
+COVERAGE_VARIABLES = ("COV_CORE_", "COVERAGE_")
+
+
+def run_python(code: str) -> str:
+    # Runs code in a fresh interpreter, so nothing has been imported yet
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith(COVERAGE_VARIABLES)
+    }
+    src = str(Path(__file__).parent.parent / "src")
+    env["PYTHONPATH"] = os.pathsep.join(
+        [src] + [path for path in [env.get("PYTHONPATH")] if path]
+    )
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+
+
+def loaded_modules(code: str, modules: Tuple[str, ...]) -> Set[str]:
+    # The modules that running code imports, leaving out any that a bare interpreter
+    # already imports, such as those imported by a sitecustomize
+    check = f"print(' '.join(m for m in {modules!r} if m in sys.modules))"
+    baseline = run_python(f"import sys\n{check}").split()
+    return set(run_python(f"import sys\n{code}\n{check}").split()) - set(baseline)
+
+
+def startup_time(code: str) -> float:
+    # The fastest of several runs of code in a fresh interpreter, timed from outside so
+    # that the interpreter's own startup is included
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        run_python(code)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class TestLazyImports:
+    def test_heavy_modules_not_imported(self) -> None:
+        loaded = loaded_modules(
+            "import ispcr\n"
+            f"ispcr.get_pcr_products({PRIMER_FILE!r}, {SEQUENCE_FILE!r})",
+            LAZY_MODULES,
+        )
+
+        assert loaded == set()
+
+    def test_cli_modules_not_imported(self) -> None:
+        # Each command imports the modules it runs, so importing the command line doesn't
+        loaded = loaded_modules("import ispcr.cli", CLI_LAZY_MODULES)
+
+        assert loaded == set()
+
+    def test_lazy_attributes(self) -> None:
+        from ispcr.database import SequenceDatabase
+        from ispcr.thermo import ThermoFilter
+
+        assert ispcr.SequenceDatabase is SequenceDatabase
+        assert ispcr.ThermoFilter is ThermoFilter
+        assert "merge_shard_outputs" in dir(ispcr)
+
+    def test_missing_attribute(self) -> None:
+        with pytest.raises(AttributeError):
+            ispcr.not_an_attribute
+
+    def test_startup_time(self) -> None:
+        search = startup_time(
+            "from ispcr import get_pcr_products\n"
+            f"get_pcr_products({PRIMER_FILE!r}, {SEQUENCE_FILE!r})"
+        )
+
+        # Compared to a bare interpreter, so that a slow or busy machine slows both down
+        assert search < STARTUP_RATIO * startup_time("pass")
@@ -0,0 +1,142 @@
+from typing import List, Tuple
+
+import pytest
+
+from ispcr import get_pcr_products, matching
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import find_primer_sites, iter_pcr_products
+from ispcr.thermo import (
+    STACK_TABLE,
+    ThermoFilter,
+    annotate_sites,
+    site_sequence,
+    site_thermodynamics,
+)
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/met_r.fa"
+
+
+class TestSiteThermodynamics:
+    def test_every_dinucleotide_has_a_stack(self) -> None:
+        assert len(STACK_TABLE) == 16
+
+    def test_melting_temperature(self) -> None:
+        # Worked out by hand from the SantaLucia (1998) parameters
+        thermodynamics = site_thermodynamics("AGAGTTTGATCCTGGCTCAG")
+
+        assert thermodynamics.tm == pytest.approx(51.08, abs=0.01)
+        assert thermodynamics.gc == 50
+
+    def test_three_prime_end(self) -> None:
+        end = site_thermodynamics("CTCAG")
+
+        assert site_thermodynamics("AGAGTTTGATCCTGGCTCAG").three_prime_dg == (
+            pytest.approx(end.three_prime_dg)
+        )
+        assert site_thermodynamics("ATATA").three_prime_dg > end.three_prime_dg
+
+    def test_stable_under_reverse_complement(self) -> None:
+        forward = site_thermodynamics("AGAGTTTGATCCTGGCTCAG")
+        reverse = site_thermodynamics("CTGAGCCAGGATCAAACTCT")
+
+        assert forward.tm == pytest.approx(reverse.tm)
+
+    def test_site_sequence(self) -> None:
+        sequence = "GGCCATTTTA"
+
+        assert site_sequence(sequence, 1, 3) == "GCC"
+        assert site_sequence(sequence, 1, 3, reverse=True) == "GGC"
+        assert site_sequence(sequence, 8, 4) == "TAGG"
+
+    def test_annotate_sites(self) -> None:
+        sequence = "ATGCTGATGCATGCTA"
+        annotations = annotate_sites(sequence, find_primer_sites(sequence, "ATGC"), 4)
+
+        assert [annotation.gc for annotation in annotations] == [50, 50, 50]
+
+
+class TestThermoFilter:
+    @pytest.mark.parametrize(
+        "thresholds",
+        [
+            {"min_tm": 60, "max_tm": 50},
+            {"min_gc": 60, "max_gc": 40},
+            {"sodium": 0},
+        ],
+    )
+    def test_invalid_thresholds(self, thresholds: dict) -> None:
+        with pytest.raises(ValueError):
+            ThermoFilter(**thresholds)
+
+    def products(self, thermo: ThermoFilter) -> List[Tuple[int, int]]:
+        sequence = FastaSequence(
+            "target", "GGCCA" + "C" * 5 + "GGCCG" + "C" * 5 + "AAAA"
+        )
+        return [
+            (product.start, product.end)
+            for product in iter_pcr_products(
+                sequence,
+                FastaSequence("forward", "GGCCN"),
+                FastaSequence("reverse", "TTTT"),
+                ambiguous="expand",
+                thermo=thermo,
+            )
+        ]
+
+    def test_degenerate_sites(self) -> None:
+        assert self.products(ThermoFilter()) == [(0, 24), (10, 24)]
+        assert self.products(ThermoFilter(max_gc=90)) == [(0, 24)]
+
+    def test_reverse_sites(self) -> None:
+        # The reverse primer TTTTTGGCCG binds as CGGCCAAAAA, so its stable 3' end is on the left
+        sequence = "AAACGGCCAAAAAGG"
+        thermo = ThermoFilter(max_three_prime_dg=-6)
+
+        assert thermo.filter_sites(sequence, [3], 10, reverse=True) == [3]
+        assert thermo.filter_sites(sequence, [3], 10) == []
+
+    def test_accepts_primer(self) -> None:
+        thermo = ThermoFilter(max_three_prime_dg=-6)
+
+        assert thermo.accepts_primer("TTTTTGGCCG")
+        assert not thermo.accepts_primer("CGGCCAAAAA")
+        assert thermo.accepts_primer("CGGCCAAAAA", reverse=True)
+
+    def test_rejected_primer_is_not_searched(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        searched = []
+
+        def find_sites(sequence: str, primer: str, ambiguous: str) -> List[int]:
+            searched.append(primer)
+            return find_primer_sites(sequence, primer, ambiguous)
+
+        monkeypatch.setattr(matching, "find_primer_sites", find_sites)
+        products = list(
+            iter_pcr_products(
+                FastaSequence("target", "GGAGCCCCATTA"),
+                FastaSequence("forward", "GGAG"),
+                FastaSequence("reverse", "TAAT"),
+                thermo=ThermoFilter(min_tm=50),
+            )
+        )
+
+        assert products == []
+        assert searched == []
+
+    def test_get_pcr_products(self) -> None:
+        expected = get_pcr_products(PRIMER_FILE, SEQUENCE_FILE, max_product_length=500)
+
+        assert expected == get_pcr_products(
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            max_product_length=500,
+            thermo=ThermoFilter(min_gc=0, max_gc=100),
+        )
+        assert "\n" not in get_pcr_products(
+            PRIMER_FILE,
+            SEQUENCE_FILE,
+            max_product_length=500,
+            thermo=ThermoFilter(min_tm=50),
+        )
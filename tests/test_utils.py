@@ -69,6 +69,52 @@ class TestReaderUtils:
         assert expected_single_header == actual_single_header
 
 
+class TestReaderFilters:
+    @staticmethod
+    def read_met_r(**filters: object) -> List[FastaSequence]:
+        with open("tests/test_data/sequences/met_r.fa") as fin:
+            return list(read_fasta(fin, **filters))  # type: ignore
+
+    def test_min_length(self) -> None:
+        fasta_sequences = self.read_met_r(min_length=550)
+
+        assert len(fasta_sequences) == 8
+        assert all(len(fasta_sequence) >= 550 for fasta_sequence in fasta_sequences)
+
+    def test_header_pattern(self) -> None:
+        fasta_sequences = self.read_met_r(header_pattern="ribosomal RNA")
+
+        assert len(fasta_sequences) == 8
+
+    def test_sequence_ids(self) -> None:
+        expected_ids = [
+            "gi|293162|gb|L10680.1|MBIRR25SB",
+            "gi|514252762|gb|KC802230.1|",
+        ]
+        fasta_sequences = self.read_met_r(sequence_ids=expected_ids)
+        actual_ids = [
+            fasta_sequence.header.split()[0] for fasta_sequence in fasta_sequences
+        ]
+
+        assert expected_ids == actual_ids
+
+    def test_combined_filters(self) -> None:
+        fasta_sequences = self.read_met_r(header_pattern="18S", min_length=250)
+
+        assert len(fasta_sequences) == 1
+        assert len(fasta_sequences[0]) == 283
+
+    def test_filters_keep_sequences_intact(self) -> None:
+        all_sequences = self.read_met_r()
+        long_sequences = self.read_met_r(min_length=1000)
+
+        assert long_sequences == [
+            fasta_sequence
+            for fasta_sequence in all_sequences
+            if len(fasta_sequence) >= 1000
+        ]
+
+
 class TestDesiredProductSize:
     def test_min_none_pass(self) -> None:
         min_product_length, max_product_length = None, 200
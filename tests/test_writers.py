@@ -0,0 +1,262 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from ispcr import get_pcr_products, write_pcr_products
+from ispcr.FastaSequence import FastaSequence
+from ispcr.matching import iter_pcr_products
+from ispcr.PCRProduct import PCRProduct
+from ispcr.utils import InvalidColumnSelectionError
+from ispcr.writers import (
+    WRITERS,
+    BEDWriter,
+    ColumnarWriter,
+    DedupWriter,
+    ProductWriter,
+    SQLiteWriter,
+    TSVWriter,
+    get_writer,
+    read_columnar_file,
+)
+
+PRIMER_FILE = "tests/test_data/primers/test_primers_1.fa"
+SEQUENCE_FILE = "tests/test_data/sequences/single_test.fa"
+
+PRODUCTS = [
+    PCRProduct("f", "r", 0, 8, 8, "target one", "GGAGATTA"),
+    PCRProduct("f", "r", 10, 22, 12, "target two", "GGAGCCCCATTA"),
+    PCRProduct("f", "r", 5, 13, 8, "target two", "GGAGATTA"),
+]
+
+
+class TestWriters:
+    def test_tsv_matches_get_pcr_products(self, tmp_path: Path) -> None:
+        expected_file = str(tmp_path / "expected.tsv")
+        actual_file = str(tmp_path / "actual.tsv")
+        get_pcr_products(
+            primer_file=PRIMER_FILE,
+            sequence_file=SEQUENCE_FILE,
+            cols="pname start end length",
+            output_file=expected_file,
+        )
+        write_pcr_products(
+            primer_file=PRIMER_FILE,
+            sequence_file=SEQUENCE_FILE,
+            output_file=actual_file,
+            cols="pname start end length",
+        )
+
+        assert Path(expected_file).read_text() == Path(actual_file).read_text()
+
+    def test_tsv_across_batches(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.tsv")
+        with TSVWriter(output_file, header=False, batch_size=2) as writer:
+            writer.write_all(PRODUCTS)
+
+        expected = "\n".join(str(product) for product in PRODUCTS)
+
+        assert Path(output_file).read_text() == expected
+
+    def test_invalid_cols(self, tmp_path: Path) -> None:
+        with pytest.raises(InvalidColumnSelectionError):
+            TSVWriter(str(tmp_path / "results.tsv"), cols="invalid cols string")
+
+    def test_bed(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.bed")
+        with BEDWriter(output_file) as writer:
+            writer.write_all(PRODUCTS[:1])
+
+        assert Path(output_file).read_text() == "target\t0\t8\tf_r\t0\t+\n"
+
+    def test_bed_orientations(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.bed")
+        with BEDWriter(output_file) as writer:
+            for orientation in ("RF", "FF", "RR"):
+                writer.write(
+                    PCRProduct("f", "r", 0, 8, 8, "target", "GGAGATTA", orientation)
+                )
+
+        assert Path(output_file).read_text().splitlines() == [
+            "target\t0\t8\tf_r\t0\t-",
+            "target\t0\t8\tf_r_FF\t0\t.",
+            "target\t0\t8\tf_r_RR\t0\t.",
+        ]
+
+    def test_bed_wrapped_product(self, tmp_path: Path) -> None:
+        sequence = FastaSequence("plasmid", "ATTACCCCCCGGAGCC")
+        products = iter_pcr_products(
+            sequence,
+            FastaSequence("f", "GGAG"),
+            FastaSequence("r", "TAAT"),
+            circular=True,
+        )
+        output_file = str(tmp_path / "results.bed")
+        with BEDWriter(output_file) as writer:
+            writer.write_all(products)
+
+        assert Path(output_file).read_text().splitlines() == [
+            "plasmid\t10\t16\tf_r\t0\t+",
+            "plasmid\t0\t4\tf_r\t0\t+",
+        ]
+
+    def test_sqlite(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.db")
+        with SQLiteWriter(output_file, batch_size=2) as writer:
+            writer.write_all(PRODUCTS)
+
+        connection = sqlite3.connect(output_file)
+        rows = connection.execute("SELECT * FROM products").fetchall()
+        indexes = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).fetchall()
+        connection.close()
+
+        assert rows == [product.fields() for product in PRODUCTS]
+        assert len(indexes) == 2
+
+    def test_sqlite_replaces_table(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.db")
+        for _ in range(2):
+            with SQLiteWriter(output_file) as writer:
+                writer.write_all(PRODUCTS)
+
+        connection = sqlite3.connect(output_file)
+        rows = connection.execute("SELECT * FROM products").fetchall()
+        connection.close()
+
+        assert rows == [product.fields() for product in PRODUCTS]
+
+    def test_columnar_round_trip(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "results.col")
+        with ColumnarWriter(output_file, batch_size=2) as writer:
+            writer.write_all(PRODUCTS)
+
+        assert read_columnar_file(output_file) == PRODUCTS
+
+    def test_columnar_bad_file(self, tmp_path: Path) -> None:
+        output_file = tmp_path / "results.col"
+        output_file.write_bytes(b"not a columnar file")
+
+        with pytest.raises(ValueError):
+            read_columnar_file(str(output_file))
+
+    def test_write_batch_is_abstract(self, tmp_path: Path) -> None:
+        class IncompleteWriter(ProductWriter):
+            pass
+
+        with pytest.raises(TypeError):
+            IncompleteWriter(str(tmp_path / "results.txt"))  # type: ignore[abstract]
+
+    def test_unsupported_format(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError):
+            get_writer("xlsx", str(tmp_path / "results.xlsx"))
+
+    def test_write_pcr_products_count(self, tmp_path: Path) -> None:
+        count = write_pcr_products(
+            primer_file=PRIMER_FILE,
+            sequence_file=SEQUENCE_FILE,
+            output_file=str(tmp_path / "results.db"),
+            output_format="sqlite",
+            max_product_length=100,
+        )
+
+        assert count == 2
+
+    @pytest.mark.parametrize("output_format", WRITERS)
+    def test_write_pcr_products_across_writer_batches(
+        self, tmp_path: Path, output_format: str
+    ) -> None:
+        # More products than a writer buffers, so batches are written by the writer thread
+        product_count = 10500
+        primer_file = tmp_path / "primers.fa"
+        primer_file.write_text(">f\nGGAG\n>r\nTAAT\n")
+        sequence_file = tmp_path / "sequences.fa"
+        sequence_file.write_text(f">target\n{'GGAGATTA' * product_count}\n")
+        output_file = str(tmp_path / f"results.{output_format}")
+
+        count = write_pcr_products(
+            primer_file=str(primer_file),
+            sequence_file=str(sequence_file),
+            output_file=output_file,
+            output_format=output_format,
+            max_product_length=8,
+        )
+
+        assert count == product_count
+        if output_format == "sqlite":
+            connection = sqlite3.connect(output_file)
+            (rows,) = connection.execute("SELECT COUNT(*) FROM products").fetchone()
+            connection.close()
+            assert rows == product_count
+
+
+class TestDedupWriter:
+    def test_unique_amplicons(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "amplicons.tsv")
+        products = PRODUCTS + [
+            PCRProduct("f", "r", 3, 11, 8, "target three", "ggagATTA"),
+        ]
+        with DedupWriter(output_file, batch_size=2) as writer:
+            writer.write_all(products)
+
+        assert writer.amplicon_count == 2
+        assert writer.membership_file == str(tmp_path / "amplicons.members.tsv")
+        with open(output_file) as fin:
+            amplicons = [line.split("\t") for line in fin.read().split("\n")[1:]]
+        with open(writer.membership_file) as fin:
+            members = [line.split("\t") for line in fin.read().split("\n")[1:]]
+
+        assert [
+            (amplicon_id, sequence) for amplicon_id, _, _, sequence in amplicons
+        ] == [
+            ("1", "GGAGATTA"),
+            ("2", "GGAGCCCCATTA"),
+        ]
+        assert [
+            (name, amplicon_id) for _, _, _, _, name, _, amplicon_id in members
+        ] == [
+            ("target one", "1"),
+            ("target two", "2"),
+            ("target two", "1"),
+            ("target three", "1"),
+        ]
+
+    def test_rebuilds_products(self, tmp_path: Path) -> None:
+        output_file = str(tmp_path / "amplicons.tsv")
+        write_pcr_products(
+            PRIMER_FILE,
+            "tests/test_data/sequences/met_r.fa",
+            output_file,
+            output_format="dedup",
+            max_product_length=500,
+            header=False,
+        )
+        expected = get_pcr_products(
+            PRIMER_FILE,
+            "tests/test_data/sequences/met_r.fa",
+            max_product_length=500,
+            cols="fpri rpri start end length pname pseq",
+            header=False,
+        )
+
+        with open(output_file) as fin:
+            sequences = {}
+            for line in fin:
+                amplicon_id, _, _, sequence = line.rstrip("\n").split("\t")
+                sequences[amplicon_id] = sequence
+        with open(str(tmp_path / "amplicons.members.tsv")) as fin:
+            rebuilt = []
+            for line in fin:
+                fpri, rpri, start, end, name, _, amplicon_id = line.rstrip("\n").split(
+                    "\t"
+                )
+                sequence = sequences[amplicon_id]
+                rebuilt.append(
+                    "\t".join(
+                        [fpri, rpri, start, end, str(len(sequence)), name, sequence]
+                    )
+                )
+
+        assert len(sequences) < len(rebuilt)
+        assert "\n".join(rebuilt) == expected